@@ -125,15 +125,16 @@ def cleanup_user_old_data(user_id, db):
         
         # Xóa embeddings cũ trong Qdrant
         try:
-            from qdrant_client import QdrantClient
+            sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            from embedding.qdrant_collections import collection_manager
             from qdrant_client.models import Filter, FieldCondition, MatchValue
             
-            qdrant = QdrantClient(url="http://localhost:6334")
+            # Cùng Qdrant server với bước insert embeddings
+            qdrant = collection_manager.client
             collection_name = "products"
             
             # Check collection exists
-            collections = qdrant.get_collections().collections
-            if any(c.name == collection_name for c in collections):
+            if qdrant.collection_exists(collection_name):
                 # Count old vectors
                 count_result = qdrant.count(
                     collection_name=collection_name,
@@ -539,8 +540,8 @@ def generate_embeddings_for_products(products, user_id):
     try:
         # Add parent directory to path để import embedding module
         sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from embedding.generate_embeddings import generate_embedding
-        from embedding.insert_qdrant import ensure_product_collection_exists, insert_products_to_qdrant_product
+        from embedding.generate_embeddings import generate_embeddings
+        from embedding.insert_qdrant import ensure_product_collection_exists, insert_products_to_qdrant_products
         print(f"  ✅ Import embedding modules thành công")
     except ImportError as e:
         print(f"⚠️  Import error: {str(e)[:100]}")
@@ -556,70 +557,56 @@ def generate_embeddings_for_products(products, user_id):
         print(f"  ❌ Lỗi tạo collection: {str(e)[:100]}")
         return 0
     
-    # Generate embeddings for products with description
+    # Generate embeddings for products with description (batch API + batch upsert)
     embedding_start = time.time()
     products_with_embedding = 0
     products_failed = 0
     
     print(f"  ⏳ Tạo embeddings cho {len(products)} products...\n")
     
+    # Only embed products that have a description
+    to_embed = []
     for i, product in enumerate(products, 1):
-        try:
-            # Only embed if description exists
-            description = product.get('description', '').strip()
-            
-            if i <= 3:  # Debug first 3 products
-                print(f"  🔍 DEBUG Product {i}:")
-                print(f"     - ID: {product.get('id', 'N/A')}")
-                print(f"     - Title: {product.get('title', 'N/A')[:50]}")
-                print(f"     - Description length: {len(description)}")
-            
+        description = (product.get('description') or '').strip()
+        
+        if i <= 3:  # Debug first 3 products
+            print(f"  🔍 DEBUG Product {i}:")
+            print(f"     - ID: {product.get('id', 'N/A')}")
+            print(f"     - Title: {product.get('title', 'N/A')[:50]}")
+            print(f"     - Description length: {len(description)}")
             if not description:
-                if i <= 3:
-                    print(f"     ⚠️ SKIP: No description")
+                print(f"     ⚠️ SKIP: No description")
+        
+        if description:
+            to_embed.append((product, description))
+    
+    try:
+        # Generate embeddings từ description - gọi hàm batch từ generate_embeddings.py
+        embeddings = generate_embeddings([description for _, description in to_embed])
+        
+        items = []
+        for (product, description), embedding in zip(to_embed, embeddings):
+            if embedding is None:
+                products_failed += 1
+                print(f"  ⚠️  Product {product.get('id', 'N/A')}: embedding failed")
                 continue
-            
-            # Generate embedding từ description - gọi hàm từ generate_embeddings.py
-            if i <= 3:
-                print(f"     ⏳ Generating embedding...")
-            
-            embedding = generate_embedding(description)
-            
-            if i <= 3:
-                print(f"     ✅ Embedding generated: {len(embedding) if embedding else 0} dimensions")
-            
-            if embedding is not None and len(embedding) > 0:  # Check if embedding is valid
-                # Prepare payload - product id là UUID string từ DB
-                # insert_qdrant.py sẽ tự xử lý để convert thành Qdrant-compatible format
-                payload = {
-                    "id": product.get('id', ''),  # Add product UUID
-                    "title": product.get('title', ''),
-                    "description": description[:500]  # Limit to 500 chars for payload
-                }
-                
-                # Insert to Qdrant - gọi hàm từ insert_qdrant.py
-                if i <= 3:
-                    print(f"     ⏳ Inserting to Qdrant...")
-                
-                insert_products_to_qdrant_product(embedding, payload, user_id, collection_name)
-                products_with_embedding += 1
-                
-                if i <= 3:
-                    print(f"     ✅ Inserted to Qdrant successfully")
-            else:
-                print(f"  ⚠️  Product {i}: embedding is empty or None")
-            
-            # Progress every 10 products
-            if i % 10 == 0:
-                print(f"  [{i}/{len(products)}] {products_with_embedding} embeddings created")
+            # Prepare payload - product id là UUID string từ DB
+            payload = {
+                "id": product.get('id', ''),  # Add product UUID
+                "title": product.get('title', ''),
+                "description": description[:500]  # Limit to 500 chars for payload
+            }
+            items.append((embedding, payload))
         
-        except Exception as e:
-            products_failed += 1
-            print(f"  ❌ Lỗi embedding product {i}: {str(e)}")
-            import traceback
-            if i <= 3:  # Print full traceback for first 3 errors
-                traceback.print_exc()
-            continue
+        # Insert to Qdrant theo batch - gọi hàm từ insert_qdrant.py
+        print(f"  ⏳ Inserting {len(items)} embeddings to Qdrant...")
+        products_with_embedding = insert_products_to_qdrant_products(items, user_id, collection_name)
+    
+    except Exception as e:
+        products_failed = len(to_embed) - products_with_embedding
+        print(f"  ❌ Lỗi embedding products: {str(e)}")
+        import traceback
+        traceback.print_exc()
     
     embedding_time = time.time() - embedding_start
     
@@ -894,15 +881,15 @@ def import_text_document(file_path: str, user_id: str, document_name: str = None
     print("📍 BƯỚC 0: Cleanup old documents\n")
     
     try:
-        from qdrant_client import QdrantClient
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from embedding.qdrant_collections import collection_manager
         from qdrant_client.models import Filter, FieldCondition, MatchValue
         
-        qdrant = QdrantClient(url="http://localhost:6334")
+        qdrant = collection_manager.client
         collection_name = "documents"
         
         # Check if collection exists
-        collections = qdrant.get_collections().collections
-        if any(c.name == collection_name for c in collections):
+        if qdrant.collection_exists(collection_name):
             # Delete old documents của user
             try:
                 # Count existing documents
@@ -968,27 +955,19 @@ def import_text_document(file_path: str, user_id: str, document_name: str = None
     try:
         # Import embedding generator
         sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from embedding.generate_embeddings import generate_embedding
-        from qdrant_client import QdrantClient
-        from qdrant_client.models import Distance, VectorParams, PointStruct
+        from embedding.generate_embeddings import generate_embeddings
+        from embedding.qdrant_collections import collection_manager
+        from qdrant_client.models import PointStruct
+        from env import env
         import uuid
         
-        # Initialize Qdrant client (port 6334)
-        qdrant = QdrantClient(url="http://localhost:6334")
+        qdrant = collection_manager.client
         collection_name = "documents"  # Collection chung cho tất cả documents
         
-        # Create collection if not exists 
-        # Gemini text-embedding-004 dimension = 768
+        # Create collection if not exists (LEN_EMBEDDING dims, schema trong embedding/qdrant_collections.py)
         try:
-            collections = qdrant.get_collections().collections
-            if not any(c.name == collection_name for c in collections):
-                qdrant.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(size=768, distance=Distance.COSINE)
-                )
-                print(f"  ✅ Created Qdrant collection: {collection_name}\n")
-            else:
-                print(f"  ✅ Using existing collection: {collection_name}\n")
+            collection_manager.ensure(collection_name)
+            print(f"  ✅ Using collection: {collection_name}\n")
         except Exception as e:
             print(f"  ⚠️ Collection check/create warning: {e}")
         
@@ -1001,23 +980,26 @@ def import_text_document(file_path: str, user_id: str, document_name: str = None
         # Generate embeddings for all chunks
         texts_for_embedding = [chunk['text'] for chunk in chunks]
         
-        embeddings = []
-        for text in texts_for_embedding:
-            emb = generate_embedding(text)
-            if emb:
-                embeddings.append(emb)
+        embeddings = generate_embeddings(texts_for_embedding)
+        
+        # Bỏ các chunks embed lỗi thay vì hủy cả document
+        failed_chunks = [chunk['chunk_id'] for chunk, emb in zip(chunks, embeddings) if emb is None]
+        if failed_chunks:
+            print(f"  ⚠️ {len(failed_chunks)} chunks embedding failed, skipped: {failed_chunks[:10]}")
         
-        if not embeddings or len(embeddings) != len(chunks):
-            print(f"  ❌ Embedding generation failed or count mismatch")
+        if len(failed_chunks) == len(chunks):
+            print(f"  ❌ Embedding generation failed")
             return 0
         
-        print(f"  ✅ Generated {len(embeddings)} embeddings\n")
+        print(f"  ✅ Generated {len(chunks) - len(failed_chunks)} embeddings\n")
         
         # Insert to Qdrant
         print(f"  ⏳ Inserting to Qdrant...")
         
         points = []
         for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+            if embedding is None:
+                continue
             point_id = str(uuid.uuid4())
             
             payload = {
@@ -1053,7 +1035,7 @@ def import_text_document(file_path: str, user_id: str, document_name: str = None
         print(f"  Collection: {collection_name}")
         print(f"  Total Chunks: {len(chunks)}")
         print(f"  Total Vectors: {len(points)}")
-        print(f"  Vector Dimension: 768")
+        print(f"  Vector Dimension: {env.LEN_EMBEDDING}")
         
         total_time = time.time() - start_time
         
@@ -0,0 +1,80 @@
+"""
+Agent Pool - Process-wide registry cho agent instances
+
+Các agent (SQLAgent, QdrantAgent, PersonalizationAgent, DocumentRetrievalAgent,
+MySelfAgent) được build 1 lần / process thay vì mỗi request:
+- autogen ConversableAgent + OpenAI client được tạo trong __init__ và dùng lại
+- QdrantClient của DocumentRetrievalAgent dùng chung connection pool
+
+An toàn khi dùng chung giữa các asyncio tasks vì agents chỉ gọi
+a_generate_reply(messages=[...]) với messages truyền vào, không ghi vào chat
+history (_oai_messages) của agent. Mọi state theo request (query, personality
+style, user_id) đều được truyền qua tham số của method.
+
+Usage:
+    from agent.agent_pool import agent_pool
+    agent = agent_pool.get(SQLAgent)
+
+    # App startup
+    agent_pool.warm_up([SQLAgent, QdrantAgent, ...])
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class AgentPool:
+    """Lazy singleton instance cho mỗi agent class"""
+
+    def __init__(self):
+        self._instances: Dict[Type, Any] = {}
+        self._build_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, agent_cls: Type[T]) -> T:
+        """Get (hoặc build lần đầu) instance dùng chung của agent_cls"""
+        instance = self._instances.get(agent_cls)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(agent_cls)
+            if instance is None:
+                start = time.perf_counter()
+                instance = agent_cls()
+                self._build_seconds[agent_cls.__name__] = time.perf_counter() - start
+                self._instances[agent_cls] = instance
+                print(f"🧩 Agent pool: built {agent_cls.__name__}")
+            return instance
+
+    def warm_up(self, agent_classes: Iterable[Type]) -> Dict[str, float]:
+        """
+        Build trước các agents lúc startup để request đầu tiên không phải chịu chi phí khởi tạo
+
+        Returns:
+            {agent_name: build seconds}
+        """
+        for agent_cls in agent_classes:
+            try:
+                self.get(agent_cls)
+            except Exception as e:
+                # Agent lỗi (vd: thiếu Qdrant) không chặn startup, sẽ build lại ở request đầu tiên
+                print(f"⚠️  Agent pool warm-up failed for {agent_cls.__name__}: {e}")
+        return dict(self._build_seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._instances.clear()
+            self._build_seconds.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "agents": sorted(cls.__name__ for cls in self._instances),
+            "build_seconds": dict(self._build_seconds),
+        }
+
+
+agent_pool = AgentPool()
@@ -0,0 +1,241 @@
+"""
+Batch Evaluation - Chạy 1 tập câu hỏi qua chat pipeline với concurrency giới hạn
+
+Input JSONL, mỗi dòng: {"user_id": "...", "chat_id": "...", "query": "..."}
+(các field khác như "id", "expected" được giữ nguyên trong output)
+
+Output JSONL, mỗi dòng 1 kết quả (theo thứ tự hoàn thành) gồm input + response,
+latency_ms, timings (thời gian từng stage từ PipelineTrace) và error; dòng cuối
+là summary (count, errors, throughput, latency percentiles).
+
+Dùng đúng run_pipeline() của /full_pipeline, mỗi câu hỏi chạy trong task riêng
+nên có trace / deadline riêng. Mỗi row giữ 1 admission slot của chat_admission
+theo user_id của row (cùng quota với /full_pipeline), bị từ chối thì chờ
+Retry-After rồi thử lại tối đa ADMISSION_ATTEMPTS lần.
+
+Run:
+    python -m agent.batch_eval data/eval.jsonl logs/eval_results.jsonl --concurrency 8
+    python -m agent.batch_eval data/eval.jsonl logs/eval_results.jsonl --no-cache
+
+API:
+    POST /api/chatbots/batch_eval?concurrency=8  (upload file JSONL, stream NDJSON)
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from agent.chat_pipeline import chat_admission, run_pipeline
+from env import env
+from utils.admission import AdmissionRejected, AdmissionTicket
+from utils.metrics import percentile
+
+router = APIRouter(prefix="/chatbots", tags=["Batch Evaluation"])
+
+REQUIRED_FIELDS = ("user_id", "chat_id", "query")
+
+# Số lần xin admission slot cho 1 row trước khi ghi lỗi
+ADMISSION_ATTEMPTS = 3
+
+
+def parse_rows(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Parse input JSONL, bỏ qua dòng trống
+
+    Dòng không hợp lệ vẫn được giữ lại với "error" để xuất hiện trong output
+    thay vì làm hỏng cả batch.
+    """
+    rows = []
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("row must be a JSON object")
+            missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+            if missing:
+                raise ValueError(f"missing fields: {', '.join(missing)}")
+            uuid.UUID(str(row["user_id"]))
+            uuid.UUID(str(row["chat_id"]))
+        except ValueError as e:
+            row = {"line": line_no, "error": f"invalid row: {e}"}
+        row.setdefault("line", line_no)
+        rows.append(row)
+    return rows
+
+
+async def _admit_row(user_id: str) -> Optional[AdmissionTicket]:
+    """Admission slot cho 1 row, bị từ chối thì chờ Retry-After rồi thử lại"""
+    if not env.ADMISSION_ENABLED:
+        return None
+    for attempt in range(1, ADMISSION_ATTEMPTS + 1):
+        try:
+            return await chat_admission.acquire(user_id)
+        except AdmissionRejected as e:
+            if attempt == ADMISSION_ATTEMPTS:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+async def _evaluate_row(row: Dict[str, Any], semaphore: asyncio.Semaphore, use_cache: bool) -> Dict[str, Any]:
+    if row.get("error"):
+        return {**row, "response": None, "latency_ms": 0.0, "timings": {}}
+
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            ticket = await _admit_row(str(row["user_id"]))
+        except AdmissionRejected as e:
+            return {
+                **row,
+                "response": None,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                "timings": {},
+                "error": f"admission rejected: {e.reason}",
+            }
+        # latency_ms chỉ tính thời gian chạy pipeline, không tính thời gian chờ slot
+        start = time.perf_counter()
+        try:
+            response_text, trace = await run_pipeline(
+                row["query"],
+                uuid.UUID(str(row["chat_id"])),
+                uuid.UUID(str(row["user_id"])),
+                use_semantic_cache=use_cache
+            )
+            summary = trace.summary()
+            return {
+                **row,
+                "response": response_text,
+                "agent": summary.get("attributes", {}).get("agent"),
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                "timings": summary,
+                "error": summary.get("attributes", {}).get("error"),
+            }
+        except Exception as e:
+            return {
+                **row,
+                "response": None,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                "timings": {},
+                "error": str(e),
+            }
+        finally:
+            if ticket is not None:
+                ticket.release()
+
+
+def _summary(results: List[Dict[str, Any]], elapsed: float, concurrency: int) -> Dict[str, Any]:
+    latencies = [r["latency_ms"] for r in results if not r.get("error")]
+    return {
+        "summary": True,
+        "count": len(results),
+        "errors": sum(1 for r in results if r.get("error")),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_qps": round(len(results) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "latency_max_ms": max(latencies) if latencies else 0.0,
+    }
+
+
+async def evaluate(
+    rows: List[Dict[str, Any]],
+    concurrency: int = env.BATCH_EVAL_CONCURRENCY,
+    use_cache: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Chạy rows qua pipeline, yield từng kết quả ngay khi xong và summary ở cuối
+
+    Args:
+        rows: Output của parse_rows()
+        concurrency: Số câu hỏi chạy đồng thời tối đa
+        use_cache: False để bỏ qua semantic answer cache
+    """
+    concurrency = max(1, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    results = []
+    tasks = [asyncio.create_task(_evaluate_row(row, semaphore, use_cache)) for row in rows]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            results.append(result)
+            yield result
+    finally:
+        # Client ngắt stream → không chạy tiếp các câu hỏi còn lại
+        for task in tasks:
+            task.cancel()
+    yield _summary(results, time.perf_counter() - start, concurrency)
+
+
+@router.post("/batch_eval")
+async def batch_eval_endpoint(
+    file: UploadFile = File(..., description="JSONL: user_id, chat_id, query mỗi dòng"),
+    concurrency: int = Query(env.BATCH_EVAL_CONCURRENCY, ge=1, description="Số câu hỏi chạy đồng thời"),
+    use_cache: bool = Query(True, description="Dùng semantic answer cache")
+):
+    """
+    Batch evaluation: stream kết quả (NDJSON) theo thứ tự hoàn thành, dòng cuối là summary
+    """
+    if concurrency > env.BATCH_EVAL_MAX_CONCURRENCY:
+        raise HTTPException(
+            status_code=400,
+            detail=f"concurrency must be <= {env.BATCH_EVAL_MAX_CONCURRENCY}"
+        )
+    try:
+        content = (await file.read()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 JSONL")
+
+    rows = parse_rows(content.splitlines())
+    if not rows:
+        raise HTTPException(status_code=400, detail="File contains no rows")
+
+    async def event_stream():
+        async for result in evaluate(rows, concurrency=concurrency, use_cache=use_cache):
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Batch evaluation cho chat pipeline")
+    parser.add_argument("input", help="Input JSONL (user_id, chat_id, query)")
+    parser.add_argument("output", help="Output JSONL")
+    parser.add_argument("--concurrency", type=int, default=env.BATCH_EVAL_CONCURRENCY)
+    parser.add_argument("--no-cache", action="store_true", help="Bỏ qua semantic answer cache")
+    args = parser.parse_args(argv)
+
+    from services.message_writer import message_writer
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        rows = parse_rows(f)
+    print(f"🚀 Batch eval: {len(rows)} rows, concurrency={args.concurrency}")
+
+    # Không chạy trong FastAPI lifespan → tự start/stop write-behind writer
+    if env.MESSAGE_WRITER_ENABLED:
+        await message_writer.start()
+    try:
+        with open(args.output, "w", encoding="utf-8") as out:
+            async for result in evaluate(rows, concurrency=args.concurrency, use_cache=not args.no_cache):
+                out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+                if result.get("summary"):
+                    print(f"✅ Done: {json.dumps(result, ensure_ascii=False)}")
+                elif result.get("error"):
+                    print(f"❌ Line {result.get('line')}: {result['error']}")
+    finally:
+        await message_writer.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,23 +1,40 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from agent.compose_history import compose_history_endpoint
+from agent.compose_history import compose_history_endpoint, note_turn, build_summary_context
 from agent.product_agent import product_agent
-from agent.myself import myself_endpoint
+from agent.myself import MySelfAgent
 from agent.recomendation_agent import chatbot_endpoint
 from agent.personalization_agent import PersonalizationAgent
-from agent.document_retrieval_agent import DocumentRetrievalAgent
+from agent.document_retrieval_agent import DocumentRetrievalAgent, NO_DOCUMENT_FOUND_MESSAGE
 from agent.personality_agent import PersonalityAgent
 from agent.faq_agent import FAQAgent
+from agent.intent_router import AGENT_LABELS, get_intent_router, alog_routing_decision
+from agent.agent_pool import agent_pool
 from models.chat import ChatbotRequest
 from models.message import CreateMessagePayload
 from services.message import MessageService
 from services.user import UserService
 from services.ai_personality import AIPersonalityService
+from services.chat_summary import ChatSummaryService
 from tool_call.helper import extract_json_query, call_agen
+from embedding.generate_embeddings import embedding_batcher
+from embedding.retrieval_context import start_retrieval_context
+from embedding.semantic_cache import semantic_cache
+from embedding.embedding_cache import embedding_cache
+from utils.cache import TTLCache, normalize_query, hash_text
+from utils.metrics import gauge, register_collector
+from utils.tracing import PipelineTrace, start_trace, span, set_trace_attribute
+from utils.singleflight import SingleFlight
+from utils.deadline import start_deadline, current_deadline, mark_degraded, with_budget
+from utils.admission import AdmissionController, AdmissionRejected, AdmissionTicket
+from utils.prompt_builder import PromptBuilder
 from autogen import ConversableAgent
 from env import env
 from db import get_db
 from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
 import json
 import re
 import uuid
@@ -71,315 +88,981 @@ manager_agent = ConversableAgent(
     human_input_mode="NEVER",
 )
 
+FAQ_THRESHOLD = 0.72  # Adjusted threshold for better matching
 
-@router.post("/full_pipeline", response_model=str)
-async def pipeline_chatbot(
-    query: str,
-    chat_id: uuid.UUID = Query(..., description="Chat session ID"),
-    user_id: uuid.UUID = Query(..., description="User ID")
-):
+# Routing decisions cache: (normalized query, hash history window) → routing_info
+routing_cache = TTLCache(maxsize=env.ROUTING_CACHE_SIZE, ttl=env.ROUTING_CACHE_TTL)
+
+ROUTING_CACHE_GAUGE = gauge(
+    "chat_routing_cache",
+    "Routing decision cache counters (size, hits, misses, evictions)",
+    ("field",),
+)
+
+
+def _collect_routing_cache_metrics():
+    stats = routing_cache.stats()
+    for field in ("size", "hits", "misses", "evictions"):
+        ROUTING_CACHE_GAUGE.set(stats[field], field=field)
+
+
+register_collector(_collect_routing_cache_metrics)
+
+# Coalesce các câu hỏi giống nhau đang xử lý đồng thời (cùng tenant, personality, history)
+answer_flight = SingleFlight("chat_answer")
+
+# Admission control: giới hạn concurrency toàn cục + theo tenant (user_id)
+chat_admission = AdmissionController(
+    "chat",
+    max_concurrency=env.ADMISSION_MAX_CONCURRENCY,
+    per_tenant_concurrency=env.ADMISSION_PER_TENANT_CONCURRENCY,
+    max_queue=env.ADMISSION_MAX_QUEUE,
+    per_tenant_queue=env.ADMISSION_PER_TENANT_QUEUE,
+    queue_timeout=env.ADMISSION_QUEUE_TIMEOUT,
+)
+
+# Agents nhận personality style trong system message (PERSONALITY_MODE=inline),
+# các agent còn lại trả lời bằng template/JSON nên vẫn dùng 2-pass rewrite
+INLINE_PERSONALITY_AGENTS = ("MySelf", "DocumentRetrievalAgent")
+
+# Câu trả lời phụ thuộc lịch sử chat → không đưa vào semantic cache
+# (semantic cache cũng chỉ dùng cho lượt chat chưa có history)
+CONTEXTUAL_AGENTS = ("PersonalizationAgent",)
+
+# Mở đầu các error messages của agents / call_agen → không bao giờ cache
+ERROR_RESPONSE_PREFIXES = ("Đã xảy ra lỗi", "Xin lỗi, đã có lỗi xảy ra")
+
+ERROR_MESSAGE = "Xin lỗi, đã có lỗi xảy ra. Vui lòng thử lại sau."
+
+PRODUCT_NOT_FOUND_MESSAGE = """Rất tiếc, hiện tại chúng tôi không có sản phẩm bạn đang tìm kiếm.
+
+Bạn có thể:
+- Mô tả chi tiết hơn về sản phẩm bạn cần
+- Thử tìm kiếm với từ khóa khác
+- Xem các danh mục sản phẩm của chúng tôi
+
+Tôi luôn sẵn sàng hỗ trợ bạn! 💪"""
+
+# Fallback khi agent không trả lời kịp trong budget
+TIMEOUT_MESSAGE = """Xin lỗi, hệ thống đang bận nên tôi chưa thể trả lời đầy đủ câu hỏi của bạn lúc này.
+
+Bạn vui lòng thử lại sau ít phút hoặc diễn đạt câu hỏi ngắn gọn hơn nhé! 🙏"""
+
+
+def _load_user_personality(user_id: uuid.UUID) -> Tuple[Optional[PersonalityAgent], Optional[str]]:
     """
-    Pipeline đầy đủ với history context, personality, và routing thông minh
-    
-    Args:
-        query: Câu hỏi của người dùng
-        chat_id: ID của chat session (must be valid UUID)
-        user_id: ID của người dùng (must be valid UUID)
-    
-    Features:
-        - Personality support: Sử dụng personality của user nếu có
-        - History context: Nhớ lịch sử trò chuyện
-        - Smart routing: Chọn agent phù hợp
+    Lấy personality của user từ DB
+
+    Returns:
+        (PersonalityAgent, personality_name) nếu user có personality,
+        (None, None) nếu dùng default
     """
+    print(f"👤 Loading user personality...")
+    user_personality = None
+    user_personality_name = None
+
     try:
-        chat_uuid = chat_id
-        user_uuid = user_id
-        messageservice = MessageService()
-        
-        # [0] LẤY PERSONALITY CỦA USER
-        print(f"👤 Loading user personality...")
-        user_personality = None
-        user_personality_name = None
-        company_name = "NAVITECH"
-        agent_name = "trợ lý AI"
-        
-        try:
-            from db import SessionLocal
-            session = SessionLocal()
-            
-            # Lấy user
-            from models.user import UserTable
-            user = session.query(UserTable).filter(UserTable.id == user_id).first()
-            
-            if user and user.ai_personality_id:
-                # Lấy personality details
-                personality = session.query(AIPersonalityService).filter(
-                    AIPersonalityService.id == user.ai_personality_id
-                ).first()
-                
-                if personality:
-                    user_personality = PersonalityAgent(
-                        company_name=personality.company_name or "NAVITECH",
-                        agent_name=personality.agent_name or "trợ lý AI"
-                    )
-                    user_personality_name = personality.name
-                    company_name = personality.company_name or "NAVITECH"
-                    agent_name = personality.agent_name or "trợ lý AI"
-                    print(f"✅ Personality loaded: {user_personality_name} ({agent_name})")
-            else:
-                print(f"ℹ️  No personality set for user, using default")
-        except Exception as e:
-            print(f"⚠️  Error loading personality: {e}")
-            pass
-        finally:
-            if 'session' in locals():
-                session.close()
-        
-        # [1] Lưu tin nhắn người dùng vào DB
-        user_message_payload = CreateMessagePayload(
-            chat_id=chat_id, 
-            role="user", 
-            content=query
+        # Resolved config được cache theo user (invalidate khi đổi personality)
+        personality = AIPersonalityService.get_user_personality_config(user_id)
+
+        if personality:
+            user_personality = PersonalityAgent(
+                company_name=personality["company_name"],
+                agent_name=personality["agent_name"]
+            )
+            user_personality_name = personality["name"]
+            print(f"✅ Personality loaded: {user_personality_name} ({user_personality.agent_name})")
+        else:
+            print(f"ℹ️  No personality set for user, using default")
+    except Exception as e:
+        print(f"⚠️  Error loading personality: {e}")
+
+    return user_personality, user_personality_name
+
+
+def _build_history_context(history: list, summary_context: str = "") -> str:
+    """
+    Format rolling summary + lịch sử gần đây (trừ tin nhắn hiện tại) thành context cho Manager Agent
+
+    Summary và tin nhắn nằm trong token budget riêng, tin nhắn mới nhất được giữ trước
+    """
+    history_lines = []
+    for msg in history[:-1][-5:]:
+        role_label = "Người dùng" if msg.role == "user" else "Trợ lý"
+        history_lines.append(f"{role_label}: {msg.content}")
+
+    builder = PromptBuilder("routing_history")
+    builder.section(
+        "summary", [summary_context] if summary_context else [],
+        budget=env.PROMPT_SUMMARY_TOKENS, priority=1
+    )
+    builder.section(
+        "history", history_lines, budget=env.PROMPT_HISTORY_TOKENS,
+        values=range(len(history_lines))
+    )
+    history_context = builder.build()
+    if not history_context:
+        return ""
+    print(f"📜 History context: {history_context[:200]}...")
+    return history_context
+
+
+def _build_routing_prompt(query: str, history_context: str) -> str:
+    """Tạo enhanced prompt (kèm lịch sử nếu có) cho Manager Agent"""
+    if history_context:
+        return f"""
+Lịch sử trò chuyện gần đây:
+{history_context}
+
+Câu hỏi hiện tại: {query}
+
+Hãy phân tích và quyết định agent phù hợp.
+"""
+    return f"Câu hỏi: {query}"
+
+
+def _is_valid_route(routing_info) -> bool:
+    """Decision parse được: agent hợp lệ và có query"""
+    return (
+        isinstance(routing_info, dict)
+        and routing_info.get("agent") in AGENT_LABELS
+        and isinstance(routing_info.get("query"), str)
+        and bool(routing_info["query"].strip())
+    )
+
+
+async def _route_query(enhanced_prompt: str, query: str) -> dict:
+    """
+    Gọi Manager Agent và trích xuất routing decision
+
+    Returns:
+        Dict {"agent": ..., "query": ...} từ extract_json_query, hoặc
+        {"agent": "MySelf", "query": query, "fallback": True} nếu không parse được
+    """
+    manager_response = await manager_agent.a_generate_reply(
+        messages=[{"role": "user", "content": enhanced_prompt}]
+    )
+    print(f"🎯 Manager decision: {manager_response}")
+
+    # Handle both dict (autogen) and string (direct response) formats
+    if isinstance(manager_response, dict):
+        response_content = manager_response.get('content', str(manager_response))
+    else:
+        response_content = str(manager_response)
+
+    routing_info = extract_json_query(response_content)
+    if not _is_valid_route(routing_info):
+        print("⚠️  Unparseable manager decision, routing to MySelf")
+        return {"agent": "MySelf", "query": query, "fallback": True}
+    return routing_info
+
+
+async def _decide_route(query: str, history_context: str) -> dict:
+    """
+    Routing decision theo thứ tự:
+    1. Routing cache (cùng câu hỏi đã chuẩn hóa + cùng history window)
+    2. Local IntentRouter cho các case chắc chắn
+    3. Manager Agent LLM khi router không đủ tự tin
+    """
+    with span("routing") as attributes:
+        cache_key = (normalize_query(query), hash_text(history_context))
+        cached = routing_cache.get(cache_key)
+        if cached is not None:
+            print(f"♻️  Routing cache hit: {cached.get('agent')}")
+            attributes["source"] = "cache"
+            return dict(cached)
+
+        routing_info = None
+        intent_router = get_intent_router()
+        if intent_router is not None:
+            try:
+                routing_info = await intent_router.aroute(query, has_history=bool(history_context))
+                if routing_info:
+                    print(f"🧭 Local router decision: {routing_info['agent']} (score={routing_info['score']:.3f})")
+                    await alog_routing_decision(query, routing_info["agent"], "local", routing_info["score"])
+                    attributes["source"] = "local"
+            except Exception as e:
+                print(f"⚠️  Local router error: {e}")
+
+        if not routing_info:
+            routing_info = await _route_query(_build_routing_prompt(query, history_context), query)
+            attributes["source"] = "llm"
+            # Decision không parse được: không cache, không dùng làm training example
+            if routing_info.get("fallback"):
+                attributes["source"] = "llm_fallback"
+                return routing_info
+            await alog_routing_decision(query, routing_info["agent"], "llm")
+
+        routing_cache.set(cache_key, dict(routing_info))
+        return routing_info
+
+
+async def _await_route(query: str, history_context: str, routing_task: Optional[asyncio.Task] = None) -> dict:
+    """
+    Routing decision trong budget (dùng speculative task nếu đã start),
+    quá hạn thì route về MySelf
+    """
+    return await with_budget(
+        routing_task if routing_task is not None else _decide_route(query, history_context),
+        "routing",
+        env.PIPELINE_ROUTING_BUDGET,
+        fallback=lambda: {"agent": "MySelf", "query": query, "fallback": True}
+    )
+
+
+async def _search_faq(query: str, user_id: uuid.UUID):
+    """
+    FAQ pre-check (async embedding, Qdrant query trong thread pool)
+    """
+    faq_agent = FAQAgent(threshold=FAQ_THRESHOLD)
+    return await faq_agent.asearch_faq(
+        query=query,
+        user_id=user_id,
+        threshold=FAQ_THRESHOLD
+    )
+
+
+async def _check_faq(query: str, user_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+    """
+    FAQ pre-check, trả về FAQ result nếu match, None nếu không match hoặc lỗi
+    """
+    print(f"\n{'='*60}")
+    print(f"🔍 CHECKING FAQ DATABASE...")
+    print(f"{'='*60}")
+
+    try:
+        with span("faq"):
+            # Hết budget → coi như không match FAQ
+            faq_result = await with_budget(
+                _search_faq(query, user_id), "faq", env.PIPELINE_FAQ_BUDGET, fallback=None
+            )
+        if faq_result and faq_result.get("matched"):
+            print(f"✅✅✅ FAQ MATCHED! Returning direct answer")
+            print(f"   Score: {faq_result['score']:.3f}")
+            print(f"   FAQ ID: {faq_result['faq_id']}")
+            return faq_result
+
+        print(f"⚠️  No FAQ matched (score below {FAQ_THRESHOLD})")
+        print(f"   Fallback to normal agent routing...")
+    except Exception as faq_error:
+        print(f"⚠️  FAQ check error: {faq_error}")
+        print(f"   Continuing with normal flow...")
+    finally:
+        print(f"{'='*60}\n")
+
+    return None
+
+
+async def _apply_personality(
+    user_personality: Optional[PersonalityAgent],
+    personality_name: Optional[str],
+    response_text: str
+) -> str:
+    """Rewrite response theo personality của user (giữ nguyên nếu lỗi)"""
+    if not (user_personality and personality_name):
+        return response_text
+
+    print(f"🎨 Applying personality: {personality_name}")
+    try:
+        with span("personality_rewrite", personality=personality_name):
+            # Hết budget → bỏ qua rewrite, trả response gốc
+            result = await with_budget(
+                user_personality.apply_personality_async(response_text, personality_name),
+                "personality_rewrite",
+                env.PIPELINE_PERSONALITY_BUDGET,
+                fallback={"styled_response": response_text}
+            )
+        # PersonalityAgent tự bắt lỗi LLM và trả text gốc kèm "error"
+        # → rewrite thất bại, chưa có style → không được cache
+        not_applied = (
+            result.get("personality_applied") is False
+            and personality_name.lower().strip() != "bình_thường"
         )
-        messageservice.create_message(user_message_payload)
-        print(f"✅ Saved user message to DB")
-        
-        # [2] Lấy lịch sử trò chuyện gần đây
-        history = messageservice.get_recent_messages(chat_id, limit=10)
-        history_context = ""
-        
-        if len(history) > 1:
-            history_summary = []
-            for msg in history[:-1]:
-                role_label = "Người dùng" if msg.role == "user" else "Trợ lý"
-                history_summary.append(f"{role_label}: {msg.content}")
-            
-            history_context = "\n".join(history_summary[-5:])
-            print(f"📜 History context: {history_context[:200]}...")
-        
+        if result.get("error") or not_applied:
+            print(f"⚠️  Personality rewrite failed: {result.get('error', 'not applied')}")
+            mark_degraded("personality_rewrite")
+            return response_text
+        print(f"✅ Response personality-adjusted")
+        return result["styled_response"]
+    except Exception as e:
+        print(f"⚠️  Error applying personality: {e}")
+        # Continue với response original nếu có lỗi (chưa có style → không cache)
+        mark_degraded("personality_rewrite")
+        return response_text
+
+
+def _style_instruction(
+    user_personality: Optional[PersonalityAgent],
+    personality_name: Optional[str],
+    agent_name: str
+) -> Optional[str]:
+    """
+    Personality style để agent trả lời trực tiếp theo phong cách (1 lần gọi LLM)
+
+    Returns None nếu PERSONALITY_MODE=rewrite, không có personality, hoặc agent
+    không hỗ trợ inline → response sẽ đi qua _apply_personality như cũ
+    """
+    if env.PERSONALITY_MODE != "inline" or agent_name not in INLINE_PERSONALITY_AGENTS:
+        return None
+    if not (user_personality and personality_name):
+        return None
+    return user_personality.build_style_instruction(personality_name)
+
+
+def _format_product_list(products: List[Dict[str, Any]]) -> str:
+    """Danh sách sản phẩm dạng text thô (fallback khi agent không kịp viết câu trả lời)"""
+    lines = []
+    for i, product in enumerate(products[:5], 1):
+        line = f"{i}. **{product.get('title', 'N/A')}**"
+        if product.get('brand'):
+            line += f" ({product['brand']})"
+        price = product.get('price')
+        if price is not None:
+            line += f" - {price:,.0f} VND" if isinstance(price, (int, float)) else f" - {price} VND"
+        lines.append(line)
+    return "Đây là các sản phẩm phù hợp mà tôi tìm được:\n\n" + "\n".join(lines)
+
+
+def _agent_fallback() -> Dict[str, Any]:
+    """
+    Fallback khi agent vượt budget: danh sách sản phẩm thô nếu agent đã kịp
+    tìm được sản phẩm (record_partial), ngược lại trả template answer
+    """
+    deadline = current_deadline()
+    products = deadline.partial.get("products") if deadline is not None else None
+    if products:
+        return {"response": _format_product_list(products), "products": products, "degraded": True}
+    return {"response": TIMEOUT_MESSAGE, "products": None, "degraded": True}
+
+
+def _is_degraded() -> bool:
+    """Request hiện tại đã có stage dùng fallback (routing, agent, personality rewrite...)"""
+    deadline = current_deadline()
+    return deadline is not None and bool(deadline.degraded)
+
+
+def _is_cacheable_response(response_text: str) -> bool:
+    """Câu trả lời của agent không phải error / fallback message"""
+    if response_text in (
+        ERROR_MESSAGE, TIMEOUT_MESSAGE, PRODUCT_NOT_FOUND_MESSAGE, NO_DOCUMENT_FOUND_MESSAGE
+    ):
+        return False
+    return not response_text.lstrip().startswith(ERROR_RESPONSE_PREFIXES)
+
+
+def _history_to_dicts(history: list) -> List[Dict[str, str]]:
+    """Convert 5 tin nhắn gần nhất sang dict format cho PersonalizationAgent"""
+    return [{"role": msg.role, "content": msg.content} for msg in history[-5:]]
+
+
+async def _run_agent(
+    agent_name: str,
+    agent_query: str,
+    chat_id: uuid.UUID,
+    user_id: uuid.UUID,
+    history: list,
+    style_instruction: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Execute specialized agent theo routing decision
+
+    Args:
+        style_instruction: Personality style chèn vào system message (inline mode)
+
+    Returns:
+        {"response": str, "products": List[Dict] | None, "styled": bool}
+    """
+    with span("agent", agent=agent_name, inline_personality=bool(style_instruction)) as attributes:
+        result = await with_budget(
+            _dispatch_agent(agent_name, agent_query, chat_id, user_id, history, style_instruction),
+            "agent",
+            env.PIPELINE_AGENT_BUDGET,
+            fallback=_agent_fallback
+        )
+        attributes["degraded"] = result.get("degraded", False)
+    # Fallback (template / danh sách thô) chưa có personality style
+    result["styled"] = bool(style_instruction) and not result.get("degraded", False)
+    return result
+
+
+async def _dispatch_agent(
+    agent_name: str,
+    agent_query: str,
+    chat_id: uuid.UUID,
+    user_id: uuid.UUID,
+    history: list,
+    style_instruction: Optional[str] = None
+) -> Dict[str, Any]:
+    request = ChatbotRequest(chat_id=chat_id, message=agent_query)
+    products = None
+
+    if agent_name == "ProductAgent":
+        chatbot_response = await product_agent(agent_query)
+
+        # ProductAgent trả về dict, lấy response
+        if isinstance(chatbot_response, dict):
+            response_text = chatbot_response.get('response', str(chatbot_response))
+            products = chatbot_response.get('products', [])
+
+            # ✨ Nếu không tìm được sản phẩm nào, chuyển sang RecommendationAgent
+            if not products or len(products) == 0:
+                print(f"⚠️ ProductAgent không tìm thấy sản phẩm, chuyển sang RecommendationAgent")
+
+                try:
+                    # Gọi RecommendationAgent để tìm sản phẩm tương tự
+                    recommendation_response = await chatbot_endpoint(request, user_id=user_id)
+
+                    # Tạo message thông báo + gợi ý
+                    response_text = f"""{recommendation_response}"""
+
+                    print(f"✅ Fallback to RecommendationAgent successful")
+                except Exception as fallback_error:
+                    print(f"❌ Fallback to RecommendationAgent failed: {str(fallback_error)}")
+                    response_text = PRODUCT_NOT_FOUND_MESSAGE
+        else:
+            response_text = str(chatbot_response)
+
+    elif agent_name == "RecommendationAgent":
+        chatbot_response = await chatbot_endpoint(request, user_id=user_id)
+        response_text = str(chatbot_response)
+
+    elif agent_name == "PersonalizationAgent":
+        # PersonalizationAgent cần context từ lịch sử
+        print(f"🎨 PersonalizationAgent - Analyzing with context")
+
+        # Extract previous products from history if available
+        previous_products = []
+        for msg in history[-5:]:  # Last 5 messages
+            if msg.role == "assistant" and ("VND" in msg.content or "sản phẩm" in msg.content):
+                # Try to extract product info from previous response
+                # This is a simple extraction, có thể improve bằng regex
+                pass  # TODO: Extract products properly
+
+        personalization_agent = agent_pool.get(PersonalizationAgent)
+        chatbot_response = await personalization_agent.process_query(
+            query=agent_query,
+            previous_products=previous_products,
+            conversation_history=_history_to_dicts(history)
+        )
+        response_text = str(chatbot_response)
+
+    elif agent_name == "DocumentRetrievalAgent":
+        # DocumentRetrievalAgent tìm kiếm trong knowledge base
+        print(f"📚 DocumentRetrievalAgent - Searching knowledge base")
+
+        document_agent = agent_pool.get(DocumentRetrievalAgent)
+        chatbot_response = await document_agent.process_query(
+            query=agent_query,
+            user_id=user_id,
+            top_k=5,  # Retrieve top 5 relevant chunks
+            style_instruction=style_instruction
+        )
+        response_text = str(chatbot_response)
+
+    else:  # MySelf
+        chatbot_response = await agent_pool.get(MySelfAgent).process_query(agent_query, style_instruction)
+        if isinstance(chatbot_response, dict):
+            chatbot_response = chatbot_response.get('content', str(chatbot_response))
+        response_text = str(chatbot_response)
+
+    print(f"💬 Chatbot response: {response_text[:200]}...")
+    return {"response": response_text, "products": products}
+
+
+def _save_message(messageservice: MessageService, chat_id: uuid.UUID, role: str, content: str):
+    """Lưu 1 tin nhắn vào DB (qua write-behind queue)"""
+    payload = CreateMessagePayload(
+        chat_id=chat_id,
+        role=role,
+        content=content
+    )
+    with span("create_message", role=role):
+        messageservice.enqueue_message(payload)
+    print(f"✅ Queued {role} message for DB")
+    if role == "assistant":
+        # Cập nhật rolling summary ở background mỗi N lượt
+        note_turn(chat_id)
+
+
+async def _load_history(messageservice: MessageService, chat_id: uuid.UUID):
+    """
+    Lấy k tin nhắn gần nhất + rolling summary của chat làm history context cho routing
+
+    Số tin nhắn đọc / gửi đi cố định (CHAT_HISTORY_WINDOW), phần cũ hơn nằm trong summary.
+    SQL reads chạy trong thread pool để không block event loop
+    """
+    with span("history"):
+        history = await asyncio.to_thread(
+            messageservice.get_recent_messages, chat_id, env.CHAT_HISTORY_WINDOW
+        )
+        summary = None
+        if env.CHAT_SUMMARY_ENABLED:
+            summary = await asyncio.to_thread(ChatSummaryService.get_summary, chat_id)
+    return history, _build_history_context(history, build_summary_context(summary))
+
+
+def _load_user_personality_traced(user_id: uuid.UUID):
+    with span("personality"):
+        return _load_user_personality(user_id)
+
+
+async def _answer_query(
+    query: str,
+    chat_id: uuid.UUID,
+    user_id: uuid.UUID,
+    history: list,
+    history_context: str,
+    user_personality: Optional[PersonalityAgent],
+    user_personality_name: Optional[str]
+) -> Dict[str, str]:
+    """
+    Sinh câu trả lời: FAQ pre-check → routing → agent → personality
+
+    Không đọc/ghi DB theo chat_id nên kết quả dùng chung được giữa các chat
+    có cùng câu hỏi (xem answer_flight)
+
+    Returns:
+        {"response": str, "agent": str, "cacheable": bool} - cacheable: được lưu
+        vào semantic cache (không phải error / fallback, không degraded, không phụ
+        thuộc history)
+    """
+    routing_task = None
+    try:
         # ========================================
         # [2.5] 🆕 FAQ PRE-CHECK (MỚI)
         # Check FAQ trước khi routing đến các agents khác
         # Nếu match FAQ với score >= threshold → Trả lời trực tiếp
         # Nếu không match → Fallback về flow bình thường
+        #
+        # Speculative mode: Manager routing được start song song với FAQ search,
+        # nếu FAQ match thì routing task bị cancel và kết quả bị bỏ qua
         # ========================================
-        print(f"\n{'='*60}")
-        print(f"🔍 CHECKING FAQ DATABASE...")
-        print(f"{'='*60}")
-        
-        try:
-            faq_agent = FAQAgent(threshold=0.72)  # Adjusted threshold for better matching
-            faq_result = faq_agent.search_faq(
-                query=query,
-                user_id=user_id,
-                threshold=0.72
+        if env.PIPELINE_SPECULATIVE_ROUTING:
+            routing_task = asyncio.create_task(_decide_route(query, history_context))
+            print(f"⚡ Speculative routing started in parallel with FAQ check")
+
+        faq_result = await _check_faq(query, user_id)
+        if faq_result:
+            if routing_task is not None:
+                routing_task.cancel()
+                print(f"⚡ Speculative routing discarded")
+            set_trace_attribute("agent", "FAQ")
+
+            # Apply personality nếu có, return FAQ answer trực tiếp (không cần routing)
+            response_text = await _apply_personality(
+                user_personality, user_personality_name, faq_result["answer"]
             )
-            
-            # Nếu FAQ matched
-            if faq_result and faq_result.get("matched"):
-                print(f"✅✅✅ FAQ MATCHED! Returning direct answer")
-                print(f"   Score: {faq_result['score']:.3f}")
-                print(f"   FAQ ID: {faq_result['faq_id']}")
-                
-                response_text = faq_result["answer"]
-                
-                # Apply personality nếu có
-                if user_personality and user_personality_name:
-                    print(f"🎨 Applying personality to FAQ answer: {user_personality_name}")
-                    try:
-                        response_text = user_personality.rewrite_response(
-                            response=response_text,
-                            personality_name=user_personality_name
-                        )
-                    except Exception as e:
-                        print(f"⚠️  Error applying personality: {e}")
-                
-                # Lưu response vào DB
-                assistant_message_payload = CreateMessagePayload(
-                    chat_id=chat_id,
-                    role="assistant",
-                    content=response_text
-                )
-                messageservice.create_message(assistant_message_payload)
-                print(f"✅ FAQ response saved to DB")
-                
-                # Return FAQ answer trực tiếp (không cần routing)
-                return response_text
-            
-            else:
-                print(f"⚠️  No FAQ matched (score below 0.85)")
-                print(f"   Fallback to normal agent routing...")
-        
-        except Exception as faq_error:
-            print(f"⚠️  FAQ check error: {faq_error}")
-            print(f"   Continuing with normal flow...")
-        
-        print(f"{'='*60}\n")
-        
+            return {"response": response_text, "agent": "FAQ", "cacheable": not _is_degraded()}
+
         # ========================================
         # FALLBACK: Normal flow nếu FAQ không match
         # ========================================
-        
-        # [3] Tạo enhanced query với context
-        if history_context:
-            enhanced_prompt = f"""
-Lịch sử trò chuyện gần đây:
-{history_context}
-
-Câu hỏi hiện tại: {query}
 
-Hãy phân tích và quyết định agent phù hợp.
-"""
-        else:
-            enhanced_prompt = f"Câu hỏi: {query}"
-        
-        # [4] Manager Agent quyết định routing
-        manager_response = await manager_agent.a_generate_reply(
-            messages=[{"role": "user", "content": enhanced_prompt}]
-        )
-        print(f"🎯 Manager decision: {manager_response}")
-        
-        # [5] Extract routing decision
-        # Handle both dict (autogen) and string (direct response) formats
-        if isinstance(manager_response, dict):
-            response_content = manager_response.get('content', str(manager_response))
-        else:
-            response_content = str(manager_response)
-        
-        routing_info = extract_json_query(response_content)
+        # [3] - [5] Routing cache / local router / Manager Agent quyết định routing
+        routing_info = await _await_route(query, history_context, routing_task)
         agent_name = routing_info.get('agent', 'MySelf')
         agent_query = routing_info.get('query', query)
-        
+        # Label agent cho các span sau routing (agent / personality_rewrite)
+        set_trace_attribute("agent", agent_name)
+
         print(f"🤖 Selected agent: {agent_name}")
         print(f"📝 Agent query: {agent_query}")
-        
-        # [6] Execute specialized agent
-        request = ChatbotRequest(chat_id=chat_id, message=agent_query)
-        
-        if agent_name == "ProductAgent":
-            chatbot_response = await product_agent(agent_query)
-            
-            # ProductAgent trả về dict, lấy response
-            if isinstance(chatbot_response, dict):
-                response_text = chatbot_response.get('response', str(chatbot_response))
-                products = chatbot_response.get('products', [])
-                
-                # ✨ Nếu không tìm được sản phẩm nào, chuyển sang RecommendationAgent
-                if not products or len(products) == 0:
-                    print(f"⚠️ ProductAgent không tìm thấy sản phẩm, chuyển sang RecommendationAgent")
-                    
-                    try:
-                        # Gọi RecommendationAgent để tìm sản phẩm tương tự
-                        recommendation_response = await chatbot_endpoint(request, user_id=user_id)
-                        
-                        # Tạo message thông báo + gợi ý
-                        response_text = f"""{recommendation_response}"""
-                        
-                        print(f"✅ Fallback to RecommendationAgent successful")
-                    except Exception as fallback_error:
-                        print(f"❌ Fallback to RecommendationAgent failed: {str(fallback_error)}")
-                        response_text = """Rất tiếc, hiện tại chúng tôi không có sản phẩm bạn đang tìm kiếm.
 
-Bạn có thể:
-- Mô tả chi tiết hơn về sản phẩm bạn cần
-- Thử tìm kiếm với từ khóa khác
-- Xem các danh mục sản phẩm của chúng tôi
+        # [6] Execute specialized agent (inline personality nếu agent hỗ trợ)
+        style_instruction = _style_instruction(user_personality, user_personality_name, agent_name)
+        agent_result = await _run_agent(
+            agent_name, agent_query, chat_id, user_id, history, style_instruction
+        )
 
-Tôi luôn sẵn sàng hỗ trợ bạn! 💪"""
-            else:
-                response_text = str(chatbot_response)
-                
-        elif agent_name == "RecommendationAgent":
-            chatbot_response = await chatbot_endpoint(request, user_id=user_id)
-            response_text = str(chatbot_response)
-        
-        elif agent_name == "PersonalizationAgent":
-            # PersonalizationAgent cần context từ lịch sử
-            print(f"🎨 PersonalizationAgent - Analyzing with context")
-            
-            # Extract previous products from history if available
-            previous_products = []
-            for msg in history[-5:]:  # Last 5 messages
-                if msg.role == "assistant" and ("VND" in msg.content or "sản phẩm" in msg.content):
-                    # Try to extract product info from previous response
-                    # This is a simple extraction, có thể improve bằng regex
-                    pass  # TODO: Extract products properly
-            
-            # Convert history to dict format
-            history_dicts = []
-            for msg in history[-5:]:
-                history_dicts.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
-            
-            personalization_agent = PersonalizationAgent()
-            chatbot_response = await personalization_agent.process_query(
-                query=agent_query,
-                previous_products=previous_products,
-                conversation_history=history_dicts
-            )
-            response_text = str(chatbot_response)
-        
-        elif agent_name == "DocumentRetrievalAgent":
-            # DocumentRetrievalAgent tìm kiếm trong knowledge base
-            print(f"📚 DocumentRetrievalAgent - Searching knowledge base")
-            
-            document_agent = DocumentRetrievalAgent()
-            chatbot_response = await document_agent.process_query(
-                query=agent_query,
-                user_id=user_id,
-                top_k=5  # Retrieve top 5 relevant chunks
-            )
-            response_text = str(chatbot_response)
-            
-        else:  # MySelf
-            chatbot_response = await myself_endpoint(request)
-            response_text = str(chatbot_response)
-        
-        print(f"💬 Chatbot response: {response_text[:200]}...")
-        
         # [7] ✨ XỬ LÝ PERSONALITY - Rewrite response nếu user có personality riêng
-        if user_personality and user_personality_name:
-            print(f"🎨 Applying personality: {user_personality_name}")
-            try:
-                response_text = user_personality.rewrite_response(
-                    response=response_text,
-                    personality_name=user_personality_name
+        # và agent chưa trả lời theo phong cách (rewrite mode / agent không hỗ trợ inline)
+        if agent_result["styled"]:
+            response_text = agent_result["response"]
+        else:
+            response_text = await _apply_personality(
+                user_personality, user_personality_name, agent_result["response"]
+            )
+        # Kiểm tra trên response gốc của agent (trước personality rewrite)
+        cacheable = (
+            agent_name not in CONTEXTUAL_AGENTS
+            and not routing_info.get("fallback")
+            and not agent_result.get("degraded")
+            and not _is_degraded()
+            and _is_cacheable_response(agent_result["response"])
+        )
+        return {"response": response_text, "agent": agent_name, "cacheable": cacheable}
+    finally:
+        # Không để speculative routing chạy tiếp khi pipeline đã kết thúc
+        if routing_task is not None and not routing_task.done():
+            routing_task.cancel()
+
+
+async def run_pipeline(
+    query: str,
+    chat_id: uuid.UUID,
+    user_id: uuid.UUID,
+    use_semantic_cache: bool = True
+) -> Tuple[str, PipelineTrace]:
+    """
+    Chạy full pipeline cho 1 câu hỏi (dùng chung bởi /full_pipeline và batch evaluation)
+
+    Args:
+        use_semantic_cache: False để luôn tính lại câu trả lời (evaluation)
+
+    Returns:
+        (response_text, trace) - trace chứa timings của từng stage
+    """
+    trace = start_trace(tenant=str(user_id), chat_id=str(chat_id))
+    deadline = start_deadline(env.PIPELINE_DEADLINE_SECONDS)
+    # Query vector tính 1 lần, dùng chung cho semantic cache / router / FAQ / agents
+    retrieval = start_retrieval_context(query)
+    messageservice = MessageService()
+    try:
+        # [0] LẤY PERSONALITY CỦA USER
+        user_personality, user_personality_name = _load_user_personality_traced(user_id)
+
+        # [1] Lưu tin nhắn người dùng vào DB
+        _save_message(messageservice, chat_id, "user", query)
+
+        # [2] Lấy lịch sử trò chuyện gần đây
+        history, history_context = await _load_history(messageservice, chat_id)
+
+        # [2.2] Semantic cache: câu hỏi tương tự đã được trả lời cho cùng tenant + personality
+        # Chỉ cho lượt chat chưa có history: follow-up ("cái thứ hai thì sao?") phụ thuộc
+        # hội thoại nên không được trả câu trả lời của hội thoại khác
+        tenant = str(user_id)
+        personality_key = user_personality_name or ""
+        cache_vector = None
+        if env.SEMANTIC_CACHE_ENABLED and use_semantic_cache and not history_context:
+            with span("semantic_cache") as attributes:
+                data_version = semantic_cache.data_version(tenant)
+                cache_vector = await with_budget(
+                    retrieval.vector(query), "semantic_cache", env.PIPELINE_CACHE_BUDGET
                 )
-                print(f"✅ Response personality-adjusted")
-            except Exception as e:
-                print(f"⚠️  Error applying personality: {e}")
-                # Continue với response original nếu có lỗi
-        
-        # [8] Lưu phản hồi của chatbot vào DB
-        assistant_message_payload = CreateMessagePayload(
-            chat_id=chat_id, 
-            role="assistant", 
-            content=response_text
+                cached = None
+                if cache_vector is not None:
+                    cached = semantic_cache.lookup(tenant, personality_key, cache_vector)
+                attributes["hit"] = cached is not None
+            if cached:
+                print(f"♻️  Semantic cache hit (score={cached['score']:.3f}): {cached['query'][:80]}")
+                trace.set_attribute("agent", "SemanticCache")
+                _save_message(messageservice, chat_id, "assistant", cached["response"])
+                return cached["response"], trace
+
+        # [2.5] - [7] FAQ / routing / agent / personality
+        # Các request đồng thời cùng tenant + câu hỏi + personality + history window
+        # dùng chung 1 computation, mỗi chat vẫn lưu tin nhắn của riêng mình
+        compute = lambda: _answer_query(
+            query, chat_id, user_id, history, history_context,
+            user_personality, user_personality_name
         )
-        messageservice.create_message(assistant_message_payload)
-        print(f"✅ Saved assistant message to DB")
-        
-        return response_text
-        
+        if env.PIPELINE_SINGLEFLIGHT:
+            flight_key = (
+                str(user_id),
+                normalize_query(query),
+                user_personality_name or "",
+                hash_text(history_context)
+            )
+            with span("answer", singleflight=True) as attributes:
+                answer, shared = await answer_flight.do(flight_key, compute)
+                attributes["shared"] = shared
+                attributes["agent"] = answer["agent"]
+            if shared:
+                print(f"🔗 Single-flight: reused in-flight answer for identical question")
+        else:
+            answer, shared = await compute(), False
+        trace.set_attribute("agent", answer["agent"])
+        response_text = answer["response"]
+
+        # Câu trả lời degraded (fallback / bỏ qua personality rewrite) không được cache;
+        # single-flight followers dùng lại câu trả lời của leader → chỉ leader ghi cache
+        if cache_vector is not None and answer["cacheable"] and not shared and not deadline.degraded:
+            semantic_cache.store(
+                tenant, personality_key, query, cache_vector,
+                response_text, answer["agent"], data_version
+            )
+
+        # [8] Lưu phản hồi của chatbot vào DB
+        _save_message(messageservice, chat_id, "assistant", response_text)
+
+        return response_text, trace
+
     except Exception as e:
         print(f"❌ Error in pipeline: {str(e)}")
         import traceback
         traceback.print_exc()
-        
+        trace.set_attribute("error", str(e))
+
         # Lưu error message
-        error_message = "Xin lỗi, đã có lỗi xảy ra. Vui lòng thử lại sau."
         try:
-            messageservice = MessageService()
-            error_payload = CreateMessagePayload(
-                chat_id=chat_uuid if 'chat_uuid' in locals() else uuid.UUID(chat_id), 
-                role="assistant", 
-                content=error_message
-            )
-            messageservice.create_message(error_payload)
+            _save_message(messageservice, chat_id, "assistant", ERROR_MESSAGE)
         except:
             pass
-            
-        return error_message
-    
\ No newline at end of file
+
+        return ERROR_MESSAGE, trace
+    finally:
+        if deadline.degraded:
+            trace.set_attribute("degraded", deadline.degraded)
+        trace.set_attribute("embeddings", retrieval.stats())
+        trace.finish()
+        trace.log()
+
+
+@router.post("/full_pipeline", response_model=str)
+async def pipeline_chatbot(
+    query: str,
+    response: Response,
+    chat_id: uuid.UUID = Query(..., description="Chat session ID"),
+    user_id: uuid.UUID = Query(..., description="User ID"),
+    debug: bool = Query(False, description="Trả về stage timings qua Server-Timing header")
+):
+    """
+    Pipeline đầy đủ với history context, personality, và routing thông minh
+
+    Args:
+        query: Câu hỏi của người dùng
+        chat_id: ID của chat session (must be valid UUID)
+        user_id: ID của người dùng (must be valid UUID)
+
+    Features:
+        - Personality support: Sử dụng personality của user nếu có
+        - History context: Nhớ lịch sử trò chuyện
+        - Smart routing: Chọn agent phù hợp
+        - Single-flight: Câu hỏi giống nhau đang xử lý đồng thời dùng chung 1 lần tính
+        - Debug: debug=true trả về thời gian từng stage qua Server-Timing header
+    """
+    ticket = await _admit(user_id)
+    try:
+        response_text, trace = await run_pipeline(query, chat_id, user_id)
+    finally:
+        if ticket is not None:
+            ticket.release()
+    if debug:
+        response.headers["Server-Timing"] = trace.server_timing_header()
+    return response_text
+
+
+async def _admit(user_id: uuid.UUID) -> Optional[AdmissionTicket]:
+    """
+    Chờ admission slot cho tenant, hàng đợi đầy → 429 kèm Retry-After
+    """
+    if not env.ADMISSION_ENABLED:
+        return None
+    try:
+        return await chat_admission.acquire(str(user_id))
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many requests: {e.reason}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format 1 Server-Sent Event"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def _pipeline_event_stream(query: str, chat_id: uuid.UUID, user_id: uuid.UUID, debug: bool = False):
+    """
+    Cùng các bước với pipeline_chatbot nhưng phát stage events và stream token
+
+    Events:
+        - faq: FAQ matched (faq_id, score)
+        - routing: Routing decision (agent, query)
+        - products / chunks: Dữ liệu mà agent đã retrieve
+        - token: Một đoạn câu trả lời
+        - done: Câu trả lời hoàn chỉnh (kèm timings nếu debug=true)
+        - error: Có lỗi xảy ra
+    """
+    trace = start_trace("chat_pipeline_stream", tenant=str(user_id), chat_id=str(chat_id))
+    deadline = start_deadline(env.PIPELINE_DEADLINE_SECONDS)
+    retrieval = start_retrieval_context(query)
+    routing_task = None
+    messageservice = MessageService()
+    response_parts: List[str] = []
+    try:
+        # [0] - [3] giống full_pipeline
+        user_personality, user_personality_name = _load_user_personality_traced(user_id)
+        _save_message(messageservice, chat_id, "user", query)
+        history, history_context = await _load_history(messageservice, chat_id)
+
+        if env.PIPELINE_SPECULATIVE_ROUTING:
+            routing_task = asyncio.create_task(_decide_route(query, history_context))
+
+        # Personality rewrite là lần gọi LLM cuối cùng → stream rewrite thay vì agent
+        stream_personality = bool(user_personality and user_personality_name)
+
+        faq_result = await _check_faq(query, user_id)
+        if faq_result:
+            if routing_task is not None:
+                routing_task.cancel()
+            trace.set_attribute("agent", "FAQ")
+            yield _sse_event("faq", {"faq_id": faq_result["faq_id"], "score": faq_result["score"]})
+            answer = faq_result["answer"]
+        else:
+            routing_info = await _await_route(query, history_context, routing_task)
+            agent_name = routing_info.get('agent', 'MySelf')
+            agent_query = routing_info.get('query', query)
+            trace.set_attribute("agent", agent_name)
+            yield _sse_event("routing", {"agent": agent_name, "query": agent_query})
+
+            # DocumentRetrievalAgent và MySelf trả lời bằng 1 lần gọi LLM → stream trực tiếp
+            # (kể cả khi có personality nếu style được inline vào system message)
+            style_instruction = _style_instruction(user_personality, user_personality_name, agent_name)
+            direct_stream = not stream_personality or style_instruction is not None
+            answer = None
+            if direct_stream and agent_name == "DocumentRetrievalAgent":
+                with span("agent", agent=agent_name, streamed=True):
+                    document_agent = agent_pool.get(DocumentRetrievalAgent)
+                    async for kind, payload in document_agent.stream_query(
+                        agent_query, user_id, top_k=5, style_instruction=style_instruction
+                    ):
+                        if kind == "chunks":
+                            yield _sse_event("chunks", [
+                                {
+                                    "document_name": chunk.get("document_name"),
+                                    "chunk_index": chunk.get("chunk_index"),
+                                    "score": chunk.get("score")
+                                }
+                                for chunk in payload
+                            ])
+                        else:
+                            response_parts.append(payload)
+                            yield _sse_event("token", {"text": payload})
+            elif direct_stream and agent_name == "MySelf":
+                with span("agent", agent=agent_name, streamed=True):
+                    async for token in agent_pool.get(MySelfAgent).stream_query(agent_query, style_instruction):
+                        response_parts.append(token)
+                        yield _sse_event("token", {"text": token})
+            else:
+                agent_result = await _run_agent(agent_name, agent_query, chat_id, user_id, history)
+                if agent_result["products"]:
+                    yield _sse_event("products", agent_result["products"])
+                answer = agent_result["response"]
+
+        # Câu trả lời chưa được stream (FAQ / agent không stream được) → stream qua personality
+        if answer is not None:
+            if stream_personality:
+                with span("personality_rewrite", personality=user_personality_name, streamed=True):
+                    async for token in user_personality.stream_personality_async(answer, user_personality_name):
+                        response_parts.append(token)
+                        yield _sse_event("token", {"text": token})
+            else:
+                response_parts.append(answer)
+                yield _sse_event("token", {"text": answer})
+
+        done = {"response": "".join(response_parts)}
+        if debug:
+            done["timings"] = trace.summary()
+        yield _sse_event("done", done)
+
+    except Exception as e:
+        print(f"❌ Error in streaming pipeline: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+        response_parts = [ERROR_MESSAGE]
+        yield _sse_event("error", {"response": ERROR_MESSAGE})
+    finally:
+        if routing_task is not None and not routing_task.done():
+            routing_task.cancel()
+
+        # [8] Lưu phản hồi (kể cả khi client ngắt kết nối giữa chừng)
+        if response_parts:
+            try:
+                _save_message(messageservice, chat_id, "assistant", "".join(response_parts))
+            except Exception as e:
+                print(f"⚠️  Error saving streamed response: {e}")
+
+        if deadline.degraded:
+            trace.set_attribute("degraded", deadline.degraded)
+        trace.set_attribute("embeddings", retrieval.stats())
+        trace.finish()
+        trace.log()
+
+
+@router.post("/full_pipeline/stream")
+async def pipeline_chatbot_stream(
+    query: str,
+    chat_id: uuid.UUID = Query(..., description="Chat session ID"),
+    user_id: uuid.UUID = Query(..., description="User ID"),
+    debug: bool = Query(False, description="Kèm stage timings trong event done")
+):
+    """
+    Server-Sent Events variant của /full_pipeline
+
+    Phát stage events (faq, routing, products, chunks) ngay khi có, sau đó
+    stream câu trả lời cuối cùng theo từng token (event: token) và kết thúc
+    bằng event: done. Tin nhắn assistant được lưu qua MessageService khi
+    stream kết thúc.
+    """
+    ticket = await _admit(user_id)
+
+    async def admitted_stream():
+        # Giữ slot cho tới khi stream kết thúc (hoặc client ngắt kết nối)
+        try:
+            async for event in _pipeline_event_stream(query, chat_id, user_id, debug):
+                yield event
+        finally:
+            if ticket is not None:
+                ticket.release()
+
+    return StreamingResponse(
+        admitted_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/routing_cache/stats", response_model=dict)
+async def routing_cache_stats():
+    """
+    Hit/miss counters của routing decision cache
+    """
+    return routing_cache.stats()
+
+
+@router.get("/admission/stats", response_model=dict)
+async def admission_stats():
+    """
+    Admission control: số requests đang chạy / đang chờ, số lần bị từ chối
+    """
+    return chat_admission.stats()
+
+
+@router.get("/semantic_cache/stats", response_model=dict)
+async def semantic_cache_stats():
+    """
+    Hit/miss counters của semantic answer cache
+    """
+    return semantic_cache.stats()
+
+
+@router.get("/embedding_cache/stats", response_model=dict)
+async def embedding_cache_stats():
+    """
+    Hit/miss counters của persistent embedding cache
+    """
+    return embedding_cache.stats()
+
+
+@router.get("/embedding_batcher/stats", response_model=dict)
+async def embedding_batcher_stats():
+    """
+    Micro-batching của query embeddings: số batches, số texts trung bình / batch
+    """
+    return embedding_batcher.stats()
+
+
+@router.delete("/semantic_cache", response_model=dict)
+async def flush_semantic_cache(
+    user_id: Optional[uuid.UUID] = Query(None, description="Tenant cần xóa cache (bỏ trống = toàn bộ)")
+):
+    """
+    Admin: Xóa semantic answer cache của 1 tenant hoặc toàn bộ
+    """
+    removed = semantic_cache.flush(str(user_id) if user_id else None)
+    print(f"🧹 Semantic cache flushed: {removed} entries (tenant={user_id or 'all'})")
+    return {"removed": removed, "user_id": str(user_id) if user_id else None}
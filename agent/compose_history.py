@@ -1,11 +1,18 @@
+import asyncio
 import json
 import re
+import uuid
+from typing import Dict, List, Optional
 from autogen import ConversableAgent
 from env import env
 from models.chat import ChatbotRequest
 from fastapi import APIRouter
+from models.chat_summary import ChatSummaryModel
 from models.message import MessageModel, CreateMessagePayload
+from services.chat_summary import ChatSummaryService
 from services.message import MessageService
+from services.message_writer import message_writer
+from utils.cache import TTLCache
 
 llm_openai = [
     {
@@ -16,10 +23,18 @@ llm_openai = [
 
 router = APIRouter(prefix="/chatbot", tags=["Compose History Agent"])
 
+# Số lượt trả lời (assistant messages) kể từ lần cập nhật summary gần nhất, theo chat
+_turns_since_summary = TTLCache(maxsize=10000, ttl=86400)
+# Chats đang được cập nhật summary (tránh 2 lần cập nhật song song)
+_updating: set = set()
+_background_tasks: set = set()
+_compose_history_agent: Optional[ConversableAgent] = None
+
         
 def _create_compose_history_agent() -> ConversableAgent:
     system_message = r"""Bạn là một chuyên gia tổng hợp lịch sử trò chuyện.
     Nhiệm vụ của bạn là phân tích lịch sử trò chuyện giữa người dùng và trợ lý AI, sau đó tổng hợp các thông tin quan trọng nhất từ cuộc trò chuyện đó.
+    Nếu có "Tóm tắt trước đó", hãy cập nhật tóm tắt đó với các tin nhắn mới (giữ lại các thông tin cũ còn quan trọng).
     Hãy trả về 1 Json duy nhất với 2 trường:
     {
         "summary": "Tóm tắt ngắn gọn các điểm chính từ cuộc trò chuyện.",
@@ -34,50 +49,169 @@ def _create_compose_history_agent() -> ConversableAgent:
         llm_config={"config_list": llm_openai},
         human_input_mode="NEVER"
     )
+
+
+def _get_compose_history_agent() -> ConversableAgent:
+    global _compose_history_agent
+    if _compose_history_agent is None:
+        _compose_history_agent = _create_compose_history_agent()
+    return _compose_history_agent
+
+
+def _parse_summary(content: str) -> Optional[Dict]:
+    json_str = re.sub(r"^```json\n|\n```$", "", (content or "").strip())
+    try:
+        data = json.loads(json_str)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(data, list) and len(data) > 0:
+        data = data[0]
+    if not isinstance(data, dict) or not data.get("summary"):
+        return None
+    return data
+
+
+async def summarize_incremental(previous: Optional[ChatSummaryModel], messages: List[MessageModel]) -> Optional[Dict]:
+    """
+    Cập nhật summary với các tin nhắn mới (chỉ gửi summary cũ + tin nhắn mới, không gửi lại toàn bộ lịch sử)
+
+    Returns:
+        {"summary": str, "key_points": [...]} hoặc None nếu LLM trả về không hợp lệ
+    """
+    prompt = ""
+    if previous:
+        prompt += f"Tóm tắt trước đó:\n{previous.summary}\n"
+        if previous.key_points:
+            prompt += "Các điểm quan trọng:\n" + "\n".join(f"- {point}" for point in previous.key_points) + "\n"
+        prompt += "\n"
+    prompt += "Tin nhắn mới:\n"
+    for msg in messages:
+        role_label = "Người dùng" if msg.role == "user" else "Trợ lý"
+        prompt += f"{role_label}: {msg.content}\n"
+
+    response = await _get_compose_history_agent().a_generate_reply(
+        messages=[{"role": "user", "content": prompt}]
+    )
+    content = response.get("content") if isinstance(response, dict) else response
+    return _parse_summary(content)
+
+
+async def refresh_summary(chat_id: uuid.UUID, keep_recent: int = env.CHAT_HISTORY_WINDOW) -> Optional[ChatSummaryModel]:
+    """
+    Gộp các tin nhắn chưa tóm tắt (trừ keep_recent tin nhắn gần nhất, vẫn gửi nguyên văn) vào summary
+
+    Mỗi lần gộp tối đa CHAT_SUMMARY_MAX_FOLD tin nhắn nên chi phí LLM và DB reads
+    không tăng theo độ dài cuộc trò chuyện.
+    """
+    summary = await asyncio.to_thread(ChatSummaryService.get_summary, chat_id)
+    # Tin nhắn còn trong write-behind queue là các tin mới nhất, tính vào cửa sổ giữ lại
+    keep_in_db = max(0, keep_recent - len(message_writer.pending_messages(chat_id)))
+    limit = env.CHAT_SUMMARY_MAX_FOLD + keep_in_db
+
+    messages = await asyncio.to_thread(ChatSummaryService.get_unsummarized_messages, chat_id, summary, limit)
+    to_fold = messages[:len(messages) - keep_in_db] if keep_in_db else messages
+    if not to_fold:
+        return summary
+
+    result = await summarize_incremental(summary, to_fold)
+    if result is None:
+        print(f"⚠️  Chat summary update failed for {chat_id}: invalid LLM response")
+        return summary
+
+    key_points = [str(point) for point in result.get("key_points") or []]
+    message_count = (summary.message_count if summary else 0) + len(to_fold)
+    await asyncio.to_thread(
+        ChatSummaryService.save_summary,
+        chat_id, str(result["summary"]), key_points, to_fold[-1].created_at, message_count
+    )
+    print(f"🧾 Chat summary updated for {chat_id}: +{len(to_fold)} messages ({message_count} total)")
+    return ChatSummaryModel(
+        chat_id=chat_id,
+        summary=str(result["summary"]),
+        key_points=key_points,
+        summarized_until=to_fold[-1].created_at,
+        message_count=message_count
+    )
+
+
+async def _refresh_in_background(chat_id: uuid.UUID):
+    try:
+        await refresh_summary(chat_id)
+    except Exception as e:
+        print(f"❌ Error updating chat summary for {chat_id}: {e}")
+    finally:
+        _updating.discard(chat_id)
+
+
+def note_turn(chat_id: uuid.UUID) -> None:
+    """
+    Gọi sau mỗi câu trả lời của assistant: mỗi CHAT_SUMMARY_EVERY_N_TURNS lượt
+    thì cập nhật summary ở background (không nằm trên critical path của request)
+
+    Chat chưa gặp trong process này (vd: sau restart) được cập nhật ngay ở lượt đầu
+    để các tin nhắn cũ chưa tóm tắt không bị rơi khỏi context.
+    """
+    if not env.CHAT_SUMMARY_ENABLED:
+        return
+    turns = _turns_since_summary.get(chat_id)
+    turns = env.CHAT_SUMMARY_EVERY_N_TURNS if turns is None else turns + 1
+    if turns < env.CHAT_SUMMARY_EVERY_N_TURNS or chat_id in _updating:
+        _turns_since_summary.set(chat_id, turns)
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    _turns_since_summary.set(chat_id, 0)
+    _updating.add(chat_id)
+    task = loop.create_task(_refresh_in_background(chat_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def build_summary_context(summary: Optional[ChatSummaryModel]) -> str:
+    """Format summary cho prompt (rỗng nếu chưa có)"""
+    if not summary:
+        return ""
+    context = f"Tóm tắt cuộc trò chuyện trước đó: {summary.summary}"
+    if summary.key_points:
+        context += "\n" + "\n".join(f"- {point}" for point in summary.key_points)
+    return context
+
         
 @router.post("/compose_history", response_model=dict)
 async def compose_history_endpoint(request: ChatbotRequest):
     """
     Tổng hợp lịch sử trò chuyện thành summary và key points
     Không lưu message - để pipeline xử lý
+
+    Dùng rolling summary đã lưu của chat, chỉ gộp thêm các tin nhắn mới
+    thay vì tóm tắt lại toàn bộ lịch sử mỗi lần gọi
     """
-    messageservice = MessageService()
-    
-    # Lấy lịch sử (không bao gồm message hiện tại)
-    history = messageservice.get_recent_messages(request.chat_id, limit=10)
-    
-    if not history or len(history) == 0:
-        return {
-            "summary": "Đây là cuộc trò chuyện đầu tiên",
-            "key_points": []
-        }
-    
-    normalized_history = []
-    for msg in history:
-        if isinstance(msg, MessageModel):
-            normalized_history.append(msg.dict())
-        elif isinstance(msg, dict):
-            normalized_history.append(msg)
-    
-    print("🥩 Normalized History:", normalized_history)
-    
-    agent = _create_compose_history_agent()
-    response = await agent.a_generate_reply(normalized_history)
-    print("📊 Compose History Response:", response)
-    
-    # Parse JSON response
-    json_str = re.sub(r"^```json\n|\n```$", "", response["content"].strip())
-    print("DEBUG: json_str =", repr(json_str))
-    
     try:
-        data = json.loads(json_str)
-        if isinstance(data, list) and len(data) > 0:
-            return data[0]
-        return data
-    except json.JSONDecodeError:
+        summary = await refresh_summary(request.chat_id, keep_recent=0)
+    except Exception as e:
+        print(f"❌ Error composing history: {e}")
         return {
             "summary": "Không thể tổng hợp lịch sử",
             "key_points": []
         }
 
+    if summary is None:
+        has_messages = await asyncio.to_thread(ChatSummaryService.get_unsummarized_messages, request.chat_id, None, 1)
+        if has_messages:
+            return {
+                "summary": "Không thể tổng hợp lịch sử",
+                "key_points": []
+            }
+        return {
+            "summary": "Đây là cuộc trò chuyện đầu tiên",
+            "key_points": []
+        }
 
+    print("📊 Compose History Summary:", summary.summary)
+    return {
+        "summary": summary.summary,
+        "key_points": summary.key_points
+    }
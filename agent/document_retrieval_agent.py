@@ -11,15 +11,31 @@ from autogen import ConversableAgent
 from env import env
 from models.chat import ChatbotRequest
 from fastapi import APIRouter
-from typing import List, Dict, Any
-from qdrant_client import QdrantClient, models
-from embedding.generate_embeddings import generate_embedding
-from embedding.search import document_semantic_search   
+from typing import List, Dict, Any, Optional
+from qdrant_client import models
+from embedding.search import adocument_semantic_search
+from utils.llm_stream import stream_chat_completion
+from agent.agent_pool import agent_pool
+from utils.prompt_builder import count_tokens, fit_items, record_usage
+from utils.deadline import mark_degraded
 import json
 import re
 
 router = APIRouter(prefix="/chatbot", tags=["Document Retrieval Agent"])
 
+NO_DOCUMENT_FOUND_MESSAGE = """Xin lỗi, tôi không tìm thấy thông tin liên quan trong knowledge base.
+
+Có thể vì:
+- Chưa có document nào được upload về chủ đề này
+- Câu hỏi chưa đủ cụ thể
+
+Bạn có thể:
+- Upload thêm documents về chủ đề này
+- Diễn đạt câu hỏi chi tiết hơn
+- Hỏi về sản phẩm hoặc chủ đề khác
+
+Tôi luôn sẵn sàng hỗ trợ! 😊"""
+
 llm_config = {
     "model": env.OPENAI_API_MODEL,
     "api_key": env.OPENAI_API_KEY,
@@ -29,10 +45,11 @@ llm_config = {
 class DocumentRetrievalAgent:
     def __init__(self):
         self.llm_config = llm_config
-        self.qdrant = QdrantClient("http://localhost:6334")
+        # Search qua embedding.search (AsyncQdrantClient dùng chung)
         self.collection_name = "documents"
+        self.agent = self._create_rag_agent()
         
-    def _search_documents(self, query: str, user_id: str, top_k: int = 5) -> List[Dict]:
+    async def _search_documents(self, query: str, user_id: str, top_k: int = 5) -> List[Dict]:
         """
         Tìm kiếm documents trong Qdrant collection
         
@@ -50,7 +67,7 @@ class DocumentRetrievalAgent:
             print(f"querry: {query}, user_id: {user_id}, top_k: {top_k}")
             
             # Search trong Qdrant với filter by user_id
-            chunks = document_semantic_search(query, user_id, top_k, COLLECTION_NAME=self.collection_name)
+            chunks = await adocument_semantic_search(query, user_id, top_k, COLLECTION_NAME=self.collection_name)
 
             print(f"📚 Found {len(chunks)} relevant document chunks")
             print(chunks)
@@ -93,11 +110,13 @@ class DocumentRetrievalAgent:
             
         except Exception as e:
             print(f"❌ Error searching documents: {str(e)}")
+            # Lỗi Qdrant / embedding ≠ "không có document" → không cache câu trả lời
+            mark_degraded("document_search")
             return []
     
-    def _create_rag_agent(self) -> ConversableAgent:
+    def _get_rag_system_message(self, style_instruction: Optional[str] = None) -> str:
         """
-        Tạo RAG agent để trả lời câu hỏi dựa trên retrieved documents
+        System message cho RAG agent (kèm personality style nếu có)
         """
         system_message = """
 Bạn là một trợ lý AI thông minh của NAVITECH, chuyên trả lời câu hỏi dựa trên knowledge base.
@@ -117,14 +136,28 @@ NGUYÊN TẮC:
 OUTPUT FORMAT:
 Trả lời trực tiếp bằng tiếng Việt, thân thiện, có cấu trúc rõ ràng.
 """
+        if style_instruction:
+            system_message += f"\n{style_instruction}\n"
+        return system_message
+
+    def _create_rag_agent(self) -> ConversableAgent:
+        """
+        Tạo RAG agent để trả lời câu hỏi dựa trên retrieved documents
+        """
         return ConversableAgent(
             name="document_rag_expert",
-            system_message=system_message,
+            system_message=self._get_rag_system_message(),
             llm_config=self.llm_config,
             human_input_mode="NEVER"
         )
     
-    async def process_query(self, query: str, user_id: str, top_k: int = 5) -> str:
+    async def process_query(
+        self,
+        query: str,
+        user_id: str,
+        top_k: int = 5,
+        style_instruction: Optional[str] = None
+    ) -> str:
         """
         Xử lý query với RAG pipeline
         
@@ -132,6 +165,7 @@ Trả lời trực tiếp bằng tiếng Việt, thân thiện, có cấu trúc
             query: Câu hỏi của user
             user_id: User ID
             top_k: Số lượng chunks retrieve
+            style_instruction: Personality style (inline mode)
             
         Returns:
             Response string với thông tin từ knowledge base
@@ -140,49 +174,26 @@ Trả lời trực tiếp bằng tiếng Việt, thân thiện, có cấu trúc
             print(f"📖 DocumentRetrievalAgent processing: {query}")
             
             # [1] Retrieve relevant documents
-            chunks = self._search_documents(query, user_id, top_k)
+            chunks = await self._search_documents(query, user_id, top_k)
             
             if not chunks or len(chunks) == 0:
-                return """Xin lỗi, tôi không tìm thấy thông tin liên quan trong knowledge base.
-
-Có thể vì:
-- Chưa có document nào được upload về chủ đề này
-- Câu hỏi chưa đủ cụ thể
-
-Bạn có thể:
-- Upload thêm documents về chủ đề này
-- Diễn đạt câu hỏi chi tiết hơn
-- Hỏi về sản phẩm hoặc chủ đề khác
-
-Tôi luôn sẵn sàng hỗ trợ! 😊"""
+                return NO_DOCUMENT_FOUND_MESSAGE
             
             # [2] Build context từ retrieved chunks
             context = self._build_context(chunks)
             
-            # [3] Generate answer với RAG agent
-            agent = self._create_rag_agent()
-            
-            prompt = f"""
-Câu hỏi: {query}
-
-Context từ knowledge base:
-{context}
-
-Hãy trả lời câu hỏi dựa trên context trên.
-"""
+            # [3] Generate answer với RAG agent (dùng chung, style truyền theo request)
+            prompt = self._build_rag_prompt(query, context)
+            messages = [{"role": "user", "content": prompt}]
+            if style_instruction:
+                messages.insert(0, {"role": "system", "content": style_instruction})
             
-            response = await agent.a_generate_reply(
-                messages=[{"role": "user", "content": prompt}]
-            )
+            response = await self.agent.a_generate_reply(messages=messages)
             
             answer = response.get('content', '')
             
             # [4] Add metadata (sources)
-            sources = self._extract_sources(chunks)
-            if sources:
-                answer += f"\n\n📚 **Nguồn tham khảo:**\n"
-                for source in sources:
-                    answer += f"- {source}\n"
+            answer += self._format_sources(chunks)
             
             return answer
             
@@ -192,15 +203,81 @@ Hãy trả lời câu hỏi dựa trên context trên.
             traceback.print_exc()
             return "Xin lỗi, đã có lỗi xảy ra khi tìm kiếm thông tin. Vui lòng thử lại sau."
     
+    async def stream_query(
+        self,
+        query: str,
+        user_id: str,
+        top_k: int = 5,
+        style_instruction: Optional[str] = None
+    ):
+        """
+        RAG pipeline dạng streaming (dùng cho SSE endpoint)
+        
+        Yields:
+            ("chunks", List[Dict]) sau khi retrieve xong, sau đó
+            ("token", str) cho từng đoạn câu trả lời
+        """
+        chunks = await self._search_documents(query, user_id, top_k)
+        yield "chunks", chunks
+        
+        if not chunks:
+            yield "token", NO_DOCUMENT_FOUND_MESSAGE
+            return
+        
+        prompt = self._build_rag_prompt(query, self._build_context(chunks))
+        async for token in stream_chat_completion(self._get_rag_system_message(style_instruction), prompt):
+            yield "token", token
+        
+        sources = self._format_sources(chunks)
+        if sources:
+            yield "token", sources
+    
+    def _build_rag_prompt(self, query: str, context: str) -> str:
+        """
+        Prompt cho RAG agent từ câu hỏi và context đã retrieve
+        """
+        return f"""
+Câu hỏi: {query}
+
+Context từ knowledge base:
+{context}
+
+Hãy trả lời câu hỏi dựa trên context trên.
+"""
+    
+    def _format_sources(self, chunks: List[Dict]) -> str:
+        """
+        Phần "Nguồn tham khảo" nối vào cuối câu trả lời
+        """
+        sources = self._extract_sources(chunks)
+        if not sources:
+            return ""
+        text = f"\n\n📚 **Nguồn tham khảo:**\n"
+        for source in sources:
+            text += f"- {source}\n"
+        return text
+    
     def _build_context(self, chunks: List[Dict]) -> str:
         """
         Build context string từ retrieved chunks
+
+        Chỉ giữ các chunks có score cao nhất vừa PROMPT_RAG_CONTEXT_TOKENS,
+        chunk cuối cùng có thể bị cắt bớt
         """
         context_parts = []
         
+        kept, dropped, truncated = fit_items(
+            [chunk['text'].strip() for chunk in chunks],
+            env.PROMPT_RAG_CONTEXT_TOKENS,
+            values=[chunk.get('score', 0.0) for chunk in chunks]
+        )
+        if dropped or truncated:
+            print(f"✂️  RAG context over budget: dropped {dropped}, truncated {truncated} chunks")
+        selected = [dict(chunks[index], text=text) for index, text in kept]
+        
         # Group by document
         docs = {}
-        for chunk in chunks:
+        for chunk in selected:
             doc_name = chunk['document_name']
             if doc_name not in docs:
                 docs[doc_name] = []
@@ -218,7 +295,9 @@ Hãy trả lời câu hỏi dựa trên context trên.
                 if text:
                     context_parts.append(f"[Chunk {chunk['chunk_index']}/{chunk['total_chunks']}]: {text}")
         
-        return "\n".join(context_parts)
+        context = "\n".join(context_parts)
+        record_usage("rag", "context", count_tokens(context), dropped, truncated)
+        return context
     
     def _extract_sources(self, chunks: List[Dict]) -> List[str]:
         """
@@ -241,7 +320,7 @@ async def document_retrieval_endpoint(
     """
     Endpoint để truy vấn knowledge base
     """
-    agent = DocumentRetrievalAgent()
+    agent = agent_pool.get(DocumentRetrievalAgent)
     response = await agent.process_query(
         query=request.message,
         user_id=user_id,
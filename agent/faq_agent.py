@@ -17,7 +17,7 @@ Features:
 
 from typing import Optional, Dict, Any, List
 import uuid
-from embedding.search import faq_semantic_search
+from embedding.search import faq_semantic_search, afaq_semantic_search
 from env import env
 
 
@@ -76,6 +76,38 @@ class FAQAgent:
             threshold=search_threshold
         )
         
+        return self._select_match(results, search_threshold)
+    
+    async def asearch_faq(
+        self,
+        query: str,
+        user_id: uuid.UUID,
+        threshold: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Bản async của search_faq (embedding không block event loop)
+        """
+        search_threshold = threshold if threshold is not None else self.threshold
+        
+        print(f"🔍 FAQ Agent searching for: '{query}'")
+        print(f"   User: {user_id}, Threshold: {search_threshold}")
+        
+        results = await afaq_semantic_search(
+            query=query,
+            user_id=str(user_id),
+            top_k=self.top_k,
+            threshold=search_threshold
+        )
+        return self._select_match(results, search_threshold)
+    
+    def _select_match(
+        self,
+        results: List[Dict[str, Any]],
+        search_threshold: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Lấy FAQ có score cao nhất nếu vượt threshold
+        """
         # Nếu không có kết quả
         if not results:
             print(f"❌ No FAQ found matching threshold {search_threshold}")
@@ -174,8 +206,35 @@ class FAQAgent:
             top_k=5,  # Lấy nhiều hơn để có options
             threshold=search_threshold
         )
+        return self._filter_matches(results, search_threshold)
+    
+    async def aget_all_matches(
+        self,
+        query: str,
+        user_id: uuid.UUID,
+        threshold: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Bản async của get_all_matches (embedding / Qdrant không block event loop)
+        """
+        search_threshold = threshold if threshold is not None else self.threshold
         
-        # Filter chỉ lấy matched items
+        results = await afaq_semantic_search(
+            query=query,
+            user_id=str(user_id),
+            top_k=5,
+            threshold=search_threshold
+        )
+        return self._filter_matches(results, search_threshold)
+    
+    def _filter_matches(
+        self,
+        results: List[Dict[str, Any]],
+        search_threshold: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Chỉ giữ các FAQs có score vượt threshold
+        """
         matched_faqs = [r for r in results if r["score"] >= search_threshold]
         
         print(f"📋 Found {len(matched_faqs)} matched FAQs (threshold: {search_threshold})")
@@ -0,0 +1,381 @@
+"""
+IntentRouter - Local embedding-based routing trước Manager Agent
+
+Logic:
+1. Query → Generate embedding
+2. Cosine similarity với centroid của từng agent (nearest-centroid)
+3. Nếu score >= min_score và cách biệt với agent thứ 2 >= min_margin → tự quyết định
+4. Nếu không chắc chắn → Return None (fallback về Manager Agent LLM)
+
+Centroids được train từ labelled examples (JSONL {"query", "agent"}) và các
+routing decisions mà pipeline đã log (chỉ dùng decisions của LLM router).
+
+CLI:
+    python -m agent.intent_router train --examples labelled.jsonl --log logs/routing_decisions.jsonl
+    python -m agent.intent_router evaluate --data labelled.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embedding.generate_embeddings import generate_embedding, generate_embeddings
+from embedding.providers import get_embedding_provider
+from embedding.retrieval_context import embed_query
+from env import env
+from utils.metrics import percentile
+
+AGENT_LABELS = [
+    "ProductAgent",
+    "RecommendationAgent",
+    "PersonalizationAgent",
+    "DocumentRetrievalAgent",
+    "MySelf",
+]
+
+# Agents phụ thuộc lịch sử hội thoại ("cái thứ hai", "cái nào tốt hơn?"): khi query có
+# history thì local router không tự quyết mà để Manager Agent đọc history
+CONTEXT_DEPENDENT_LABELS = ("PersonalizationAgent",)
+
+# Ví dụ khởi tạo (lấy từ system prompt của Manager Agent), bổ sung bằng --examples / --log
+SEED_EXAMPLES: List[Dict[str, str]] = [
+    {"query": "Tìm laptop Dell", "agent": "ProductAgent"},
+    {"query": "Có điện thoại dưới 10 triệu không?", "agent": "ProductAgent"},
+    {"query": "có laptop Dell không", "agent": "ProductAgent"},
+    {"query": "Giá iPhone 15 Pro Max bao nhiêu?", "agent": "ProductAgent"},
+    {"query": "Shop có bán tai nghe Sony không?", "agent": "ProductAgent"},
+    {"query": "Laptop cho sinh viên", "agent": "RecommendationAgent"},
+    {"query": "Điện thoại chơi game tốt", "agent": "RecommendationAgent"},
+    {"query": "Gợi ý cho tôi một chiếc máy ảnh để đi du lịch", "agent": "RecommendationAgent"},
+    {"query": "Nên mua quà gì cho bạn gái?", "agent": "RecommendationAgent"},
+    {"query": "Cái nào tốt hơn?", "agent": "PersonalizationAgent"},
+    {"query": "Phù hợp cho tôi nhất?", "agent": "PersonalizationAgent"},
+    {"query": "Bạn nghĩ sao về chiếc thứ hai?", "agent": "PersonalizationAgent"},
+    {"query": "Ai nên dùng mẫu này?", "agent": "PersonalizationAgent"},
+    {"query": "Chính sách đổi trả?", "agent": "DocumentRetrievalAgent"},
+    {"query": "chính sách đổi trả?", "agent": "DocumentRetrievalAgent"},
+    {"query": "Hướng dẫn sử dụng?", "agent": "DocumentRetrievalAgent"},
+    {"query": "Điều khoản bảo hành?", "agent": "DocumentRetrievalAgent"},
+    {"query": "Quy định giao hàng như thế nào?", "agent": "DocumentRetrievalAgent"},
+    {"query": "NAVITECH là gì?", "agent": "MySelf"},
+    {"query": "Bạn là ai?", "agent": "MySelf"},
+    {"query": "Xin chào", "agent": "MySelf"},
+    {"query": "Cảm ơn bạn nhé", "agent": "MySelf"},
+]
+
+_log_lock = threading.Lock()
+
+
+def log_routing_decision(query: str, agent: str, source: str, score: Optional[float] = None) -> None:
+    """
+    Ghi routing decision vào JSONL (env.ROUTING_LOG_PATH) để train lại router
+
+    Args:
+        query: Câu hỏi của user
+        agent: Agent được chọn
+        source: "llm" (Manager Agent) hoặc "local" (IntentRouter)
+        score: Confidence của local router (nếu có)
+    """
+    if not env.ROUTING_LOG_PATH:
+        return
+    record = {
+        "query": query,
+        "agent": agent,
+        "source": source,
+        "score": score,
+        "created_at": datetime.now().isoformat(),
+    }
+    try:
+        with _log_lock:
+            directory = os.path.dirname(env.ROUTING_LOG_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(env.ROUTING_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"⚠️  Error logging routing decision: {e}")
+
+
+async def alog_routing_decision(query: str, agent: str, source: str, score: Optional[float] = None) -> None:
+    """Bản async của log_routing_decision (file append chạy trong thread, không block event loop)"""
+    if not env.ROUTING_LOG_PATH:
+        return
+    await asyncio.to_thread(log_routing_decision, query, agent, source, score)
+
+
+def load_examples(path: str, llm_only: bool = False) -> List[Dict[str, str]]:
+    """
+    Đọc labelled examples từ JSONL ({"query": ..., "agent": ...})
+
+    Args:
+        path: File JSONL
+        llm_only: Chỉ lấy records có source == "llm" (dùng cho routing log,
+                  tránh train router trên chính predictions của nó)
+    """
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if llm_only and record.get("source") != "llm":
+                continue
+            if record.get("agent") in AGENT_LABELS and record.get("query"):
+                examples.append({"query": record["query"], "agent": record["agent"]})
+    return examples
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class IntentRouter:
+    """
+    Nearest-centroid classifier trên query embeddings
+    """
+
+    def __init__(
+        self,
+        centroids: Optional[Dict[str, List[float]]] = None,
+        min_score: float = None,
+        min_margin: float = None
+    ):
+        """
+        Args:
+            centroids: {agent_name: centroid vector}
+            min_score: Cosine tối thiểu để tự quyết định (default: env.INTENT_ROUTER_MIN_SCORE)
+            min_margin: Khoảng cách tối thiểu với agent thứ 2 (default: env.INTENT_ROUTER_MIN_MARGIN)
+        """
+        self.labels: List[str] = []
+        self.matrix: Optional[np.ndarray] = None
+        self.min_score = min_score if min_score is not None else env.INTENT_ROUTER_MIN_SCORE
+        self.min_margin = min_margin if min_margin is not None else env.INTENT_ROUTER_MIN_MARGIN
+        if centroids:
+            self._set_centroids(centroids)
+
+    def _set_centroids(self, centroids: Dict[str, List[float]]) -> None:
+        self.labels = list(centroids.keys())
+        self.matrix = np.stack([_normalize(centroids[label]) for label in self.labels])
+
+    def fit(self, examples: List[Dict[str, str]]) -> "IntentRouter":
+        """
+        Train centroids từ examples (batch embedding các queries)
+        """
+        vectors: Dict[str, List[np.ndarray]] = {}
+        embeddings = generate_embeddings([example["query"] for example in examples])
+        for example, embedding in zip(examples, embeddings):
+            if embedding is None:
+                continue
+            vector = _normalize(embedding)
+            if not np.any(vector):
+                continue
+            vectors.setdefault(example["agent"], []).append(vector)
+
+        centroids = {
+            label: np.mean(label_vectors, axis=0).tolist()
+            for label, label_vectors in vectors.items()
+        }
+        self._set_centroids(centroids)
+        print(f"✅ IntentRouter trained: " + ", ".join(f"{k}={len(v)}" for k, v in vectors.items()))
+        return self
+
+    def predict_vector(self, vector) -> Tuple[str, float, float]:
+        """
+        Returns:
+            (agent, score, margin) - margin là chênh lệch score với agent thứ 2
+        """
+        scores = self.matrix @ _normalize(vector)
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        second = float(scores[order[1]]) if len(order) > 1 else -1.0
+        return self.labels[order[0]], best, best - second
+
+    def route(
+        self,
+        query: str,
+        embedding: Optional[List[float]] = None,
+        has_history: bool = False
+    ) -> Optional[Dict[str, object]]:
+        """
+        Quyết định routing nếu đủ tự tin
+
+        Args:
+            embedding: Query vector đã có sẵn (không thì embed query)
+            has_history: Query có lịch sử hội thoại → label context-dependent luôn fallback LLM
+
+        Returns:
+            {"agent", "query", "score"} nếu confident, None nếu cần fallback LLM
+        """
+        if self.matrix is None:
+            return None
+        if embedding is None:
+            embedding = generate_embedding(query)
+        if not np.any(embedding):
+            return None
+        agent, score, margin = self.predict_vector(embedding)
+        if has_history and agent in CONTEXT_DEPENDENT_LABELS:
+            print(f"ℹ️  IntentRouter defers {agent} to LLM (query has history)")
+            return None
+        if score >= self.min_score and margin >= self.min_margin:
+            return {"agent": agent, "query": query, "score": score}
+        print(f"ℹ️  IntentRouter unsure: {agent} (score={score:.3f}, margin={margin:.3f})")
+        return None
+
+    async def aroute(self, query: str, has_history: bool = False) -> Optional[Dict[str, object]]:
+        """Bản async của route, dùng chung query vector trong lượt chat (retrieval context)"""
+        if self.matrix is None:
+            return None
+        return self.route(query, await embed_query(query), has_history=has_history)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "centroids": {label: self.matrix[i].tolist() for i, label in enumerate(self.labels)},
+            "embedding_dim": int(self.matrix.shape[1]),
+            "model_id": get_embedding_provider().model_id,
+            "trained_at": datetime.now().isoformat(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentRouter":
+        """
+        Load centroids đã train
+
+        Raises:
+            ValueError: Model train bằng embedding khác (số chiều khác LEN_EMBEDDING
+                        hoặc model_id khác provider hiện tại) - cần train lại
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        centroids = data["centroids"]
+        dimensions = data.get("embedding_dim") or len(next(iter(centroids.values()), []))
+        if dimensions != env.LEN_EMBEDDING:
+            raise ValueError(
+                f"IntentRouter model {path} có {dimensions} chiều nhưng LEN_EMBEDDING={env.LEN_EMBEDDING} - cần train lại"
+            )
+        model_id = data.get("model_id")
+        provider_model_id = get_embedding_provider().model_id
+        if model_id and model_id != provider_model_id:
+            raise ValueError(
+                f"IntentRouter model {path} train bằng {model_id} nhưng provider hiện tại là {provider_model_id} - cần train lại"
+            )
+        return cls(centroids=centroids)
+
+
+# Singleton instance
+_intent_router_instance: Optional[IntentRouter] = None
+_intent_router_loaded = False
+
+
+def get_intent_router() -> Optional[IntentRouter]:
+    """Get singleton IntentRouter (None nếu disabled hoặc chưa train)"""
+    global _intent_router_instance, _intent_router_loaded
+    if not _intent_router_loaded:
+        _intent_router_loaded = True
+        path = env.INTENT_ROUTER_MODEL_PATH
+        if env.INTENT_ROUTER_ENABLED and path and os.path.exists(path):
+            try:
+                _intent_router_instance = IntentRouter.load(path)
+                print(f"✅ IntentRouter loaded from {path}")
+            except Exception as e:
+                print(f"⚠️  Error loading IntentRouter: {e}")
+    return _intent_router_instance
+
+
+async def _evaluate(data_path: str, skip_llm: bool) -> Dict[str, object]:
+    """
+    So sánh local router với Manager Agent LLM trên labelled examples
+    """
+    examples = load_examples(data_path)
+    router = get_intent_router() or IntentRouter.load(env.INTENT_ROUTER_MODEL_PATH)
+
+    if not skip_llm:
+        from agent.chat_pipeline import _route_query, _build_routing_prompt
+
+    local_correct = local_confident = local_confident_correct = 0
+    llm_correct = 0
+    local_latencies, llm_latencies = [], []
+
+    for example in examples:
+        start = time.perf_counter()
+        embedding = await asyncio.to_thread(generate_embedding, example["query"])
+        agent, score, margin = router.predict_vector(embedding)
+        local_latencies.append((time.perf_counter() - start) * 1000)
+
+        local_correct += agent == example["agent"]
+        if score >= router.min_score and margin >= router.min_margin:
+            local_confident += 1
+            local_confident_correct += agent == example["agent"]
+
+        if not skip_llm:
+            start = time.perf_counter()
+            routing_info = await _route_query(_build_routing_prompt(example["query"], ""), example["query"])
+            llm_latencies.append((time.perf_counter() - start) * 1000)
+            llm_correct += routing_info.get("agent") == example["agent"]
+
+    total = len(examples) or 1
+    report = {
+        "examples": len(examples),
+        "local": {
+            "accuracy": local_correct / total,
+            "coverage": local_confident / total,
+            "confident_accuracy": local_confident_correct / local_confident if local_confident else 0.0,
+            "latency_ms_p50": percentile(local_latencies, 50),
+            "latency_ms_p95": percentile(local_latencies, 95),
+        },
+    }
+    if not skip_llm:
+        report["llm"] = {
+            "accuracy": llm_correct / total,
+            "latency_ms_p50": percentile(llm_latencies, 50),
+            "latency_ms_p95": percentile(llm_latencies, 95),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train / evaluate the local intent router")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train centroids and save the model")
+    train_parser.add_argument("--examples", help="Labelled JSONL file ({query, agent})")
+    train_parser.add_argument("--log", default=env.ROUTING_LOG_PATH, help="Routing decision log (JSONL)")
+    train_parser.add_argument("--no-seed", action="store_true", help="Không dùng SEED_EXAMPLES")
+    train_parser.add_argument("--out", default=env.INTENT_ROUTER_MODEL_PATH)
+
+    eval_parser = subparsers.add_parser("evaluate", help="Accuracy / latency vs the LLM router")
+    eval_parser.add_argument("--data", required=True, help="Labelled JSONL file ({query, agent})")
+    eval_parser.add_argument("--skip-llm", action="store_true", help="Chỉ đánh giá local router")
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        examples = [] if args.no_seed else list(SEED_EXAMPLES)
+        if args.examples:
+            examples += load_examples(args.examples)
+        if args.log and os.path.exists(args.log):
+            examples += load_examples(args.log, llm_only=True)
+        print(f"📚 Training on {len(examples)} examples")
+        IntentRouter().fit(examples).save(args.out)
+        print(f"✅ Saved to {args.out}")
+    else:
+        report = asyncio.run(_evaluate(args.data, args.skip_llm))
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ from autogen import ConversableAgent
 from env import env
 from models.chat import ChatbotRequest
 from fastapi import APIRouter
+from typing import Optional
+from utils.llm_stream import stream_chat_completion
+from agent.agent_pool import agent_pool
 
 llm_openai = [
     {
@@ -14,34 +17,51 @@ llm_openai = [
 class MySelfAgent:
     def __init__(self):
         self.llm_config = llm_openai
+        self.agent = self._create_myself_agent()
         
-    def _create_myself_agent(self) -> ConversableAgent:
+    def _get_system_message(self, style_instruction: Optional[str] = None) -> str:
         system_message = f"""
         Bạn là một trợ lý AI thông minh đại diện cho trang web NAVITECH, giúp tôi trả lời các câu hỏi về sở thích, 
         kỹ năng và thông tin của NAVITECH.
         Hãy trả lời các câu hỏi một cách chính xác và trung thực nhất có thể dựa trên thông tin bạn có về NAVITECH.
         """
+        if style_instruction:
+            system_message += f"\n{style_instruction}\n"
+        return system_message
+
+    def _create_myself_agent(self) -> ConversableAgent:
         return ConversableAgent(
             name="myself_expert",
-            system_message=system_message,
+            system_message=self._get_system_message(),
             llm_config={"config_list": self.llm_config},
             human_input_mode="NEVER"
         )
     
-    async def process_query(self, query: str):
+    async def process_query(self, query: str, style_instruction: Optional[str] = None):
+        """
+        Args:
+            style_instruction: Personality style (inline mode), xem PersonalityAgent.build_style_instruction
+        """
         try:
-            agent = self._create_myself_agent()
-            response = await agent.a_generate_reply([{"role": "user", "content": query}])
+            messages = [{"role": "user", "content": query}]
+            if style_instruction:
+                messages.insert(0, {"role": "system", "content": style_instruction})
+            response = await self.agent.a_generate_reply(messages)
             return response
         except Exception as e:  
             return f"Đã xảy ra lỗi khi xử lý truy vấn: {e}"
+
+    async def stream_query(self, query: str, style_instruction: Optional[str] = None):
+        """Stream câu trả lời theo từng token (dùng cho SSE endpoint)"""
+        async for token in stream_chat_completion(self._get_system_message(style_instruction), query):
+            yield token
         
         
 router = APIRouter(prefix="/chatbot", tags=["MySelf Agent"])
 
 @router.post("/myself", response_model=str)
 async def myself_endpoint(request: ChatbotRequest):
-    agent = MySelfAgent()
+    agent = agent_pool.get(MySelfAgent)
     response = await agent.process_query(request.message)
     
     # Handle both dict and string responses
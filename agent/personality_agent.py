@@ -11,6 +11,7 @@ from db import get_db
 from services.user import UserService
 from env import env
 from pydantic import BaseModel
+from utils.llm_stream import stream_chat_completion
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -87,25 +88,72 @@ Ví dụ: "Tôi hy vọng điều này sẽ giúp bạn được tốt hơn"
 Viết lại toàn bộ nội dung với phong cách tử tế này.""",
     }
     
+    # personality key → ConversableAgent dùng chung (system message chỉ phụ thuộc personality)
+    _agents: Dict[str, ConversableAgent] = {}
+    
     def __init__(self, company_name: str = "NAVITECH", agent_name: str = "trợ lý AI"):
         """Initialize PersonalityAgent with LLM and custom naming"""
         self.llm_config = llm_openai
         self.company_name = company_name
         self.agent_name = agent_name
     
-    def _create_personality_agent(self, personality_name: str) -> ConversableAgent:
-        """Create an LLM agent for specific personality"""
-        system_message = self.PERSONALITY_PROMPTS.get(
+    def _get_system_message(self, personality_name: str) -> str:
+        """Get personality system prompt (fallback to bình_thường)"""
+        return self.PERSONALITY_PROMPTS.get(
             personality_name.lower().strip(),
             self.PERSONALITY_PROMPTS["bình_thường"]
         )
+    
+    def build_style_instruction(self, personality_name: Optional[str]) -> Optional[str]:
+        """
+        Personality prompt để chèn vào system message của agent trả lời (inline mode)
         
-        return ConversableAgent(
-            name=f"personality_{personality_name}",
-            system_message=system_message,
-            llm_config=self.llm_config,
-            human_input_mode="NEVER"
-        )
+        Agent trả lời trực tiếp theo phong cách này, không cần gọi LLM lần 2 để rewrite.
+        Returns None nếu không cần style (default personality).
+        """
+        if not personality_name or personality_name.lower().strip() == "bình_thường":
+            return None
+        
+        # Bỏ các câu chỉ dẫn "viết lại" vì ở inline mode agent tự sinh câu trả lời
+        style_lines = [
+            line for line in self._get_system_message(personality_name).splitlines()
+            if not line.startswith("Viết lại")
+        ]
+        return f"""PHONG CÁCH TRẢ LỜI:
+Bạn là {self.agent_name} của công ty {self.company_name}.
+{chr(10).join(style_lines)}
+Áp dụng phong cách này cho toàn bộ câu trả lời, nhưng giữ nguyên độ chính xác của thông tin."""
+    
+    def _build_rewrite_prompt(self, response_text: str) -> str:
+        """Build prompt to rewrite a response with company and agent context"""
+        return f"""Bạn là {self.agent_name} của công ty {self.company_name}.
+
+Hãy viết lại nội dung sau hoàn toàn theo phong cách và tính cách của bạn:
+
+NỘI DUNG GỐC:
+{response_text}
+
+Hãy viết lại toàn bộ nội dung này (không chỉ thêm 1 dòng cuối) sao cho phù hợp với phong cách của bạn. 
+- Có thể thay thế "NAVITECH" bằng "{self.company_name}"
+- Có thể thay thế "trợ lý AI" bằng "{self.agent_name}"
+- Giữ lại toàn bộ thông tin quan trọng từ nội dung gốc nhưng diễn đạt lại theo cách riêng của bạn."""
+    
+    def _create_personality_agent(self, personality_name: str) -> ConversableAgent:
+        """Get the shared LLM agent for specific personality (built once per personality)"""
+        key = personality_name.lower().strip()
+        if key not in self.PERSONALITY_PROMPTS:
+            key = "bình_thường"
+        
+        agent = PersonalityAgent._agents.get(key)
+        if agent is None:
+            agent = ConversableAgent(
+                name=f"personality_{key}",
+                system_message=self.PERSONALITY_PROMPTS[key],
+                llm_config=self.llm_config,
+                human_input_mode="NEVER"
+            )
+            PersonalityAgent._agents[key] = agent
+        return agent
     
     async def apply_personality_async(self, response_text: str, personality_name: Optional[str]) -> Dict[str, Any]:
         """
@@ -133,17 +181,7 @@ Viết lại toàn bộ nội dung với phong cách tử tế này.""",
             agent = self._create_personality_agent(personality_name)
             
             # Create prompt to rewrite the response with company and agent context
-            rewrite_prompt = f"""Bạn là {self.agent_name} của công ty {self.company_name}.
-
-Hãy viết lại nội dung sau hoàn toàn theo phong cách và tính cách của bạn:
-
-NỘI DUNG GỐC:
-{response_text}
-
-Hãy viết lại toàn bộ nội dung này (không chỉ thêm 1 dòng cuối) sao cho phù hợp với phong cách của bạn. 
-- Có thể thay thế "NAVITECH" bằng "{self.company_name}"
-- Có thể thay thế "trợ lý AI" bằng "{self.agent_name}"
-- Giữ lại toàn bộ thông tin quan trọng từ nội dung gốc nhưng diễn đạt lại theo cách riêng của bạn."""
+            rewrite_prompt = self._build_rewrite_prompt(response_text)
             
             # Get rewritten response from LLM
             response = await agent.a_generate_reply(
@@ -173,6 +211,23 @@ Hãy viết lại toàn bộ nội dung này (không chỉ thêm 1 dòng cuối)
                 "agent_name": self.agent_name
             }
     
+    async def stream_personality_async(self, response_text: str, personality_name: Optional[str]):
+        """
+        Streaming version of apply_personality_async (used by SSE endpoint)
+        
+        Yields rewritten text chunks as the LLM produces them. If no rewrite
+        is needed the original response is yielded as a single chunk.
+        """
+        if not personality_name or personality_name.lower().strip() == "bình_thường":
+            yield response_text
+            return
+        
+        async for token in stream_chat_completion(
+            self._get_system_message(personality_name),
+            self._build_rewrite_prompt(response_text)
+        ):
+            yield token
+    
     @staticmethod
     def apply_personality(response_text: str, personality_name: Optional[str]) -> Dict[str, Any]:
         """
@@ -13,6 +13,8 @@ from models.chat import ChatbotRequest
 from fastapi import APIRouter
 from typing import Dict, List, Any
 import json
+from agent.agent_pool import agent_pool
+from utils.prompt_builder import PromptBuilder
 
 router = APIRouter(prefix="/chatbot", tags=["Personalization Agent"])
 
@@ -25,6 +27,7 @@ llm_config = {
 class PersonalizationAgent:
     def __init__(self):
         self.llm_config = llm_config
+        self.agent = self._create_agent()
         
     def _create_agent(self) -> ConversableAgent:
         system_message = """
@@ -74,23 +77,31 @@ Trả về JSON:
             previous_products: Danh sách sản phẩm đã tìm được trước đó
             conversation_history: Lịch sử chat
         """
-        agent = self._create_agent()
+        agent = self.agent
         
-        # Build context-aware prompt
-        context_prompt = f"Câu hỏi của người dùng: {query}\n\n"
-        
-        if previous_products:
-            context_prompt += "Các sản phẩm đã được tìm thấy trước đó:\n"
-            for i, product in enumerate(previous_products, 1):
-                context_prompt += f"{i}. {product.get('title', 'N/A')} - {product.get('price', 'N/A')} VND\n"
-            context_prompt += "\n"
+        # Build context-aware prompt (products / history trong token budget)
+        products = [
+            f"{i}. {product.get('title', 'N/A')} - {product.get('price', 'N/A')} VND"
+            for i, product in enumerate(previous_products or [], 1)
+        ]
+        history = []
+        for msg in (conversation_history or [])[-3:]:  # Last 3 messages
+            role = "Người dùng" if msg.get('role') == 'user' else "Trợ lý"
+            history.append(f"{role}: {msg.get('content', '')[:100]}...")
         
-        if conversation_history:
-            context_prompt += "Lịch sử trò chuyện gần đây:\n"
-            for msg in conversation_history[-3:]:  # Last 3 messages
-                role = "Người dùng" if msg.get('role') == 'user' else "Trợ lý"
-                context_prompt += f"{role}: {msg.get('content', '')[:100]}...\n"
-            context_prompt += "\n"
+        builder = PromptBuilder("personalization")
+        builder.section(
+            "products", products, budget=env.PROMPT_PRODUCTS_TOKENS, priority=1,
+            header="Các sản phẩm đã được tìm thấy trước đó:"
+        )
+        builder.section(
+            "history", history, budget=env.PROMPT_HISTORY_TOKENS,
+            values=range(len(history)), header="Lịch sử trò chuyện gần đây:"
+        )
+        context_prompt = f"Câu hỏi của người dùng: {query}\n\n"
+        sections = builder.build()
+        if sections:
+            context_prompt += sections + "\n\n"
         
         context_prompt += """
 Hãy phân tích và đưa ra gợi ý phù hợp.
@@ -169,7 +180,7 @@ async def personalization_endpoint(
     """
     Endpoint for personalized recommendations
     """
-    agent = PersonalizationAgent()
+    agent = agent_pool.get(PersonalizationAgent)
     response = await agent.process_query(
         query=request.message,
         previous_products=previous_products,
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from autogen import ConversableAgent
 import psycopg2
@@ -11,6 +12,8 @@ import time
 from sqlalchemy import create_engine, text
 from fastapi import APIRouter
 from psycopg2.extras import RealDictCursor
+from agent.agent_pool import agent_pool
+from utils.deadline import record_partial
 logging.basicConfig(
     level=logging.DEBUG,  # hiển thị từ DEBUG trở lên (DEBUG, INFO, WARNING, ERROR, CRITICAL)
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
@@ -224,7 +227,8 @@ class SQLAgent:
             print(f"Extracted SQL Query Info: {query_info}")
             query_info['chat_id'] = ""
 
-            raw_results = self.query_postgres(query_info)[0]
+            # psycopg2 là blocking → chạy trong thread pool
+            raw_results = (await asyncio.to_thread(self.query_postgres, query_info))[0]
             print(type(raw_results))
             print(f"Raw Query Results: {raw_results}")
             products = []
@@ -251,7 +255,9 @@ class SQLAgent:
                     continue
 
             print(f"Processed Products:🍠🥩🥩🥩🦪🦪🍚🍛🍛 {products}")
-            explanation = self._generate_explanation(query_info, products, user_query, self.user_personality)
+            # Pipeline trả danh sách thô nếu agent vượt budget sau bước này
+            record_partial("products", products)
+            explanation = self._generate_explanation(query_info, products, user_query)
             print(f"Explanation: {explanation}")
             return {
                 "response": explanation,
@@ -276,7 +282,7 @@ class CreateMessagePayload(dict):
 async def product_agent(question: str):
     print("HELLO")
     try:
-        agent = SQLAgent()
+        agent = agent_pool.get(SQLAgent)
         print("❎❎❎❎❎ Sending question to SQLAgent:", question)
         response = await agent.process_query(user_query=question)
         print(f"response: {response}")
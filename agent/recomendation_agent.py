@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from autogen import ConversableAgent
 import psycopg2
@@ -12,7 +13,9 @@ from sqlalchemy import create_engine, text
 from fastapi import APIRouter
 from tool_call.qdrant_search import QSearch
 from services.product import ProductService
-from embedding.search import product_semantic_search
+from embedding.search import aproduct_semantic_search
+from agent.agent_pool import agent_pool
+from utils.deadline import record_partial
 
 class AgentResponse(BaseModel):
     response: str
@@ -78,12 +81,12 @@ class QdrantAgent:
             print("🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩🥩3232132131312🥩🥩🥩🥩🥩🥩")
             return {"collection_name": "products", "payload": "", "limit": 5}
 
-    def _execute_qdrant_query(self, query_info: Dict[str, Any], user_id: str, top_k = 5):
+    async def _execute_qdrant_query(self, query_info: Dict[str, Any], user_id: str, top_k = 5):
         id = str(user_id)
         print(id)
         print("🥨🥐🥯🧀🥖🍠🥟🥠🍤🍤🍣🍣")
         print(f"Executing Qdrant query with info: {query_info}, id: {id}, top_k: {top_k}")
-        result =  product_semantic_search(query_info, id, top_k)
+        result = await aproduct_semantic_search(query_info, id, top_k)
         print(result)
         return result
 
@@ -125,20 +128,23 @@ class QdrantAgent:
             print("🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗🥗")
             print(f"Extracted Qdrant Query Info: {query_info}")
             print(query_info.get("query_text"))
-            raw_results = self._execute_qdrant_query(query_info.get("query_text"), user_id=str(user_id), top_k=5)
+            raw_results = await self._execute_qdrant_query(query_info.get("query_text"), user_id=str(user_id), top_k=5)
             print("🥄🥄🍴🥄🍴🍴🍴🍴🍽🍽🍽🍽🥄🥄🥄🍴🍴🍴🍴🍀🌿🌿🍁🍁🍀🍁🌾🥜🌱🌴🌳🌳🌼🌷🌱☘☘")
             print(f"Raw Results: {raw_results}")
-            # Trích product_id và gọi ProductServices.get
+            # Trích product_id và gọi ProductServices.get (DB query trong thread pool)
+            # Pipeline trả danh sách thô nếu agent vượt budget trước khi explanation xong
             products = []
             for pid in raw_results:
                 if pid:
-                    product = ProductService.get_some_infor(pid)
+                    product = await asyncio.to_thread(ProductService.get_some_infor, pid)
                     if product:
                         products.append(product)
+                        record_partial("products", list(products))
 
             print("🍇🍉🍊🍋🍌🍍🥭🍎🍏🍐🍑🍒🍓🥝🥥🥑🍆🥔🥕🌽🌶️🫑🥒🥬")
             print(f"Products: {products}")
-            explanation = self._generate_explanation(products, user_query)
+            # Gemini call là sync → chạy trong thread để không block event loop
+            explanation = await asyncio.to_thread(self._generate_explanation, products, user_query)
             print(f"Explanation: {explanation}")
             return explanation
 
@@ -160,7 +166,7 @@ async def chatbot_endpoint(request: ChatbotRequest, user_id: str):
         # message_repository.create(message_payload)
         # Tạo câu hỏi cho agent
         question = message
-        agent = QdrantAgent()
+        agent = agent_pool.get(QdrantAgent)
         response = await agent.process_query(user_query=question , user_id=user_id)
         # Lưu phản hồi vào cơ sở dữ liệu
         # response_payload = CreateMessagePayload(
@@ -0,0 +1,54 @@
+"""Create chat_summaries table (rolling conversation summary per chat)
+
+Revision ID: create_chat_summaries_001
+Revises: create_faqs_001
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'create_chat_summaries_001'
+down_revision: Union[str, Sequence[str], None] = 'create_faqs_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create chat_summaries table"""
+    from sqlalchemy import inspect
+
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    # Đọc tin nhắn mới sau summarized_until theo chat
+    message_indexes = [index['name'] for index in inspector.get_indexes('messages')]
+    if 'idx_messages_chat_created' not in message_indexes:
+        op.create_index('idx_messages_chat_created', 'messages', ['chat_id', 'created_at'])
+
+    if 'chat_summaries' in inspector.get_table_names():
+        print("ℹ️  chat_summaries table already exists, skipping creation")
+        return
+
+    op.create_table(
+        'chat_summaries',
+        sa.Column('chat_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('chats.id', ondelete='CASCADE'), primary_key=True, nullable=False),
+        sa.Column('summary', sa.Text, nullable=False),
+        sa.Column('key_points', postgresql.JSONB, server_default=sa.text("'[]'::jsonb"), nullable=False),
+        sa.Column('summarized_until', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('message_count', sa.Integer, server_default='0', nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    print("✅ chat_summaries table created successfully")
+
+
+def downgrade() -> None:
+    """Drop chat_summaries table"""
+    op.drop_index('idx_messages_chat_created', table_name='messages')
+    op.drop_table('chat_summaries')
+    print("✅ chat_summaries table dropped")
@@ -1,4 +1,6 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import FileResponse
 from app_environment import AppEnvironment
@@ -14,7 +16,8 @@ from controllers import (
     pipeline_endpoint,
     file_upload,
     personality,
-    faq
+    faq,
+    metrics
 )
 
 from agent import (
@@ -23,8 +26,19 @@ from agent import (
     compose_history,
     chat_pipeline,
     document_retrieval_agent,
-    personality_agent
+    personality_agent,
+    batch_eval
                    )
+from services.message_writer import message_writer
+from embedding.providers import verify_embedding_dimensions
+from embedding.qdrant_collections import collection_manager
+from embedding.qdrant_connection import get_qdrant, close_qdrant
+from agent.agent_pool import agent_pool
+from agent.product_agent import SQLAgent
+from agent.recomendation_agent import QdrantAgent
+from agent.personalization_agent import PersonalizationAgent
+from agent.document_retrieval_agent import DocumentRetrievalAgent
+from agent.myself import MySelfAgent
 from starlette.middleware.base import BaseHTTPMiddleware
 from env import env
 
@@ -32,7 +46,33 @@ from env import env
 # Not thread safe, so it should be update once we are running multiple instances
 alembic.config.main(argv=["--raiseerr", "upgrade", "head"])
 
-app = FastAPI(debug=env.DEBUG)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    if env.MESSAGE_WRITER_ENABLED:
+        await message_writer.start()
+    # Build agents + LLM/Qdrant clients 1 lần trước request đầu tiên
+    build_seconds = agent_pool.warm_up([
+        SQLAgent, QdrantAgent, PersonalizationAgent, DocumentRetrievalAgent, MySelfAgent
+    ])
+    print(f"✅ Agent pool warmed: {build_seconds}")
+    # Load embedding provider (warm-up model local) + so số chiều với Qdrant collections
+    await asyncio.to_thread(verify_embedding_dimensions, get_qdrant())
+    # Tạo collections còn thiếu, sửa HNSW / quantization / payload indexes lệch schema
+    if env.QDRANT_RECONCILE_ON_STARTUP:
+        try:
+            await asyncio.to_thread(collection_manager.reconcile)
+        except Exception as e:
+            print(f"⚠️  Qdrant reconcile failed: {e}")
+    yield
+    # Shutdown: flush các tin nhắn còn trong write-behind queue
+    await message_writer.stop()
+    # Đóng Qdrant connection pool / gRPC channels
+    await close_qdrant()
+
+
+app = FastAPI(debug=env.DEBUG, lifespan=lifespan)
 
 if AppEnvironment.is_local_env(env.APP_ENV):
     app.add_middleware(
@@ -50,6 +90,7 @@ app.include_router(recomendation_agent.router, prefix="/api")
 app.include_router(product_agent.router, prefix="/api")
 app.include_router(document_retrieval_agent.router, prefix="/api")
 app.include_router(personality_agent.router, prefix="/api")
+app.include_router(batch_eval.router, prefix="/api")
 
 app.include_router(chatbot.router, prefix="/api")
 # app.include_router(ani_chat.router, prefix="/api")
@@ -61,6 +102,7 @@ app.include_router(pipeline_endpoint.router, prefix="/api")
 app.include_router(file_upload.router, prefix="/api")
 app.include_router(personality.router)
 app.include_router(faq.router)  # FAQ endpoints
+app.include_router(metrics.router)  # Prometheus scrape endpoint
 
 class StaticFileMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
@@ -0,0 +1 @@
+"""Hermetic benchmarks cho chat pipeline (fake OpenAI, in-memory Qdrant, throwaway Postgres)"""
@@ -0,0 +1,271 @@
+"""
+Fake OpenAI-compatible server cho load test (không tốn OpenAI credits)
+
+Endpoints:
+- POST /v1/chat/completions: trả canned response theo system prompt của agent
+  (Manager routing JSON, SQL query JSON, Qdrant query JSON, personalization JSON,
+  chat summary JSON, còn lại là câu trả lời text), hỗ trợ stream=true (SSE chunks)
+- POST /v1/embeddings: vector deterministic theo hash của text (cùng text → cùng
+  vector), đúng số chiều được yêu cầu
+
+Latency cấu hình được (base + jitter, và delay giữa các token khi stream) để
+mô phỏng thời gian phản hồi của OpenAI.
+
+Run standalone:
+    python -m benchmarks.fake_openai --port 18080 --latency-ms 300
+    OPENAI_BASE_URL=http://127.0.0.1:18080/v1 uvicorn app:app
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    token_interval_ms: float = 15.0
+    embedding_latency_ms: float = 40.0
+
+
+# (keyword trong câu hỏi, agent) - giống phân loại trong system prompt của Manager Agent
+ROUTING_RULES = [
+    (("cái nào", "ai nên", "phù hợp cho", "so sánh"), "PersonalizationAgent"),
+    (("chính sách", "quy định", "hướng dẫn", "điều khoản", "bảo hành", "faq"), "DocumentRetrievalAgent"),
+    (("tìm", "giá", "laptop", "điện thoại", "tai nghe", "dưới", "triệu"), "ProductAgent"),
+]
+
+ANSWER_TEXT = (
+    "Cảm ơn bạn đã hỏi! Đây là câu trả lời mô phỏng từ fake OpenAI server dùng cho "
+    "load test của NAVITECH. Nội dung đủ dài để stream thành nhiều token và đo "
+    "được thời gian xử lý của từng stage trong pipeline."
+)
+
+
+def _last_user_message(messages: List[Dict[str, Any]]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return str(message.get("content") or "")
+    return ""
+
+
+def _system_message(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(m.get("content") or "") for m in messages if m.get("role") == "system")
+
+
+def _route(prompt: str) -> str:
+    # Routing prompt: "Câu hỏi: ..." hoặc "... Câu hỏi hiện tại: ..."
+    match = re.search(r"Câu hỏi(?: hiện tại)?:\s*(.+)", prompt)
+    question = (match.group(1) if match else prompt).lower()
+    for keywords, agent in ROUTING_RULES:
+        if any(keyword in question for keyword in keywords):
+            return agent
+    return "MySelf"
+
+
+def canned_completion(messages: List[Dict[str, Any]]) -> str:
+    """Nội dung trả về theo loại agent (nhận diện qua system prompt)"""
+    system = _system_message(messages)
+    prompt = _last_user_message(messages)
+
+    if "PHÂN LOẠI AGENT" in system:
+        return json.dumps({"agent": _route(prompt), "query": prompt}, ensure_ascii=False)
+    if "SQL Query Generator" in system:
+        return "```json\n" + json.dumps({
+            "sql_query": "SELECT id, title, description, price, brand, category FROM products "
+                         "WHERE LOWER(title) LIKE '%laptop%' LIMIT 5"
+        }) + "\n```"
+    if "chuyên gia Qdrant" in system:
+        return "```json\n" + json.dumps({"query_text": prompt[:200]}, ensure_ascii=False) + "\n```"
+    if "chuyên gia tư vấn sản phẩm" in system:
+        return json.dumps({
+            "recommendation": "Laptop Bench Pro 14",
+            "reason": "Cấu hình cân bằng, pin lâu",
+            "alternatives": ["Laptop Bench Air 13", "Laptop Bench Max 16"],
+            "note": "Dữ liệu mô phỏng",
+        }, ensure_ascii=False)
+    if "chuyên gia tổng hợp lịch sử" in system:
+        return json.dumps({
+            "summary": "Người dùng hỏi về sản phẩm và chính sách của NAVITECH",
+            "key_points": ["Quan tâm laptop", "Hỏi chính sách đổi trả"],
+        }, ensure_ascii=False)
+    return ANSWER_TEXT
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Unit vector deterministic theo text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).astype(float).tolist()
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def create_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    config = config or FakeLLMConfig()
+    app = FastAPI(title="Fake OpenAI")
+    app.state.requests = 0
+
+    async def _sleep_latency():
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        messages = body.get("messages", [])
+        model = body.get("model", "gpt-fake")
+        content = canned_completion(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        prompt_tokens = sum(_tokens(str(m.get("content") or "")) for m in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": _tokens(content),
+            "total_tokens": prompt_tokens + _tokens(content),
+        }
+
+        await _sleep_latency()
+
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": usage,
+            })
+
+        async def event_stream():
+            words = content.split(" ")
+            for index, word in enumerate(words):
+                delta = word if index == 0 else f" {word}"
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(config.token_interval_ms / 1000)
+            done = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = int(body.get("dimensions") or 1536)
+        await asyncio.sleep(config.embedding_latency_ms / 1000)
+        return JSONResponse({
+            "object": "list",
+            "model": body.get("model", "text-embedding-fake"),
+            "data": [
+                {"object": "embedding", "index": index, "embedding": fake_embedding(str(text), dimensions)}
+                for index, text in enumerate(inputs)
+            ],
+            "usage": {
+                "prompt_tokens": sum(_tokens(str(text)) for text in inputs),
+                "total_tokens": sum(_tokens(str(text)) for text in inputs),
+            },
+        })
+
+    return app
+
+
+class FakeOpenAIServer:
+    """
+    Chạy fake server trong thread riêng (event loop riêng) để không ảnh hưởng
+    event-loop lag đo được của app dưới tải
+    """
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None, host: str = "127.0.0.1", port: int = 18080):
+        self.app = create_app(config)
+        self.host = host
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(
+            self.app, host=host, port=port, log_level="warning", access_log=False
+        ))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def requests(self) -> int:
+        return self.app.state.requests
+
+    def start(self, timeout: float = 10.0) -> None:
+        self._thread = threading.Thread(target=self._server.run, name="fake-openai", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake OpenAI server failed to start")
+            time.sleep(0.05)
+        print(f"🤖 Fake OpenAI server: {self.base_url}")
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--token-interval-ms", type=float, default=15.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        token_interval_ms=args.token_interval_ms,
+        embedding_latency_ms=args.embedding_latency_ms,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Hermetic load test cho chat pipeline
+
+Chạy FastAPI app thật (uvicorn, cùng process) với các backend giả lập:
+- Fake OpenAI-compatible server (benchmarks/fake_openai.py) qua OPENAI_BASE_URL
+- Qdrant in-memory (local mode) thay cho Qdrant server
+- Throwaway Postgres (docker, migrate bằng alembic khi import app)
+
+Tạo tải đồng thời lên từng endpoint và báo cáo throughput, latency
+p50/p95/p99 (stream: thêm time-to-first-byte) và event-loop lag của app.
+Kết quả ghi ra benchmarks/results/<commit>.json để so sánh giữa các commit.
+
+Không dùng RecommendationAgent trong query mix (agent này gọi Gemini).
+
+Run:
+    python -m benchmarks.pipeline_load
+    python -m benchmarks.pipeline_load --concurrency 32 --requests 500 --llm-latency-ms 800
+    python -m benchmarks.pipeline_load --baseline benchmarks/results/abc1234.json --max-regression 0.15
+    python -m benchmarks.pipeline_load --database-port 55432   # Postgres tạm có sẵn, không dùng docker
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.backends import (
+    ThrowawayPostgres,
+    env_overrides,
+    in_memory_qdrant,
+    install_qdrant,
+    seed_database,
+    seed_qdrant,
+)
+from benchmarks.fake_openai import FakeLLMConfig, FakeOpenAIServer
+from utils.metrics import percentile
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Query mix theo agent (không có RecommendationAgent - Gemini)
+QUERY_MIX = [
+    "NAVITECH là công ty gì?",
+    "Tìm laptop dưới 30 triệu",
+    "Chính sách đổi trả như thế nào?",
+    "Điều khoản bảo hành ra sao?",
+    "Cái nào phù hợp cho sinh viên hơn?",
+    "Xin chào, bạn có thể giúp gì cho tôi?",
+]
+
+ENDPOINTS = {
+    "full_pipeline": "/api/chatbots/full_pipeline",
+    "full_pipeline_stream": "/api/chatbots/full_pipeline/stream",
+}
+
+# Env bắt buộc của env.Env khi chạy benchmark không có .env
+REQUIRED_ENV_DEFAULTS = {
+    "APP_ENV": "local",
+    "DEBUG": "false",
+    "FASTAPI_PORT": "18000",
+    "QDRANT_HOST": "127.0.0.1",
+    "QDRANT_PORT": "6333",
+    "OPENAI_API_MODEL": "gpt-4o-mini",
+    "LEN_EMBEDDING": "1536",
+}
+
+
+class LoopLagMonitor:
+    """Đo độ trễ của event loop: sleep(interval) thực tế dài hơn interval bao nhiêu"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval) * 1000)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def reset(self):
+        self.samples = []
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def _configure_env(overrides: Dict[str, str]) -> None:
+    """
+    Áp overrides lên os.environ VÀ env object
+
+    env.py load .env với override=True, nên phải ghi đè lại sau khi import env
+    (trước khi import db / app / agents).
+    """
+    for key, value in REQUIRED_ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    os.environ.setdefault("POSTGRES_PORT", overrides["POSTGRES_PORT"])
+    for key in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB", "DATABASE_URL"):
+        os.environ.setdefault(key, overrides[key])
+
+    from env import Env, env
+
+    os.environ.update(overrides)
+    validated = Env.model_validate({**env.model_dump(), **overrides})
+    for field in Env.model_fields:
+        setattr(env, field, getattr(validated, field))
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def _one_request(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    query: str,
+    chat_id: uuid.UUID,
+    user_id: uuid.UUID
+) -> Dict[str, Any]:
+    params = {"query": query, "chat_id": str(chat_id), "user_id": str(user_id)}
+    start = time.perf_counter()
+    ttfb = None
+    try:
+        async with client.stream("POST", ENDPOINTS[endpoint], params=params) as response:
+            async for _ in response.aiter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+            ok = response.status_code == 200
+    except Exception:
+        ok = False
+    latency = time.perf_counter() - start
+    return {"ok": ok, "latency_ms": latency * 1000, "ttfb_ms": (ttfb or latency) * 1000}
+
+
+async def run_endpoint(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    user_id: uuid.UUID,
+    chat_ids: List[uuid.UUID],
+    total_requests: int,
+    concurrency: int,
+    lag_monitor: LoopLagMonitor,
+    unique_queries: bool = True
+) -> Dict[str, Any]:
+    """Closed-loop load: `concurrency` workers gửi tổng cộng `total_requests` requests"""
+    counter = iter(range(total_requests))
+    results: List[Dict[str, Any]] = []
+
+    async def worker(worker_id: int):
+        chat_id = chat_ids[worker_id % len(chat_ids)]
+        for index in counter:
+            query = QUERY_MIX[index % len(QUERY_MIX)]
+            if unique_queries:
+                # Câu hỏi khác nhau → không đo nhầm routing / semantic cache hit
+                query = f"{query} (#{index})"
+            results.append(await _one_request(client, endpoint, query, chat_id, user_id))
+
+    lag_monitor.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [r["latency_ms"] for r in results if r["ok"]]
+    ttfbs = [r["ttfb_ms"] for r in results if r["ok"]]
+    lag = list(lag_monitor.samples)
+    return {
+        "requests": len(results),
+        "errors": sum(1 for r in results if not r["ok"]),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies), 2) if latencies else 0.0,
+            "mean": round(statistics.mean(latencies), 2) if latencies else 0.0,
+        },
+        "ttfb_ms": {
+            "p50": round(percentile(ttfbs, 50), 2),
+            "p95": round(percentile(ttfbs, 95), 2),
+            "p99": round(percentile(ttfbs, 99), 2),
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(lag, 50), 2),
+            "p99": round(percentile(lag, 99), 2),
+            "max": round(max(lag), 2) if lag else 0.0,
+        },
+    }
+
+
+async def run_load(args, user_id: uuid.UUID, chat_ids: List[uuid.UUID]) -> Dict[str, Dict[str, Any]]:
+    import uvicorn
+    from app import app
+
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=args.app_port, log_level="warning", access_log=False, lifespan="on"
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server_task.done():
+            raise RuntimeError("App server failed to start")
+        await asyncio.sleep(0.05)
+
+    lag_monitor = LoopLagMonitor()
+    lag_monitor.start()
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.app_port}", timeout=args.timeout, limits=limits
+        ) as client:
+            for endpoint in args.endpoints:
+                print(f"🔥 Warm-up {endpoint} ({args.warmup} requests)")
+                await run_endpoint(client, endpoint, user_id, chat_ids, args.warmup, min(args.concurrency, max(1, args.warmup)), lag_monitor)
+                print(f"🚀 Load {endpoint}: {args.requests} requests, concurrency={args.concurrency}")
+                results[endpoint] = await run_endpoint(
+                    client, endpoint, user_id, chat_ids, args.requests, args.concurrency, lag_monitor,
+                    unique_queries=not args.repeat_queries
+                )
+    finally:
+        await lag_monitor.stop()
+        server.should_exit = True
+        await server_task
+    return results
+
+
+def _print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n📊 {'endpoint':<24}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'ttfb95':>9}{'lag99':>8}{'err':>6}")
+    for endpoint, stats in results.items():
+        print(
+            f"   {endpoint:<24}{stats['throughput_rps']:>8.1f}"
+            f"{stats['latency_ms']['p50']:>9.0f}{stats['latency_ms']['p95']:>9.0f}{stats['latency_ms']['p99']:>9.0f}"
+            f"{stats['ttfb_ms']['p95']:>9.0f}{stats['loop_lag_ms']['p99']:>8.1f}{stats['errors']:>6}"
+        )
+
+
+def compare_with_baseline(results: Dict[str, Dict[str, Any]], baseline_path: str, max_regression: float) -> List[str]:
+    """So sánh p95 latency và throughput với baseline, trả về danh sách regressions"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["endpoints"]
+
+    regressions = []
+    for endpoint, stats in results.items():
+        base = baseline.get(endpoint)
+        if not base:
+            continue
+        p95, base_p95 = stats["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        if base_p95 and p95 > base_p95 * (1 + max_regression):
+            regressions.append(f"{endpoint}: p95 {base_p95:.0f}ms → {p95:.0f}ms")
+        rps, base_rps = stats["throughput_rps"], base["throughput_rps"]
+        if base_rps and rps < base_rps * (1 - max_regression):
+            regressions.append(f"{endpoint}: throughput {base_rps:.1f} → {rps:.1f} rps")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hermetic load test cho chat pipeline")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Số requests đo cho mỗi endpoint")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--repeat-queries", action="store_true", help="Lặp lại câu hỏi (đo cả cache hits)")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--token-interval-ms", type=float, default=15.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=40.0)
+    parser.add_argument("--app-port", type=int, default=18000)
+    parser.add_argument("--openai-port", type=int, default=18080)
+    parser.add_argument("--database-port", type=int, help="Dùng Postgres tạm có sẵn (postgres/mypassword/chatbot)")
+    parser.add_argument("--output", help="File kết quả (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="Kết quả của commit trước để so sánh")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fake_openai = FakeOpenAIServer(FakeLLMConfig(
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        token_interval_ms=args.token_interval_ms,
+        embedding_latency_ms=args.embedding_latency_ms,
+    ), port=args.openai_port)
+    postgres = None if args.database_port else ThrowawayPostgres()
+
+    try:
+        fake_openai.start()
+        port = args.database_port or postgres.start()
+        overrides = env_overrides(port)
+        overrides.update({
+            "OPENAI_BASE_URL": fake_openai.base_url,
+            "OPENAI_API_KEY": "sk-bench",
+            "ROUTING_LOG_PATH": "",
+            # Hermetic: không đọc / ghi embedding cache trên disk
+            "EMBEDDING_CACHE_ENABLED": "false",
+            # Qdrant local mode: collections tạo sẵn bởi in_memory_qdrant()
+            "QDRANT_RECONCILE_ON_STARTUP": "false",
+        })
+        _configure_env(overrides)
+
+        from env import env
+        import app  # noqa: F401 - chạy alembic migrations trên throwaway Postgres
+
+        qdrant = in_memory_qdrant(env.LEN_EMBEDDING)
+        install_qdrant(qdrant, env.LEN_EMBEDDING)
+        user_id = uuid.uuid4()
+        chat_ids = [uuid.uuid4() for _ in range(args.concurrency)]
+        product_ids = seed_database(user_id, chat_ids)
+        seed_qdrant(qdrant, user_id, product_ids, env.LEN_EMBEDDING)
+
+        results = asyncio.run(run_load(args, user_id, chat_ids))
+    finally:
+        fake_openai.stop()
+        if postgres is not None:
+            postgres.stop()
+
+    _print_report(results)
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "token_interval_ms": args.token_interval_ms,
+            "embedding_latency_ms": args.embedding_latency_ms,
+            "repeat_queries": args.repeat_queries,
+        },
+        "fake_openai_requests": fake_openai.requests,
+        "endpoints": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Results: {output}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.max_regression)
+        if regressions:
+            print(f"❌ Performance regressions (> {args.max_regression:.0%}):")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,8 @@ from . import (
     product,
     pipeline_endpoint,
     file_upload,
-    personality
+    personality,
+    metrics
 )
 
 __all__ = [
@@ -20,5 +21,6 @@ __all__ = [
     "product",
     "pipeline_endpoint",
     "file_upload",
-    "personality"
+    "personality",
+    "metrics"
 ]
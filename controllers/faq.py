@@ -30,6 +30,9 @@ from agent.faq_agent import FAQAgent
 
 router = APIRouter(prefix="/api/faqs", tags=["FAQ Management"])
 
+# FAQAgent stateless (threshold truyền theo từng request) → dùng chung 1 instance
+faq_agent = FAQAgent()
+
 
 @router.post("/", response_model=FAQModel, status_code=201)
 async def create_faq(
@@ -54,7 +57,7 @@ async def create_faq(
         # Sync to Qdrant nếu enabled
         if sync_to_qdrant:
             faq_emb = get_faq_embedding()
-            success = faq_emb.sync_faq_to_qdrant(
+            success = await faq_emb.async_faq_to_qdrant(
                 faq_id=faq.id,
                 user_id=faq.user_id,
                 question=faq.question,
@@ -160,7 +163,7 @@ async def update_faq(
         # Re-sync to Qdrant nếu enabled
         if sync_to_qdrant:
             faq_emb = get_faq_embedding()
-            faq_emb.sync_faq_to_qdrant(
+            await faq_emb.async_faq_to_qdrant(
                 faq_id=faq.id,
                 user_id=faq.user_id,
                 question=faq.question,
@@ -206,7 +209,7 @@ async def delete_faq(
         # Delete from Qdrant nếu enabled
         if delete_from_qdrant and not soft:  # Chỉ xóa khỏi Qdrant nếu hard delete
             faq_emb = get_faq_embedding()
-            faq_emb.delete_faq_from_qdrant(faq_id)
+            await faq_emb.adelete_faq_from_qdrant(faq_id)
         
         return {
             "success": True,
@@ -255,7 +258,7 @@ async def bulk_create_faqs(
                 }
                 for faq in faqs
             ]
-            faq_emb.bulk_sync_faqs(sync_data)
+            await faq_emb.abulk_sync_faqs(sync_data)
         
         return faqs
         
@@ -285,7 +288,7 @@ async def sync_faq_to_qdrant(
             raise HTTPException(status_code=404, detail="FAQ not found")
         
         faq_emb = get_faq_embedding()
-        success = faq_emb.sync_faq_to_qdrant(
+        success = await faq_emb.async_faq_to_qdrant(
             faq_id=faq.id,
             user_id=faq.user_id,
             question=faq.question,
@@ -329,10 +332,8 @@ async def test_faq_match(
         Matching results với scores
     """
     try:
-        agent = FAQAgent(threshold=threshold)
-        
-        # Get all matches (không chỉ best match)
-        matches = agent.get_all_matches(query, user_id, threshold)
+        # Get all matches (không chỉ best match), threshold truyền theo request
+        matches = await faq_agent.aget_all_matches(query, user_id, threshold)
         
         return {
             "query": query,
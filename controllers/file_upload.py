@@ -9,6 +9,8 @@ from datetime import datetime
 # Add AI_crawl to path để import pipeline
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'AI_crawl'))
 
+from embedding.semantic_cache import bump_data_version
+
 router = APIRouter(
     prefix="/upload",
     tags=["File Upload"]
@@ -126,6 +128,7 @@ async def upload_product_file(
             user_id=user_id,
             website_name=website_name
         )
+        bump_data_version(user_id)
         
         return ProductUploadResponse(
             status="success",
@@ -213,6 +216,7 @@ async def upload_document_file(
             user_id=user_id,
             document_name=document_name or file.filename
         )
+        bump_data_version(user_id)
         
         return DocumentUploadResponse(
             status="success",
@@ -334,6 +338,7 @@ async def upload_product_from_google_sheets(
             user_id=request.user_id,
             website_name=request.website_name
         )
+        bump_data_version(request.user_id)
         
         return ProductUploadResponse(
             status="success",
@@ -0,0 +1,22 @@
+"""
+Metrics Controller - Prometheus scrape endpoint
+
+Endpoints:
+- GET /metrics - Stage latency histograms + cache counters (Prometheus text format)
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils.metrics import render_prometheus
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition của toàn bộ metrics trong process"""
+    return PlainTextResponse(
+        render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,252 @@
+"""
+Embedding Cache - Cache embeddings lâu dài theo nội dung text (SQLite)
+
+- Key = sha256(model, dimensions, text đã chuẩn hóa) → cùng nội dung (mô tả sản
+  phẩm khi recrawl, câu hỏi FAQ khi sync, câu hỏi phổ biến khi chat) không bị
+  embed lại, kể cả sau khi restart
+- Chuẩn hóa: Unicode NFC + gộp khoảng trắng (giữ nguyên hoa/thường vì embedding
+  phân biệt)
+- Vector lưu dạng float32 bytes; giới hạn max_entries, vượt quá thì evict các
+  entries lâu không dùng nhất (theo last_used)
+- Thread-safe (crawler dùng nhiều threads); code trong event loop dùng bản async
+  aget_many / aput_many (SQLite I/O + lock chạy trong thread pool)
+
+Usage:
+    cached = embedding_cache.get_many(model, dims, texts)   # [vector | None]
+    embedding_cache.put_many(model, dims, texts, vectors)
+    cached = await embedding_cache.aget_many(model, dims, texts)
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+from env import env
+from utils.metrics import counter, gauge, register_collector
+
+EMBEDDING_CACHE_REQUESTS = counter(
+    "embedding_cache_requests_total",
+    "Embedding cache lookups by result (hit, miss)",
+    ("result",),
+)
+EMBEDDING_CACHE_ENTRIES = gauge("embedding_cache_entries", "Embeddings stored in the persistent embedding cache")
+
+# SQLite giới hạn số biến / câu lệnh
+_SQL_CHUNK = 500
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(model: str, dimensions: int, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{dimensions}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent content-addressed embedding cache"""
+
+    def __init__(self, path: str, max_entries: int = 200000, enabled: bool = True):
+        self.path = path
+        self.max_entries = max_entries
+        self.enabled = enabled and max_entries > 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.enabled:
+            return None
+        if self._conn is None:
+            try:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    " key TEXT PRIMARY KEY,"
+                    " model TEXT NOT NULL,"
+                    " dimensions INTEGER NOT NULL,"
+                    " vector BLOB NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " last_used REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+                self._entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self._conn = conn
+                print(f"🗄️  Embedding cache: {self.path} ({self._entries} entries)")
+            except sqlite3.Error as e:
+                print(f"⚠️  Embedding cache disabled: {e}")
+                self.enabled = False
+                return None
+        return self._conn
+
+    def get_many(self, model: str, dimensions: int, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Vectors đã cache theo thứ tự texts (None nếu miss)"""
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        if not texts:
+            return results
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return results
+            keys = [cache_key(model, dimensions, text) for text in texts]
+            found: Dict[str, bytes] = {}
+            try:
+                unique = list(dict.fromkeys(keys))
+                for start in range(0, len(unique), _SQL_CHUNK):
+                    chunk = unique[start:start + _SQL_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    found.update(conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ).fetchall())
+                    hit_keys = [key for key in chunk if key in found]
+                    if hit_keys:
+                        conn.execute(
+                            f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                            [time.time(), *hit_keys]
+                        )
+            except sqlite3.Error as e:
+                print(f"⚠️  Embedding cache read error: {e}")
+
+            for index, key in enumerate(keys):
+                blob = found.get(key)
+                if blob is not None:
+                    results[index] = array("f", blob).tolist()
+            hits = sum(1 for result in results if result is not None)
+            self.hits += hits
+            self.misses += len(texts) - hits
+        if hits:
+            EMBEDDING_CACHE_REQUESTS.inc(hits, result="hit")
+        if len(texts) - hits:
+            EMBEDDING_CACHE_REQUESTS.inc(len(texts) - hits, result="miss")
+        return results
+
+    def get(self, model: str, dimensions: int, text: str) -> Optional[List[float]]:
+        return self.get_many(model, dimensions, [text])[0]
+
+    async def aget_many(self, model: str, dimensions: int, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Bản async của get_many (không block event loop)"""
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+        return await asyncio.to_thread(self.get_many, model, dimensions, texts)
+
+    async def aget(self, model: str, dimensions: int, text: str) -> Optional[List[float]]:
+        return (await self.aget_many(model, dimensions, [text]))[0]
+
+    def put_many(
+        self,
+        model: str,
+        dimensions: int,
+        texts: Sequence[str],
+        vectors: Sequence[Optional[Sequence[float]]]
+    ) -> None:
+        """Lưu vectors (bỏ qua None / sai số chiều), evict nếu vượt max_entries"""
+        now = time.time()
+        rows = [
+            (cache_key(model, dimensions, text), model, dimensions, array("f", vector).tobytes(), now, now)
+            for text, vector in zip(texts, vectors)
+            if vector is not None and len(vector) == dimensions
+        ]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute("BEGIN")
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, model, dimensions, vector, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                inserted = conn.total_changes - before
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                conn.execute("ROLLBACK")
+                print(f"⚠️  Embedding cache write error: {e}")
+                return
+            self._entries += inserted
+            self.writes += inserted
+            if self._entries > self.max_entries:
+                self._evict(conn)
+
+    async def aput_many(
+        self,
+        model: str,
+        dimensions: int,
+        texts: Sequence[str],
+        vectors: Sequence[Optional[Sequence[float]]]
+    ) -> None:
+        """Bản async của put_many (không block event loop)"""
+        if not self.enabled or not texts:
+            return
+        await asyncio.to_thread(self.put_many, model, dimensions, texts, vectors)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Evict thêm 10% để không phải evict lại ở mỗi lần ghi
+        target = int(self.max_entries * 0.9)
+        excess = self._entries - target
+        try:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self.evictions += excess
+            print(f"🧹 Embedding cache evicted {excess} entries")
+        except sqlite3.Error as e:
+            print(f"⚠️  Embedding cache eviction error: {e}")
+
+    def clear(self) -> int:
+        """Xóa toàn bộ cache, trả về số entries đã xóa"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            removed = conn.execute("DELETE FROM embeddings").rowcount
+            self._entries = 0
+            return removed
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+embedding_cache = EmbeddingCache(
+    path=env.EMBEDDING_CACHE_PATH,
+    max_entries=env.EMBEDDING_CACHE_MAX_ENTRIES,
+    enabled=env.EMBEDDING_CACHE_ENABLED,
+)
+
+register_collector(lambda: EMBEDDING_CACHE_ENTRIES.set(len(embedding_cache)))
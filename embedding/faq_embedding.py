@@ -5,12 +5,17 @@ Functions:
 - sync_faq_to_qdrant: Đồng bộ FAQ từ PostgreSQL vào Qdrant
 - delete_faq_from_qdrant: Xóa FAQ khỏi Qdrant
 - recreate_faq_collection: Tạo lại collection FAQs
+- async_faq_to_qdrant / adelete_faq_from_qdrant / abulk_sync_faqs: bản async cho
+  API handlers (AsyncQdrantClient dùng chung, không block event loop)
 """
 
+import asyncio
 import uuid
-from typing import List, Dict, Any
-from qdrant_client import QdrantClient, models
-from embedding.generate_embeddings import generate_embedding
+from typing import List, Dict, Any, Optional
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from embedding.generate_embeddings import generate_embedding, generate_embeddings, agenerate_embedding, agenerate_embeddings
+from embedding.qdrant_collections import collection_manager
+from embedding.qdrant_connection import get_qdrant, get_async_qdrant
 from env import env
 
 
@@ -18,10 +23,13 @@ class FAQEmbedding:
     """Class xử lý FAQ embedding operations"""
     
     def __init__(self, qdrant_url: str = None):
+        # Mặc định dùng clients dùng chung (embedding/qdrant_connection.py)
         if qdrant_url is None:
-            from env import env
-            qdrant_url = f"http://{env.QDRANT_HOST}:{env.QDRANT_PORT}"
-        self.qdrant = QdrantClient(qdrant_url)
+            self.qdrant = get_qdrant()
+            self.aqdrant = get_async_qdrant()
+        else:
+            self.qdrant = QdrantClient(qdrant_url)
+            self.aqdrant = AsyncQdrantClient(qdrant_url)
         self.collection_name = "faqs"
         self.embedding_dim = env.LEN_EMBEDDING
     
@@ -33,50 +41,34 @@ class FAQEmbedding:
             True nếu collection exists hoặc tạo thành công
         """
         try:
-            # Check if collection exists
-            collections = self.qdrant.get_collections()
-            collection_names = [c.name for c in collections.collections]
-            
-            if self.collection_name in collection_names:
-                print(f"✅ Collection '{self.collection_name}' already exists")
-                return True
-            
-            # Create collection
-            print(f"📦 Creating collection '{self.collection_name}'...")
-            self.qdrant.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=self.embedding_dim,
-                    distance=models.Distance.COSINE
-                )
-            )
-            
-            # Create payload index for faster filtering
-            self.qdrant.create_payload_index(
-                collection_name=self.collection_name,
-                field_name="user_id",
-                field_schema=models.PayloadSchemaType.KEYWORD
-            )
-            
-            self.qdrant.create_payload_index(
-                collection_name=self.collection_name,
-                field_name="category",
-                field_schema=models.PayloadSchemaType.KEYWORD
-            )
-            
-            self.qdrant.create_payload_index(
-                collection_name=self.collection_name,
-                field_name="is_active",
-                field_schema=models.PayloadSchemaType.BOOL
-            )
-            
-            print(f"✅ Collection '{self.collection_name}' created successfully")
+            # Schema (quantization, HNSW, payload indexes) + cache existence check
+            # nằm ở embedding/qdrant_collections.py
+            collection_manager.ensure(self.collection_name)
             return True
             
         except Exception as e:
             print(f"❌ Error ensuring collection exists: {e}")
             return False
     
+    def _faq_point(self, faq: Dict[str, Any], embedding: Optional[List[float]]) -> Optional[models.PointStruct]:
+        """PointStruct cho FAQ (faq_id là point id), None nếu embedding không hợp lệ"""
+        if not embedding or len(embedding) != self.embedding_dim:
+            print(f"❌ Invalid embedding for FAQ: {faq['faq_id']}")
+            return None
+        return models.PointStruct(
+            id=str(faq["faq_id"]),
+            vector=embedding,
+            payload={
+                "faq_id": str(faq["faq_id"]),
+                "user_id": str(faq["user_id"]),
+                "question": faq["question"],
+                "answer": faq["answer"],
+                "category": faq.get("category") or "",
+                "priority": faq.get("priority", 0),
+                "is_active": faq.get("is_active", True)
+            }
+        )
+    
     def sync_faq_to_qdrant(
         self,
         faq_id: uuid.UUID,
@@ -111,32 +103,59 @@ class FAQEmbedding:
             print(f"🔄 Generating embedding for FAQ: {question[:50]}...")
             embedding = generate_embedding(question)
             
-            if not embedding or len(embedding) != self.embedding_dim:
-                print(f"❌ Invalid embedding generated")
+            point = self._faq_point({
+                "faq_id": faq_id,
+                "user_id": user_id,
+                "question": question,
+                "answer": answer,
+                "category": category,
+                "priority": priority,
+                "is_active": is_active
+            }, embedding)
+            if point is None:
                 return False
             
-            # Prepare payload
-            payload = {
-                "faq_id": str(faq_id),
-                "user_id": str(user_id),
+            # Upsert to Qdrant (use faq_id as point id)
+            self.qdrant.upsert(collection_name=self.collection_name, points=[point])
+            
+            print(f"✅ FAQ synced to Qdrant: {faq_id}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error syncing FAQ to Qdrant: {e}")
+            return False
+    
+    async def async_faq_to_qdrant(
+        self,
+        faq_id: uuid.UUID,
+        user_id: uuid.UUID,
+        question: str,
+        answer: str,
+        category: str = None,
+        priority: int = 0,
+        is_active: bool = True
+    ) -> bool:
+        """Bản async của sync_faq_to_qdrant"""
+        try:
+            if not await asyncio.to_thread(self.ensure_collection_exists):
+                return False
+            
+            print(f"🔄 Generating embedding for FAQ: {question[:50]}...")
+            embedding = await agenerate_embedding(question)
+            
+            point = self._faq_point({
+                "faq_id": faq_id,
+                "user_id": user_id,
                 "question": question,
                 "answer": answer,
-                "category": category or "",
+                "category": category,
                 "priority": priority,
                 "is_active": is_active
-            }
+            }, embedding)
+            if point is None:
+                return False
             
-            # Upsert to Qdrant (use faq_id as point id)
-            self.qdrant.upsert(
-                collection_name=self.collection_name,
-                points=[
-                    models.PointStruct(
-                        id=str(faq_id),
-                        vector=embedding,
-                        payload=payload
-                    )
-                ]
-            )
+            await self.aqdrant.upsert(collection_name=self.collection_name, points=[point])
             
             print(f"✅ FAQ synced to Qdrant: {faq_id}")
             return True
@@ -169,6 +188,22 @@ class FAQEmbedding:
             print(f"❌ Error deleting FAQ from Qdrant: {e}")
             return False
     
+    async def adelete_faq_from_qdrant(self, faq_id: uuid.UUID) -> bool:
+        """Bản async của delete_faq_from_qdrant"""
+        try:
+            await self.aqdrant.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(
+                    points=[str(faq_id)]
+                )
+            )
+            print(f"✅ FAQ deleted from Qdrant: {faq_id}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error deleting FAQ from Qdrant: {e}")
+            return False
+    
     def bulk_sync_faqs(self, faqs: List[Dict[str, Any]]) -> int:
         """
         Đồng bộ nhiều FAQs vào Qdrant
@@ -179,20 +214,48 @@ class FAQEmbedding:
         Returns:
             Số lượng FAQs synced thành công
         """
+        if not faqs:
+            return 0
+        
+        if not self.ensure_collection_exists():
+            return 0
+        
+        # Batch embeddings cho tất cả questions (giữ thứ tự, None nếu lỗi)
+        embeddings = generate_embeddings([faq["question"] for faq in faqs])
+        
+        points = [point for point in map(self._faq_point, faqs, embeddings) if point is not None]
+        
         success_count = 0
+        for start in range(0, len(points), env.EMBEDDING_BATCH_SIZE):
+            batch = points[start:start + env.EMBEDDING_BATCH_SIZE]
+            try:
+                self.qdrant.upsert(collection_name=self.collection_name, points=batch)
+                success_count += len(batch)
+            except Exception as e:
+                print(f"❌ Error upserting {len(batch)} FAQs to Qdrant: {e}")
         
-        for faq in faqs:
-            result = self.sync_faq_to_qdrant(
-                faq_id=faq["faq_id"],
-                user_id=faq["user_id"],
-                question=faq["question"],
-                answer=faq["answer"],
-                category=faq.get("category"),
-                priority=faq.get("priority", 0),
-                is_active=faq.get("is_active", True)
-            )
-            if result:
-                success_count += 1
+        print(f"✅ Bulk sync completed: {success_count}/{len(faqs)} FAQs")
+        return success_count
+    
+    async def abulk_sync_faqs(self, faqs: List[Dict[str, Any]]) -> int:
+        """Bản async của bulk_sync_faqs"""
+        if not faqs:
+            return 0
+        
+        if not await asyncio.to_thread(self.ensure_collection_exists):
+            return 0
+        
+        embeddings = await agenerate_embeddings([faq["question"] for faq in faqs])
+        points = [point for point in map(self._faq_point, faqs, embeddings) if point is not None]
+        
+        success_count = 0
+        for start in range(0, len(points), env.EMBEDDING_BATCH_SIZE):
+            batch = points[start:start + env.EMBEDDING_BATCH_SIZE]
+            try:
+                await self.aqdrant.upsert(collection_name=self.collection_name, points=batch)
+                success_count += len(batch)
+            except Exception as e:
+                print(f"❌ Error upserting {len(batch)} FAQs to Qdrant: {e}")
         
         print(f"✅ Bulk sync completed: {success_count}/{len(faqs)} FAQs")
         return success_count
@@ -205,16 +268,8 @@ class FAQEmbedding:
             True nếu thành công
         """
         try:
-            # Delete collection if exists
-            collections = self.qdrant.get_collections()
-            collection_names = [c.name for c in collections.collections]
-            
-            if self.collection_name in collection_names:
-                print(f"⚠️  Deleting collection '{self.collection_name}'...")
-                self.qdrant.delete_collection(self.collection_name)
-            
-            # Create new collection
-            return self.ensure_collection_exists()
+            collection_manager.recreate(self.collection_name)
+            return True
             
         except Exception as e:
             print(f"❌ Error recreating collection: {e}")
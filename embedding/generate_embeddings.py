@@ -1,67 +1,231 @@
+"""
+Embedding generation (provider theo EMBEDDING_PROVIDER: OpenAI hoặc model local, xem providers.py)
+
+- generate_embedding / query_embedding: 1 text, trả về zero vector nếu lỗi (giữ
+  hành vi cũ cho các caller hiện tại)
+- generate_embeddings: batch API cho ingestion, gom nhiều texts vào 1 request
+  (giới hạn số inputs + tokens / request), giữ đúng thứ tự; text rỗng hoặc lỗi
+  trả về None cho đúng item đó thay vì zero vector
+- agenerate_embedding / aquery_embedding / agenerate_embeddings: bản async cho
+  các code path trong event loop (không block loop); bản sync ở trên là wrapper
+  cho crawler scripts / threads
+- Các query embedding đồng thời (FAQ / product / document search của nhiều chats)
+  được gom thành 1 batch call qua embedding_batcher (cửa sổ vài ms)
+
+Tất cả đi qua embedding_cache (SQLite, key theo model của provider) nên nội dung
+đã embed không bị tạo lại; bản async đọc / ghi cache qua aget_many / aput_many.
+"""
+
+import asyncio
 import numpy as np
 from env import env
 import os
-from openai import OpenAI
+from typing import Dict, List, Optional, Sequence
+from embedding.embedding_cache import embedding_cache
+from embedding.providers import get_embedding_provider
+from utils.micro_batcher import MicroBatcher
+from utils.prompt_builder import count_tokens, truncate_to_tokens
+
+# Giới hạn tokens cho 1 input của text-embedding-3-* (model local tự cắt theo max_seq_length)
+MAX_INPUT_TOKENS = 8191
+
+
+async def _embed_micro_batch(texts: List[str]) -> List[Optional[List[float]]]:
+    return await get_embedding_provider().aembed_batch(texts)
+
+
+embedding_batcher = MicroBatcher(
+    "embeddings",
+    _embed_micro_batch,
+    max_batch_size=env.EMBEDDING_MICROBATCH_MAX_SIZE,
+    max_wait=env.EMBEDDING_MICROBATCH_WAIT_MS / 1000,
+)
+
+
+def _zero_vector() -> List[float]:
+    return np.zeros(env.LEN_EMBEDDING).tolist()
+
+
+def _embed_cached(text: str, retry_limit: int) -> Optional[List[float]]:
+    provider = get_embedding_provider()
+    cached = embedding_cache.get(provider.model_id, env.LEN_EMBEDDING, text)
+    if cached is not None:
+        return cached
+    embedding = provider.embed_batch([text], retry_limit)[0]
+    if embedding is not None:
+        embedding_cache.put_many(provider.model_id, env.LEN_EMBEDDING, [text], [embedding])
+    return embedding
+
+
+async def _aembed_cached(text: str, retry_limit: int) -> Optional[List[float]]:
+    provider = get_embedding_provider()
+    cached = await embedding_cache.aget(provider.model_id, env.LEN_EMBEDDING, text)
+    if cached is not None:
+        return cached
+    if env.EMBEDDING_MICROBATCH_ENABLED:
+        embedding = await embedding_batcher.submit(text)
+    else:
+        embedding = (await provider.aembed_batch([text], retry_limit))[0]
+    if embedding is not None:
+        await embedding_cache.aput_many(provider.model_id, env.LEN_EMBEDDING, [text], [embedding])
+    return embedding
 
 
 def generate_embedding(text: str, retry_limit=3):
-    """Generate embedding using OpenAI API"""
+    """Generate embedding bằng provider đã cấu hình"""
     if not text.strip():
-        return np.zeros(env.LEN_EMBEDDING).tolist()
+        return _zero_vector()
     
-    client = OpenAI(api_key=env.OPENAI_API_KEY)
-    
-    retry_count = 0
-    while retry_count < retry_limit:
-        try:
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text,
-                dimensions=env.LEN_EMBEDDING
-            )
-            
-            if response and response.data:
-                return response.data[0].embedding
-            else:
-                print(f"❌ No embeddings returned")
-                return np.zeros(env.LEN_EMBEDDING).tolist()
-                
-        except Exception as e:
-            print(f"❌ Error generating embedding: {e}")
-            retry_count += 1
-            if retry_count < retry_limit:
-                print(f"⚠️ Retrying... Attempt {retry_count}/{retry_limit}")
-            continue
-    
-    print("❌ All retry attempts failed.")
-    return np.zeros(env.LEN_EMBEDDING).tolist()
+    embedding = _embed_cached(text, retry_limit)
+    return embedding if embedding is not None else _zero_vector()
 
 
 def query_embedding(text: str, retry_limit=3):
-    """Generate query embedding using OpenAI API"""
+    """Generate query embedding bằng provider đã cấu hình"""
+    return generate_embedding(text, retry_limit)
+
+
+async def agenerate_embedding(text: str, retry_limit=3):
+    """Generate embedding (async, không block event loop)"""
     if not text.strip():
-        return np.zeros(env.LEN_EMBEDDING).tolist()
-    
-    client = OpenAI(api_key=env.OPENAI_API_KEY)
+        return _zero_vector()
     
-    retry_count = 0
-    while retry_count < retry_limit:
-        try:
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text,
-                dimensions=env.LEN_EMBEDDING
-            )
-            
-            if response and response.data:
-                return response.data[0].embedding
+    embedding = await _aembed_cached(text, retry_limit)
+    return embedding if embedding is not None else _zero_vector()
+
+
+async def aquery_embedding(text: str, retry_limit=3):
+    """Generate query embedding (async)"""
+    return await agenerate_embedding(text, retry_limit)
+
+
+def _pack_batches(texts: Sequence[str], indexes: List[int], max_batch_size: int, max_batch_tokens: int) -> List[List[int]]:
+    """Chia indexes thành các batch không vượt quá số inputs / tokens cho phép"""
+    batches = []
+    current: List[int] = []
+    current_tokens = 0
+    for index in indexes:
+        tokens = count_tokens(texts[index])
+        if current and (len(current) >= max_batch_size or current_tokens + tokens > max_batch_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class _BatchPlan:
+    """
+    Kết quả theo thứ tự input: cache hits điền sẵn, texts còn lại chia thành batches
+
+    Không tự đọc / ghi embedding_cache: caller sync dùng get_many / put_many,
+    caller async dùng aget_many / aput_many
+    """
+
+    def __init__(self, texts: Sequence[str], max_batch_size: Optional[int], max_batch_tokens: Optional[int]):
+        self.model_id = get_embedding_provider().model_id
+        self.total = len(texts)
+        self.results: List[Optional[List[float]]] = [None] * len(texts)
+        self.prepared = [truncate_to_tokens(text.strip(), MAX_INPUT_TOKENS) if text else "" for text in texts]
+        self.indexes = [index for index, text in enumerate(self.prepared) if text]
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.hits = 0
+        self.pending: Dict[str, List[int]] = {}
+        self.batches: List[List[str]] = []
+
+    @property
+    def lookup_texts(self) -> List[str]:
+        """Texts cần tra embedding_cache (bỏ texts rỗng)"""
+        return [self.prepared[index] for index in self.indexes]
+
+    def plan(self, cached: List[Optional[List[float]]]) -> "_BatchPlan":
+        """Điền cache hits (theo thứ tự lookup_texts), chia phần còn lại thành batches"""
+        # Cache hits không cần tạo lại; texts trùng nhau chỉ embed 1 lần
+        self.hits = sum(1 for vector in cached if vector is not None)
+        for index, vector in zip(self.indexes, cached):
+            if vector is not None:
+                self.results[index] = vector
             else:
-                print(f"❌ No embeddings returned")
-                return np.zeros(env.LEN_EMBEDDING).tolist()
-                
-        except Exception as e:
-            print(f"❌ Error generating embedding: {e}")
-            retry_count += 1
-            if retry_count < retry_limit:
-                print(f"⚠️ Retrying... Attempt {retry_count}/{retry_limit}")
-            continue
\ No newline at end of file
+                self.pending.setdefault(self.prepared[index], []).append(index)
+
+        unique_texts = list(self.pending.keys())
+        self.batches = [
+            [unique_texts[position] for position in batch]
+            for batch in _pack_batches(
+                unique_texts,
+                list(range(len(unique_texts))),
+                self.max_batch_size or env.EMBEDDING_BATCH_SIZE,
+                self.max_batch_tokens or env.EMBEDDING_BATCH_TOKENS
+            )
+        ]
+        return self
+
+    def apply(self, batch_texts: List[str], embeddings: List[Optional[List[float]]]) -> None:
+        for text, embedding in zip(batch_texts, embeddings):
+            for index in self.pending[text]:
+                self.results[index] = embedding
+
+    def finish(self) -> List[Optional[List[float]]]:
+        failed = sum(1 for index in self.indexes if self.results[index] is None)
+        print(
+            f"🧮 Embedded {len(self.indexes) - failed}/{self.total} texts "
+            f"({self.hits} cached, {self.total - len(self.indexes)} empty, {failed} failed)"
+        )
+        return self.results
+
+
+def generate_embeddings(
+    texts: Sequence[str],
+    retry_limit: int = 3,
+    max_batch_size: Optional[int] = None,
+    max_batch_tokens: Optional[int] = None
+) -> List[Optional[List[float]]]:
+    """
+    Batch embeddings cho nhiều texts (ingestion: products, documents, FAQs)
+
+    Args:
+        texts: Danh sách texts
+        retry_limit: Số lần thử lại cho mỗi batch
+        max_batch_size: Số inputs tối đa / request (default EMBEDDING_BATCH_SIZE)
+        max_batch_tokens: Tổng tokens tối đa / request (default EMBEDDING_BATCH_TOKENS)
+
+    Returns:
+        List cùng độ dài và thứ tự với texts, item là None nếu text rỗng hoặc embed lỗi
+    """
+    provider = get_embedding_provider()
+    plan = _BatchPlan(texts, max_batch_size, max_batch_tokens)
+    plan.plan(embedding_cache.get_many(plan.model_id, env.LEN_EMBEDDING, plan.lookup_texts))
+    for batch_texts in plan.batches:
+        embeddings = provider.embed_batch(batch_texts, retry_limit)
+        embedding_cache.put_many(plan.model_id, env.LEN_EMBEDDING, batch_texts, embeddings)
+        plan.apply(batch_texts, embeddings)
+    return plan.finish()
+
+
+async def agenerate_embeddings(
+    texts: Sequence[str],
+    retry_limit: int = 3,
+    max_batch_size: Optional[int] = None,
+    max_batch_tokens: Optional[int] = None,
+    concurrency: Optional[int] = None
+) -> List[Optional[List[float]]]:
+    """
+    Bản async của generate_embeddings, tối đa concurrency batches gửi song song
+    (default EMBEDDING_MAX_CONCURRENCY, vẫn bị giới hạn bởi rate limiter)
+    """
+    provider = get_embedding_provider()
+    plan = _BatchPlan(texts, max_batch_size, max_batch_tokens)
+    plan.plan(await embedding_cache.aget_many(plan.model_id, env.LEN_EMBEDDING, plan.lookup_texts))
+    semaphore = asyncio.Semaphore(max(1, concurrency or env.EMBEDDING_MAX_CONCURRENCY))
+
+    async def run(batch_texts: List[str]) -> None:
+        async with semaphore:
+            embeddings = await provider.aembed_batch(batch_texts, retry_limit)
+            await embedding_cache.aput_many(plan.model_id, env.LEN_EMBEDDING, batch_texts, embeddings)
+            plan.apply(batch_texts, embeddings)
+
+    await asyncio.gather(*(run(batch_texts) for batch_texts in plan.batches))
+    return plan.finish()
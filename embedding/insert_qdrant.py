@@ -1,25 +1,12 @@
 import uuid
-from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, VectorParams, Distance
+from qdrant_client.models import PointStruct
 
-from env import env
-
-qdrant = QdrantClient(f"http://localhost:{env.QDRANT_PORT}")
+from embedding.qdrant_collections import collection_manager
+from embedding.qdrant_connection import get_qdrant
 
 def ensure_collection_exists(USER_ID: str):
-    collections = qdrant.get_collections().collections
-    collection_names = [col.name for col in collections]
-
-    if USER_ID not in collection_names:
-        qdrant.create_collection(
-            collection_name=USER_ID,
-            vectors_config={"default": VectorParams(size=env.LEN_EMBEDDING, distance=Distance.COSINE)},
-            on_disk_payload=False  
-        )
-
-        print(f"✅ Đã tạo collection '{USER_ID}'.")
-    else:
-        print(f"ℹ️ Collection '{USER_ID}' đã tồn tại.")
+    # Schema + cache existence check nằm ở embedding/qdrant_collections.py
+    collection_manager.ensure(USER_ID)
 
 
 
@@ -33,24 +20,12 @@ def insert_products_to_qdrant(embedding: list,  payload: dict, USER_ID: str):
                 "description": payload.get("description"),
             }
         )
-        qdrant.upsert(collection_name=USER_ID, points=[point])
+        get_qdrant().upsert(collection_name=USER_ID, points=[point])
         print(f"✅ Đã chèn dữ liệu vào collection '{payload.get('id')}'.")
 
 
 def ensure_product_collection_exists(COLLECTION_NAME: str = "products"):
-    collections = qdrant.get_collections().collections
-    collection_names = [col.name for col in collections]
-
-    if COLLECTION_NAME not in collection_names:
-        qdrant.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config={"default": VectorParams(size=env.LEN_EMBEDDING, distance=Distance.COSINE)},
-            on_disk_payload=False  
-        )
-
-        print(f"✅ Đã tạo collection '{COLLECTION_NAME}'.")
-    else:
-        print(f"ℹ️ Collection '{COLLECTION_NAME}' đã tồn tại.")
+    collection_manager.ensure(COLLECTION_NAME)
 
 
 
@@ -65,5 +40,26 @@ def insert_products_to_qdrant_product(embedding: list,  payload: dict, USER_ID:
                 "description": payload.get("description"),
             }
         )
-        qdrant.upsert(collection_name=COLLECTION_NAME, points=[point])
-        print(f"✅ Đã chèn dữ liệu vào collection '{payload.get('id')}'.")
\ No newline at end of file
+        get_qdrant().upsert(collection_name=COLLECTION_NAME, points=[point])
+        print(f"✅ Đã chèn dữ liệu vào collection '{payload.get('id')}'.")
+
+
+def insert_products_to_qdrant_products(items: list, USER_ID: str, COLLECTION_NAME: str = "products", batch_size: int = 256):
+    """Batch upsert [(embedding, payload)] - 1 request / batch_size points thay vì 1 request / product"""
+    points = [
+        PointStruct(
+            id=payload.get("id"),
+            vector={"default": embedding},
+            payload={
+                "user_id": USER_ID,
+                "title": payload.get("title"),
+                "description": payload.get("description"),
+            }
+        )
+        for embedding, payload in items
+        if embedding
+    ]
+    for start in range(0, len(points), batch_size):
+        get_qdrant().upsert(collection_name=COLLECTION_NAME, points=points[start:start + batch_size])
+    print(f"✅ Đã chèn {len(points)} products vào collection '{COLLECTION_NAME}'.")
+    return len(points)
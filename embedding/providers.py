@@ -0,0 +1,409 @@
+"""
+Embedding Providers - Chọn nơi tạo embeddings (EMBEDDING_PROVIDER)
+
+- openai: text-embedding-3-small qua API, rate limit theo quota RPM / TPM,
+  retry 429 / 5xx với backoff + jitter
+- local: model chạy trên CPU bằng sentence-transformers (backend torch / onnx /
+  openvino), hỗ trợ file ONNX int8 đã quantize; không tốn network round-trip,
+  chạy được air-gapped
+
+Số chiều vector phải khớp LEN_EMBEDDING (dùng khi tạo Qdrant collections);
+check_collection_dimensions() so sánh với các collections đang có lúc startup.
+
+CLI:
+    python -m embedding.providers check
+    python -m embedding.providers quantize --output models/vietnamese-embedding-int8
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from env import env
+from utils.llm_stream import get_async_openai_client
+from utils.prompt_builder import count_tokens
+from utils.rate_limiter import RateLimiter, backoff_delay
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional dependency (EMBEDDING_PROVIDER=local)
+    SentenceTransformer = None
+
+Embeddings = List[Optional[List[float]]]
+
+
+class EmbeddingProviderError(RuntimeError):
+    """Cấu hình provider sai (thiếu dependency, số chiều không khớp LEN_EMBEDDING)"""
+
+
+class EmbeddingProvider(ABC):
+    """Interface chung: embed 1 batch texts, None cho item lỗi"""
+
+    name = "base"
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """Định danh model (dùng làm 1 phần key của embedding cache)"""
+
+    @property
+    @abstractmethod
+    def dimensions(self) -> int:
+        """Số chiều vector (phải khớp LEN_EMBEDDING)"""
+
+    @abstractmethod
+    def embed_batch(self, texts: List[str], retry_limit: int = 3) -> Embeddings:
+        """Embed 1 batch texts (sync)"""
+
+    @abstractmethod
+    async def aembed_batch(self, texts: List[str], retry_limit: int = 3) -> Embeddings:
+        """Embed 1 batch texts (async, không block event loop)"""
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API (shared client, rate limiter, retry với backoff)"""
+
+    name = "openai"
+
+    def __init__(self, model: str = "text-embedding-3-small", dimensions: Optional[int] = None):
+        self.model = model
+        self._dimensions = dimensions or env.LEN_EMBEDDING
+        self.rate_limiter = RateLimiter(
+            "openai_embeddings",
+            rpm=env.OPENAI_EMBEDDING_RPM,
+            tpm=env.OPENAI_EMBEDDING_TPM,
+        )
+        self._client: Optional[OpenAI] = None
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return self.model
+
+    @property
+    def dimensions(self) -> int:
+        return self._dimensions
+
+    def get_client(self) -> OpenAI:
+        """Singleton OpenAI client (retry do provider xử lý nên tắt retry của SDK)"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = OpenAI(api_key=env.OPENAI_API_KEY, max_retries=0)
+        return self._client
+
+    def get_async_client(self) -> AsyncOpenAI:
+        """AsyncOpenAI client dùng chung connection pool với LLM streaming"""
+        if self._async_client is None:
+            self._async_client = get_async_openai_client().with_options(max_retries=0)
+        return self._async_client
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """429, 5xx, timeout / network → retry; lỗi request (4xx) → không"""
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code >= 500 or error.status_code in (408, 409)
+        return False
+
+    @staticmethod
+    def _is_input_error(error: Exception) -> bool:
+        """400 (input quá dài / không hợp lệ) → chia đôi batch để cô lập item lỗi"""
+        if isinstance(error, openai.BadRequestError):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code == 400
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Retry-After của provider nếu có, không thì backoff + jitter"""
+        delay = backoff_delay(attempt, env.EMBEDDING_BACKOFF_BASE, env.EMBEDDING_BACKOFF_MAX)
+        if isinstance(error, openai.RateLimitError):
+            try:
+                delay = max(delay, float(error.response.headers.get("retry-after", 0)))
+            except (AttributeError, TypeError, ValueError):
+                pass
+            # Cả process cùng lùi lại, không chỉ caller này
+            self.rate_limiter.pause(delay)
+        return delay
+
+    @staticmethod
+    def _unpack(response, count: int) -> Embeddings:
+        embeddings: Embeddings = [None] * count
+        for item in response.data:
+            embeddings[item.index] = item.embedding
+        return embeddings
+
+    def embed_batch(self, texts: List[str], retry_limit: int = 3) -> Embeddings:
+        """
+        Embed 1 batch (sync), retry lỗi tạm thời với backoff; lỗi input (400) thì
+        chia đôi batch để chỉ các item lỗi thật sự nhận None, lỗi khác (401 / 403 /
+        404...) thì cả batch nhận None ngay
+        """
+        tokens = sum(count_tokens(text) for text in texts)
+        for attempt in range(retry_limit):
+            self.rate_limiter.acquire_sync(tokens)
+            try:
+                response = self.get_client().embeddings.create(
+                    model=self.model,
+                    input=texts,
+                    dimensions=self.dimensions
+                )
+                return self._unpack(response, len(texts))
+            except Exception as e:
+                print(f"❌ Error generating {len(texts)} embeddings (attempt {attempt + 1}/{retry_limit}): {e}")
+                if not self._is_retryable(e):
+                    error = e
+                    break
+                if attempt + 1 < retry_limit:
+                    time.sleep(self._retry_delay(e, attempt))
+        else:
+            print("❌ All retry attempts failed.")
+            return [None] * len(texts)
+
+        # Auth / permission / model not found... → chia đôi cũng lỗi y hệt
+        if len(texts) == 1 or not self._is_input_error(error):
+            return [None] * len(texts)
+        middle = len(texts) // 2
+        return self.embed_batch(texts[:middle], retry_limit) + self.embed_batch(texts[middle:], retry_limit)
+
+    async def aembed_batch(self, texts: List[str], retry_limit: int = 3) -> Embeddings:
+        """Bản async của embed_batch"""
+        tokens = sum(count_tokens(text) for text in texts)
+        for attempt in range(retry_limit):
+            await self.rate_limiter.acquire(tokens)
+            try:
+                response = await self.get_async_client().embeddings.create(
+                    model=self.model,
+                    input=texts,
+                    dimensions=self.dimensions
+                )
+                return self._unpack(response, len(texts))
+            except Exception as e:
+                print(f"❌ Error generating {len(texts)} embeddings (attempt {attempt + 1}/{retry_limit}): {e}")
+                if not self._is_retryable(e):
+                    error = e
+                    break
+                if attempt + 1 < retry_limit:
+                    await asyncio.sleep(self._retry_delay(e, attempt))
+        else:
+            print("❌ All retry attempts failed.")
+            return [None] * len(texts)
+
+        # Auth / permission / model not found... → chia đôi cũng lỗi y hệt
+        if len(texts) == 1 or not self._is_input_error(error):
+            return [None] * len(texts)
+        middle = len(texts) // 2
+        first, second = await asyncio.gather(
+            self.aembed_batch(texts[:middle], retry_limit),
+            self.aembed_batch(texts[middle:], retry_limit)
+        )
+        return first + second
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    sentence-transformers model trên CPU
+
+    - backend "onnx" + model_file "onnx/model_qint8_avx512_vnni.onnx" (hoặc file
+      tạo bởi `python -m embedding.providers quantize`) → ONNX Runtime int8
+    - Model load lazy ở lần gọi đầu (hoặc lúc startup qua verify_embedding_dimensions)
+    - encode chạy trên 1 thread riêng: model đã tự dùng nhiều cores, chạy song song
+      nhiều encode chỉ tranh CPU; caller async không block event loop
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model_name: str,
+        backend: str = "torch",
+        model_file: str = "",
+        batch_size: int = 32
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.model_file = model_file
+        self.batch_size = batch_size
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-embedding")
+
+    @property
+    def model_id(self) -> str:
+        suffix = f":{self.model_file}" if self.model_file else ""
+        return f"local:{self.model_name}:{self.backend}{suffix}"
+
+    def _load(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    if SentenceTransformer is None:
+                        raise EmbeddingProviderError(
+                            "EMBEDDING_PROVIDER=local cần sentence-transformers: "
+                            "pip install 'sentence-transformers[onnx]'"
+                        )
+                    start = time.perf_counter()
+                    kwargs = {"model_kwargs": {"file_name": self.model_file}} if self.model_file else {}
+                    model = SentenceTransformer(self.model_name, device="cpu", backend=self.backend, **kwargs)
+                    dimensions = model.get_sentence_embedding_dimension()
+                    if dimensions != env.LEN_EMBEDDING:
+                        raise EmbeddingProviderError(
+                            f"Local embedding model {self.model_name} có {dimensions} chiều nhưng "
+                            f"LEN_EMBEDDING={env.LEN_EMBEDDING} - đặt LEN_EMBEDDING={dimensions} "
+                            f"và re-index các Qdrant collections"
+                        )
+                    self._model = model
+                    print(f"✅ Local embedding model loaded: {self.model_id} ({dimensions} dims, "
+                          f"{time.perf_counter() - start:.1f}s)")
+        return self._model
+
+    @property
+    def dimensions(self) -> int:
+        return self._load().get_sentence_embedding_dimension()
+
+    def embed_batch(self, texts: List[str], retry_limit: int = 3) -> Embeddings:
+        try:
+            vectors = self._load().encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            return [vector.tolist() for vector in vectors]
+        except EmbeddingProviderError:
+            raise
+        except Exception as e:
+            print(f"❌ Error generating {len(texts)} local embeddings: {e}")
+            if len(texts) == 1:
+                return [None]
+            # Cô lập item lỗi
+            return [self.embed_batch([text])[0] for text in texts]
+
+    async def aembed_batch(self, texts: List[str], retry_limit: int = 3) -> Embeddings:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.embed_batch, texts, retry_limit)
+
+
+_provider: Optional[EmbeddingProvider] = None
+_provider_lock = threading.Lock()
+
+
+def create_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    name = (name or env.EMBEDDING_PROVIDER).lower()
+    if name == "openai":
+        return OpenAIEmbeddingProvider()
+    if name == "local":
+        return LocalEmbeddingProvider(
+            env.EMBEDDING_LOCAL_MODEL,
+            backend=env.EMBEDDING_LOCAL_BACKEND,
+            model_file=env.EMBEDDING_LOCAL_MODEL_FILE,
+            batch_size=env.EMBEDDING_LOCAL_BATCH_SIZE,
+        )
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {name} (openai | local)")
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Singleton provider theo EMBEDDING_PROVIDER"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_embedding_provider()
+    return _provider
+
+
+def _vector_sizes(vectors_config) -> Dict[str, int]:
+    """VectorParams (unnamed) hoặc {name: VectorParams} → {name: size}"""
+    if hasattr(vectors_config, "size"):
+        return {"": vectors_config.size}
+    return {name: params.size for name, params in (vectors_config or {}).items()}
+
+
+def check_collection_dimensions(qdrant, collection_names: Iterable[str], dimensions: int) -> Dict[str, str]:
+    """
+    So sánh số chiều vector của các collections đang có với provider
+
+    Returns:
+        {collection: mô tả lỗi} cho các collections không khớp
+    """
+    existing = {collection.name for collection in qdrant.get_collections().collections}
+    errors = {}
+    for name in collection_names:
+        if name not in existing:
+            continue
+        sizes = _vector_sizes(qdrant.get_collection(name).config.params.vectors)
+        mismatched = {vector: size for vector, size in sizes.items() if size != dimensions}
+        if mismatched:
+            errors[name] = ", ".join(
+                f"vector '{vector or 'default'}' có {size} chiều" for vector, size in mismatched.items()
+            ) + f", provider tạo {dimensions} chiều"
+    return errors
+
+
+def verify_embedding_dimensions(qdrant, collection_names: Iterable[str] = ("products", "documents", "faqs")) -> Dict[str, str]:
+    """
+    Startup check: load provider (local model được warm-up luôn) và kiểm tra collections
+    """
+    provider = get_embedding_provider()
+    dimensions = provider.dimensions
+    try:
+        errors = check_collection_dimensions(qdrant, collection_names, dimensions)
+    except Exception as e:
+        print(f"⚠️  Không kiểm tra được Qdrant collections: {e}")
+        return {}
+    for name, error in errors.items():
+        print(f"❌ Collection '{name}': {error} - cần re-index với provider {provider.model_id}")
+    if not errors:
+        print(f"✅ Embedding provider {provider.model_id}: {dimensions} dims")
+    return errors
+
+
+def quantize_local_model(output_dir: str, config: str = "avx512_vnni") -> str:
+    """Export model local sang ONNX + dynamic int8 quantization"""
+    if SentenceTransformer is None:
+        raise EmbeddingProviderError("pip install 'sentence-transformers[onnx]'")
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(env.EMBEDDING_LOCAL_MODEL, device="cpu", backend="onnx")
+    model.save_pretrained(output_dir)
+    export_dynamic_quantized_onnx_model(model, config, output_dir)
+    model_file = f"onnx/model_qint8_{config}.onnx"
+    print(f"✅ Quantized model: {output_dir}/{model_file}")
+    print(f"   EMBEDDING_LOCAL_MODEL={output_dir} EMBEDDING_LOCAL_BACKEND=onnx EMBEDDING_LOCAL_MODEL_FILE={model_file}")
+    return model_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding provider tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("check", help="Kiểm tra provider và số chiều của Qdrant collections")
+    quantize = subparsers.add_parser("quantize", help="Export model local sang ONNX int8")
+    quantize.add_argument("--output", required=True)
+    quantize.add_argument("--config", default="avx512_vnni", choices=["arm64", "avx2", "avx512", "avx512_vnni"])
+    args = parser.parse_args()
+
+    if args.command == "quantize":
+        quantize_local_model(args.output, args.config)
+        return
+
+    from embedding.qdrant_connection import get_qdrant
+
+    qdrant = get_qdrant()
+    provider = get_embedding_provider()
+    start = time.perf_counter()
+    vector = provider.embed_batch(["kiểm tra embedding provider"])[0]
+    print(f"🧮 {provider.model_id}: {len(vector or [])} dims, {(time.perf_counter() - start) * 1000:.0f} ms")
+    raise SystemExit(1 if verify_embedding_dimensions(qdrant) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Collection Manager - Schema Qdrant collections khai báo ở 1 chỗ
+
+- COLLECTION_SCHEMAS: products (named vector "default"), documents, faqs với
+  payload indexes (user_id là tenant index, is_active, category)
+- Vector / HNSW / quantization settings lấy từ env: số chiều = LEN_EMBEDDING,
+  HNSW m / ef_construct, quantization scalar (int8) | binary | none, vectors on-disk
+- ensure(): tạo collection nếu chưa có, kết quả được cache nên insert / sync
+  không gọi get_collections() mỗi lần
+- reconcile(): startup check, cập nhật HNSW / quantization / on-disk / payload
+  indexes bị lệch so với schema (số chiều / distance lệch thì chỉ báo, cần re-index);
+  payload index lệch type / is_tenant / on_disk được xóa và tạo lại
+- search_params(): hnsw_ef + rescoring (oversampling) cho query_points
+
+Usage:
+    collection_manager.ensure("products")
+    qdrant.query_points(..., search_params=search_params())
+"""
+
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from qdrant_client import QdrantClient, models
+
+from embedding.qdrant_connection import get_qdrant
+from env import env
+
+DISTANCES = {
+    "cosine": models.Distance.COSINE,
+    "dot": models.Distance.DOT,
+    "euclid": models.Distance.EUCLID,
+}
+
+# user_id là tenant index: Qdrant gom points cùng tenant để filtered search nhanh hơn
+TENANT_INDEX = models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True)
+
+
+@dataclass
+class CollectionSchema:
+    name: str
+    vector_name: Optional[str] = None  # None = unnamed vector
+    distance: str = "cosine"
+    payload_indexes: Dict[str, Any] = field(default_factory=dict)
+
+
+COLLECTION_SCHEMAS: Dict[str, CollectionSchema] = {
+    schema.name: schema
+    for schema in (
+        CollectionSchema(
+            "products",
+            vector_name="default",
+            payload_indexes={"user_id": TENANT_INDEX},
+        ),
+        CollectionSchema(
+            "documents",
+            payload_indexes={"user_id": TENANT_INDEX},
+        ),
+        CollectionSchema(
+            "faqs",
+            payload_indexes={
+                "user_id": TENANT_INDEX,
+                "is_active": models.PayloadSchemaType.BOOL,
+                "category": models.PayloadSchemaType.KEYWORD,
+            },
+        ),
+    )
+}
+
+
+def get_schema(name: str) -> CollectionSchema:
+    """Schema đã khai báo, collection khác (vd collection riêng theo user cũ) dùng layout của products"""
+    return COLLECTION_SCHEMAS.get(name) or CollectionSchema(name, vector_name="default")
+
+
+def hnsw_config() -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(m=env.QDRANT_HNSW_M, ef_construct=env.QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def quantization_config():
+    """QDRANT_QUANTIZATION: scalar (int8, ~4x ít RAM) | binary (~32x, cho vectors >= 1024 chiều) | none"""
+    mode = env.QDRANT_QUANTIZATION.lower()
+    if mode == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=env.QDRANT_QUANTIZATION_ALWAYS_RAM,
+            )
+        )
+    if mode == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=env.QDRANT_QUANTIZATION_ALWAYS_RAM)
+        )
+    if mode in ("", "none"):
+        return None
+    raise ValueError(f"QDRANT_QUANTIZATION không hợp lệ: {env.QDRANT_QUANTIZATION} (scalar | binary | none)")
+
+
+@lru_cache(maxsize=1)
+def search_params() -> models.SearchParams:
+    """Search params cho query_points: ef lúc search + rescoring vectors gốc khi có quantization"""
+    quantization = None
+    if quantization_config() is not None:
+        quantization = models.QuantizationSearchParams(
+            rescore=env.QDRANT_RESCORE,
+            oversampling=env.QDRANT_OVERSAMPLING,
+        )
+    return models.SearchParams(hnsw_ef=env.QDRANT_SEARCH_EF, quantization=quantization)
+
+
+def _vectors_config(schema: CollectionSchema):
+    params = models.VectorParams(
+        size=env.LEN_EMBEDDING,
+        distance=DISTANCES[schema.distance],
+        on_disk=env.QDRANT_VECTORS_ON_DISK,
+    )
+    return {schema.vector_name: params} if schema.vector_name else params
+
+
+def _index_type(field_schema) -> str:
+    """Enum / *IndexParams → giá trị string ("keyword", "bool", "Cosine", ...)"""
+    value = getattr(field_schema, "type", field_schema)
+    return getattr(value, "value", value)
+
+
+def _index_signature(field_schema) -> tuple:
+    """(type, is_tenant, on_disk) của 1 payload index để so sánh với schema"""
+    return (
+        _index_type(field_schema),
+        bool(getattr(field_schema, "is_tenant", None)),
+        bool(getattr(field_schema, "on_disk", None)),
+    )
+
+
+def _current_index_signature(index_info) -> tuple:
+    """Signature của index đang có (PayloadIndexInfo: params nếu có, không thì data_type)"""
+    params = getattr(index_info, "params", None)
+    return _index_signature(params if params is not None else index_info.data_type)
+
+
+class CollectionManager:
+    """Tạo / reconcile Qdrant collections theo COLLECTION_SCHEMAS, cache các collections đã sẵn sàng"""
+
+    def __init__(self, client: Optional[QdrantClient] = None):
+        self._client = client
+        self._ready = set()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> QdrantClient:
+        # Mặc định dùng sync client dùng chung (embedding/qdrant_connection.py)
+        return self._client or get_qdrant()
+
+    def ensure(self, name: str) -> None:
+        """Đảm bảo collection tồn tại (chỉ gọi Qdrant lần đầu cho mỗi collection)"""
+        if name in self._ready:
+            return
+        with self._lock:
+            if name in self._ready:
+                return
+            schema = get_schema(name)
+            if self.client.collection_exists(name):
+                self._ensure_indexes(schema)
+            else:
+                self._create(schema)
+            self._ready.add(name)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Bỏ cache (collection bị xóa / tạo lại bên ngoài manager)"""
+        with self._lock:
+            if name is None:
+                self._ready.clear()
+            else:
+                self._ready.discard(name)
+
+    def recreate(self, name: str) -> None:
+        """Xóa và tạo lại collection (CẢNH BÁO: xóa toàn bộ data)"""
+        with self._lock:
+            self._ready.discard(name)
+            if self.client.collection_exists(name):
+                print(f"⚠️  Deleting collection '{name}'...")
+                self.client.delete_collection(name)
+            self._create(get_schema(name))
+            self._ready.add(name)
+
+    def _create(self, schema: CollectionSchema) -> None:
+        print(f"📦 Creating collection '{schema.name}' ({env.LEN_EMBEDDING} dims, quantization={env.QDRANT_QUANTIZATION})...")
+        self.client.create_collection(
+            collection_name=schema.name,
+            vectors_config=_vectors_config(schema),
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization_config(),
+            on_disk_payload=False,
+        )
+        self._ensure_indexes(schema, existing={})
+        print(f"✅ Collection '{schema.name}' created")
+
+    def _ensure_indexes(self, schema: CollectionSchema, existing: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Tạo payload indexes còn thiếu / lệch schema (type, is_tenant, on_disk),
+        trả về các fields đã tạo
+        """
+        if existing is None:
+            existing = self.client.get_collection(schema.name).payload_schema or {}
+        created = []
+        for field_name, field_schema in schema.payload_indexes.items():
+            current = existing.get(field_name)
+            if current is not None:
+                if _current_index_signature(current) == _index_signature(field_schema):
+                    continue
+                # Index cũ (vd keyword thường → tenant index) không update tại chỗ được
+                print(f"🔧 Recreating payload index '{schema.name}.{field_name}'")
+                self.client.delete_payload_index(collection_name=schema.name, field_name=field_name)
+            self.client.create_payload_index(
+                collection_name=schema.name,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+            created.append(field_name)
+        return created
+
+    def _reconcile_collection(self, schema: CollectionSchema) -> Dict[str, Any]:
+        if not self.client.collection_exists(schema.name):
+            self._create(schema)
+            return {"created": True}
+
+        info = self.client.get_collection(schema.name)
+        params = info.config.params
+        vectors = params.vectors
+        current = vectors.get(schema.vector_name) if schema.vector_name and isinstance(vectors, dict) else vectors
+        report: Dict[str, Any] = {}
+
+        # Số chiều / distance / layout vector không đổi được tại chỗ → cần re-index
+        if current is None or not hasattr(current, "size"):
+            report["error"] = f"vector layout khác schema (cần vector '{schema.vector_name or 'unnamed'}')"
+            return report
+        if current.size != env.LEN_EMBEDDING or current.distance != DISTANCES[schema.distance]:
+            report["error"] = (
+                f"{current.size} dims / {_index_type(current.distance)}, schema cần "
+                f"{env.LEN_EMBEDDING} dims / {_index_type(DISTANCES[schema.distance])} - cần re-index"
+            )
+
+        updates: Dict[str, Any] = {}
+        wanted_hnsw = hnsw_config()
+        current_hnsw = info.config.hnsw_config
+        if (current_hnsw.m, current_hnsw.ef_construct) != (wanted_hnsw.m, wanted_hnsw.ef_construct):
+            updates["hnsw_config"] = wanted_hnsw
+
+        wanted_quantization = quantization_config()
+        current_quantization = info.config.quantization_config
+        if wanted_quantization != current_quantization:
+            updates["quantization_config"] = (
+                wanted_quantization if wanted_quantization is not None else models.Disabled.DISABLED
+            )
+
+        if bool(current.on_disk) != env.QDRANT_VECTORS_ON_DISK:
+            diff = models.VectorParamsDiff(on_disk=env.QDRANT_VECTORS_ON_DISK)
+            updates["vectors_config"] = {schema.vector_name or "": diff}
+
+        if updates:
+            self.client.update_collection(collection_name=schema.name, **updates)
+            report["updated"] = sorted(updates)
+
+        indexes = self._ensure_indexes(schema, info.payload_schema or {})
+        if indexes:
+            report["indexes"] = indexes
+        return report
+
+    def reconcile(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Startup: tạo collections còn thiếu và sửa config bị lệch so với schema
+
+        Returns:
+            {collection: report} cho các collections đã tạo / cập nhật / lỗi
+        """
+        reports = {}
+        with self._lock:
+            for schema in COLLECTION_SCHEMAS.values():
+                try:
+                    report = self._reconcile_collection(schema)
+                except Exception as e:
+                    report = {"error": str(e)}
+                if "error" in report:
+                    print(f"❌ Collection '{schema.name}': {report['error']}")
+                else:
+                    self._ready.add(schema.name)
+                if report.get("updated") or report.get("indexes"):
+                    print(f"🔧 Collection '{schema.name}' reconciled: {report}")
+                if report:
+                    reports[schema.name] = report
+        if not reports:
+            print(f"✅ Qdrant collections khớp schema: {', '.join(COLLECTION_SCHEMAS)}")
+        return reports
+
+
+collection_manager = CollectionManager()
@@ -0,0 +1,86 @@
+"""
+Qdrant Connection - Client dùng chung cho mọi search / upsert path
+
+- get_async_qdrant(): AsyncQdrantClient cho request path (search trong chat pipeline,
+  FAQ sync từ API handlers), không block event loop
+- get_qdrant(): QdrantClient cho ingestion scripts / crawler (sync) và startup checks
+- Cả 2 tạo 1 lần theo env: QDRANT_PREFER_GRPC dùng gRPC (vector gửi dạng protobuf
+  thay vì JSON float arrays), giữ connection pool / gRPC channel giữa các requests,
+  QDRANT_TIMEOUT cho mỗi request
+- install_qdrant_clients(): thay clients (benchmarks / local mode ":memory:")
+
+Usage:
+    results = await get_async_qdrant().query_points(collection_name="products", ...)
+    get_qdrant().upsert(collection_name="products", points=points)
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from env import env
+
+_client: Optional[QdrantClient] = None
+_async_client: Optional[AsyncQdrantClient] = None
+_lock = threading.Lock()
+
+
+def qdrant_client_options() -> Dict[str, Any]:
+    """Tham số chung cho QdrantClient / AsyncQdrantClient"""
+    return {
+        "host": env.QDRANT_HOST,
+        "port": env.QDRANT_PORT,
+        "grpc_port": env.QDRANT_GRPC_PORT,
+        "prefer_grpc": env.QDRANT_PREFER_GRPC,
+        "api_key": env.QDRANT_API_KEY or None,
+        "https": env.QDRANT_HTTPS,
+        "timeout": env.QDRANT_TIMEOUT,
+    }
+
+
+def get_qdrant() -> QdrantClient:
+    """Sync client dùng chung (ingestion, scripts, startup checks)"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = QdrantClient(**qdrant_client_options())
+                transport = "gRPC" if env.QDRANT_PREFER_GRPC else "REST"
+                print(f"🔌 Qdrant client: {env.QDRANT_HOST}:{env.QDRANT_PORT} ({transport})")
+    return _client
+
+
+def get_async_qdrant() -> AsyncQdrantClient:
+    """Async client dùng chung cho request path"""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncQdrantClient(**qdrant_client_options())
+    return _async_client
+
+
+def install_qdrant_clients(
+    client: Optional[QdrantClient] = None,
+    async_client: Optional[AsyncQdrantClient] = None
+) -> None:
+    """Thay clients dùng chung (vd Qdrant local mode trong benchmarks)"""
+    global _client, _async_client
+    with _lock:
+        if client is not None:
+            _client = client
+        if async_client is not None:
+            _async_client = async_client
+
+
+async def close_qdrant() -> None:
+    """Shutdown: đóng connection pool / gRPC channels"""
+    global _client, _async_client
+    with _lock:
+        client, _client = _client, None
+        async_client, _async_client = _async_client, None
+    if async_client is not None:
+        await async_client.close()
+    if client is not None:
+        client.close()
@@ -0,0 +1,75 @@
+"""
+Retrieval Context - Query vectors dùng chung trong 1 lượt chat
+
+- start_retrieval_context(): tạo context cho request, lưu trong contextvar nên
+  mọi stage (semantic cache, FAQ pre-check, speculative routing, agents) đều thấy
+- embed_query(): vector của text trong context hiện tại; mỗi text (đã chuẩn hóa)
+  chỉ embed 1 lần / lượt, kể cả khi nhiều stage gọi đồng thời. Query agent diễn
+  đạt lại (vd RecommendationAgent sinh query_text) cũng được giữ trong context
+- Ngoài pipeline (không có context) embed_query() gọi thẳng aquery_embedding()
+
+Usage:
+    retrieval = start_retrieval_context(query)
+    vector = await embed_query(query)
+"""
+
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from embedding.embedding_cache import normalize_text
+from embedding.generate_embeddings import aquery_embedding
+from utils.metrics import counter
+
+RETRIEVAL_EMBEDDINGS = counter(
+    "retrieval_context_embeddings_total",
+    "Query vectors requested within a chat turn (computed = embedded, reused = shared)",
+    ("result",),
+)
+
+_current_retrieval: ContextVar[Optional["RetrievalContext"]] = ContextVar("retrieval_context", default=None)
+
+
+class RetrievalContext:
+    """Vectors đã tính trong 1 request, key theo text đã chuẩn hóa"""
+
+    def __init__(self, query: str):
+        self.query = query
+        self._vectors: Dict[str, asyncio.Future] = {}
+        self.computed = 0
+        self.reused = 0
+
+    async def vector(self, text: str) -> List[float]:
+        key = normalize_text(text)
+        shared = self._vectors.get(key)
+        if shared is None or (shared.done() and (shared.cancelled() or shared.exception() is not None)):
+            self.computed += 1
+            RETRIEVAL_EMBEDDINGS.inc(result="computed")
+            shared = self._vectors[key] = asyncio.ensure_future(aquery_embedding(text))
+        else:
+            self.reused += 1
+            RETRIEVAL_EMBEDDINGS.inc(result="reused")
+        # shield: stage hết budget bị cancel không làm hỏng vector các stage khác đang chờ
+        return await asyncio.shield(shared)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"vectors": len(self._vectors), "computed": self.computed, "reused": self.reused}
+
+
+def start_retrieval_context(query: str) -> RetrievalContext:
+    """Tạo retrieval context mới và gắn vào context hiện tại"""
+    retrieval = RetrievalContext(query)
+    _current_retrieval.set(retrieval)
+    return retrieval
+
+
+def current_retrieval_context() -> Optional[RetrievalContext]:
+    return _current_retrieval.get()
+
+
+async def embed_query(text: str) -> List[float]:
+    """Query vector, dùng chung trong lượt chat hiện tại nếu có retrieval context"""
+    retrieval = _current_retrieval.get()
+    if retrieval is None:
+        return await aquery_embedding(text)
+    return await retrieval.vector(text)
@@ -1,15 +1,19 @@
-from env import env
-from qdrant_client import QdrantClient, models
+from qdrant_client import models
 from embedding.generate_embeddings import query_embedding, generate_embedding
+from embedding.retrieval_context import embed_query
+from embedding.qdrant_collections import search_params
+from embedding.qdrant_connection import get_qdrant, get_async_qdrant
+from utils.deadline import mark_degraded
 
-qdrant = QdrantClient(f"http://{env.QDRANT_HOST}:{env.QDRANT_PORT}")
+# Sync functions dùng client sync dùng chung, bản async (request path) dùng
+# AsyncQdrantClient dùng chung (embedding/qdrant_connection.py)
 
 def semantic_search(query, user_id, top_k=5):
     # Tìm kiếm ANN trong collection
     print("🦪🦪🍜🍜🍛🍣🍣🍣🍣🍣🦪🦪🦪🦪🦪🦪🦪🦪🦪")
     print(f"Executing Qdrant query with info: {query}, id: {user_id}, top_k: {top_k}")
     query_Vector = generate_embedding(query)  
-    search_result = qdrant.query_points(
+    search_result = get_qdrant().query_points(
         collection_name=user_id,
         query= query_Vector,
         using="default",
@@ -27,13 +31,10 @@ def semantic_search(query, user_id, top_k=5):
 
     return ids
 
-def product_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="products"):
-    # Tìm kiếm ANN trong collection
-    print("🦪🦪🍜🍜🍛🍣🍣🍣🍣🍣🦪🦪🦪🦪🦪🦪🦪🦪🦪")
-    print(f"Executing Qdrant query with info: {query}, id : {user_id}, top_k: {top_k}")
-    results = qdrant.query_points(
+def _product_request(vector, user_id, top_k=5, COLLECTION_NAME="products"):
+    return dict(
         collection_name=COLLECTION_NAME,
-        query=generate_embedding(query), 
+        query=vector, 
         using ="default",
         query_filter=models.Filter(
             must=[
@@ -45,30 +46,34 @@ def product_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="products")
                 )
             ]
         ),
+        search_params=search_params(),
         limit=5
     )
-    ids = [item.id for item in results.points]
-    return ids
 
-def document_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="documents"):
+def _product_ids(results):
+    return [item.id for item in results.points]
+
+def product_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="products"):
+    # Tìm kiếm ANN trong collection
+    print("🦪🦪🍜🍜🍛🍣🍣🍣🍣🍣🦪🦪🦪🦪🦪🦪🦪🦪🦪")
+    print(f"Executing Qdrant query with info: {query}, id : {user_id}, top_k: {top_k}")
+    results = get_qdrant().query_points(**_product_request(generate_embedding(query), user_id, top_k, COLLECTION_NAME))
+    return _product_ids(results)
+
+async def aproduct_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="products"):
     """
-    Tìm kiếm documents trong knowledge base
-    
-    Args:
-        query: Query string
-        user_id: User ID để filter
-        top_k: Số lượng chunks trả về
-        COLLECTION_NAME: Tên collection (default: "documents")
-    
-    Returns:
-        List of relevant document chunks với full payload
+    Bản async: embedding không block event loop (dùng chung vector trong lượt chat
+    qua retrieval context), Qdrant query qua AsyncQdrantClient
     """
-    print("📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚")
-    print(f"Document search: query='{query}', user_id={user_id}, top_k={top_k}")
-    
-    results = qdrant.query_points(
+    print(f"Executing Qdrant query with info: {query}, id : {user_id}, top_k: {top_k}")
+    vector = await embed_query(query)
+    results = await get_async_qdrant().query_points(**_product_request(vector, user_id, top_k, COLLECTION_NAME))
+    return _product_ids(results)
+
+def _document_request(vector, user_id, top_k=5, COLLECTION_NAME="documents"):
+    return dict(
         collection_name=COLLECTION_NAME,
-        query=generate_embedding(query),
+        query=vector,
         # using="default",
         query_filter=models.Filter(
             must=[
@@ -78,11 +83,13 @@ def document_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="documents
                 )
             ]
         ),
+        search_params=search_params(),
         limit=top_k,
         with_payload=True,
         with_vectors=False
     )
-    
+
+def _document_chunks(results):
     # Return full payload
     chunks = []
     for point in results.points:
@@ -101,6 +108,81 @@ def document_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="documents
     # ids = [item.id for item in results.points]
     # return ids
 
+def document_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="documents"):
+    """
+    Tìm kiếm documents trong knowledge base
+    
+    Args:
+        query: Query string
+        user_id: User ID để filter
+        top_k: Số lượng chunks trả về
+        COLLECTION_NAME: Tên collection (default: "documents")
+    
+    Returns:
+        List of relevant document chunks với full payload
+    """
+    print("📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚📚")
+    print(f"Document search: query='{query}', user_id={user_id}, top_k={top_k}")
+    results = get_qdrant().query_points(**_document_request(generate_embedding(query), user_id, top_k, COLLECTION_NAME))
+    return _document_chunks(results)
+
+async def adocument_semantic_search(query, user_id, top_k=5, COLLECTION_NAME="documents"):
+    """Bản async của document_semantic_search"""
+    print(f"Document search: query='{query}', user_id={user_id}, top_k={top_k}")
+    vector = await embed_query(query)
+    results = await get_async_qdrant().query_points(**_document_request(vector, user_id, top_k, COLLECTION_NAME))
+    return _document_chunks(results)
+
+
+def _faq_request(vector, user_id: str, top_k: int = 3):
+    return dict(
+        collection_name="faqs",
+        query=vector,
+        query_filter=models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="user_id",
+                    match=models.MatchValue(value=user_id)
+                ),
+                models.FieldCondition(
+                    key="is_active",
+                    match=models.MatchValue(value=True)
+                )
+            ]
+        ),
+        search_params=search_params(),
+        limit=top_k,
+        with_payload=True,
+        with_vectors=False
+        # Không dùng score_threshold ở đây, sẽ filter sau
+    )
+
+
+def _faq_results(results, threshold: float = 0.85):
+    # Format results
+    faqs = []
+    for point in results.points:
+        score = point.score if hasattr(point, 'score') else 0.0
+        faq_result = {
+            "faq_id": point.payload.get("faq_id", ""),
+            "score": score,
+            "question": point.payload.get("question", ""),
+            "answer": point.payload.get("answer", ""),
+            "category": point.payload.get("category", ""),
+            "priority": point.payload.get("priority", 0),
+            "matched": score >= threshold
+        }
+        faqs.append(faq_result)
+    
+    print(f"✅ Found {len(faqs)} FAQs (before threshold filter)")
+    if faqs:
+        print(f"   🏆 Best match: score={faqs[0]['score']:.3f}, question='{faqs[0]['question'][:60]}...'")
+        # Show which ones pass threshold
+        matched_count = sum(1 for f in faqs if f['matched'])
+        print(f"   ✓ {matched_count}/{len(faqs)} FAQs pass threshold {threshold}")
+    
+    return faqs
+
 
 def faq_semantic_search(query: str, user_id: str, top_k: int = 3, threshold: float = 0.85):
     """
@@ -128,51 +210,25 @@ def faq_semantic_search(query: str, user_id: str, top_k: int = 3, threshold: flo
     print(f"FAQ search: query='{query}', user_id={user_id}, top_k={top_k}, threshold={threshold}")
     
     try:
-        results = qdrant.query_points(
-            collection_name="faqs",
-            query=generate_embedding(query),
-            query_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="user_id",
-                        match=models.MatchValue(value=user_id)
-                    ),
-                    models.FieldCondition(
-                        key="is_active",
-                        match=models.MatchValue(value=True)
-                    )
-                ]
-            ),
-            limit=top_k,
-            with_payload=True,
-            with_vectors=False
-            # Không dùng score_threshold ở đây, sẽ filter sau
-        )
-        
-        # Format results
-        faqs = []
-        for point in results.points:
-            score = point.score if hasattr(point, 'score') else 0.0
-            faq_result = {
-                "faq_id": point.payload.get("faq_id", ""),
-                "score": score,
-                "question": point.payload.get("question", ""),
-                "answer": point.payload.get("answer", ""),
-                "category": point.payload.get("category", ""),
-                "priority": point.payload.get("priority", 0),
-                "matched": score >= threshold
-            }
-            faqs.append(faq_result)
-        
-        print(f"✅ Found {len(faqs)} FAQs (before threshold filter)")
-        if faqs:
-            print(f"   🏆 Best match: score={faqs[0]['score']:.3f}, question='{faqs[0]['question'][:60]}...'")
-            # Show which ones pass threshold
-            matched_count = sum(1 for f in faqs if f['matched'])
-            print(f"   ✓ {matched_count}/{len(faqs)} FAQs pass threshold {threshold}")
-        
-        return faqs
-        
+        vector = generate_embedding(query)
+        results = get_qdrant().query_points(**_faq_request(vector, user_id, top_k))
+    except Exception as e:
+        print(f"❌ Error in FAQ semantic search: {e}")
+        # Lỗi search ≠ "không có FAQ khớp" → request bị degraded (không cache)
+        mark_degraded("faq_search")
+        return []
+    return _faq_results(results, threshold)
+
+
+async def afaq_semantic_search(query: str, user_id: str, top_k: int = 3, threshold: float = 0.85):
+    """Bản async của faq_semantic_search"""
+    print(f"FAQ search: query='{query}', user_id={user_id}, top_k={top_k}, threshold={threshold}")
+    
+    try:
+        vector = await embed_query(query)
+        results = await get_async_qdrant().query_points(**_faq_request(vector, user_id, top_k))
     except Exception as e:
         print(f"❌ Error in FAQ semantic search: {e}")
+        mark_degraded("faq_search")
         return []
+    return _faq_results(results, threshold)
@@ -0,0 +1,237 @@
+"""
+Semantic Cache - Cache câu trả lời cuối cùng của chat pipeline theo độ tương đồng câu hỏi
+
+- Scope theo (tenant, personality): câu trả lời của tenant này không bao giờ
+  được trả cho tenant khác, và personality khác nhau có câu trả lời khác nhau
+- Hit khi cosine similarity giữa query embedding mới và 1 query đã cache >= threshold
+- Data version theo tenant: khi FAQ / sản phẩm / documents của tenant thay đổi
+  (bump_data_version) thì toàn bộ câu trả lời cũ của tenant bị bỏ
+- TTL cho từng entry, giới hạn số entries / scope và số scopes (LRU)
+
+Usage:
+    version = semantic_cache.data_version(tenant)
+    cached = semantic_cache.lookup(tenant, personality, vector)
+    ...
+    semantic_cache.store(tenant, personality, query, vector, response, agent, version)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from env import env
+from utils.metrics import counter, gauge, register_collector
+
+SEMANTIC_CACHE_REQUESTS = counter(
+    "semantic_cache_requests_total",
+    "Semantic answer cache lookups by result (hit, miss)",
+    ("result",),
+)
+SEMANTIC_CACHE_ENTRIES = gauge("semantic_cache_entries", "Cached answers in the semantic cache")
+
+Version = Tuple[int, int]
+
+
+class _Scope:
+    """Các câu trả lời đã cache của 1 (tenant, personality)"""
+
+    def __init__(self):
+        self.entries: List[Dict[str, Any]] = []
+        self.vectors: Optional[np.ndarray] = None
+
+    def add(self, entry: Dict[str, Any], vector: np.ndarray, max_entries: int) -> int:
+        self.entries.append(entry)
+        self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+        evicted = 0
+        while len(self.entries) > max_entries:
+            self.remove(0)
+            evicted += 1
+        return evicted
+
+    def remove(self, index: int) -> None:
+        del self.entries[index]
+        self.vectors = np.delete(self.vectors, index, axis=0) if self.entries else None
+
+
+class SemanticCache:
+    """Per-tenant semantic response cache"""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: float = 3600,
+        max_entries_per_scope: int = 256,
+        max_scopes: int = 1024
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries_per_scope = max_entries_per_scope
+        self.max_scopes = max_scopes
+        self._scopes: "OrderedDict[Tuple[str, str], _Scope]" = OrderedDict()
+        self._tenant_versions: Dict[str, int] = {}
+        self._global_version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        # Embedding lỗi trả về zero vector → không cache
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def data_version(self, tenant: str) -> Version:
+        """Version dữ liệu hiện tại của tenant (lấy trước khi tính câu trả lời)"""
+        return self._global_version, self._tenant_versions.get(tenant, 0)
+
+    def bump_data_version(self, tenant: Optional[str] = None) -> None:
+        """
+        Đánh dấu dữ liệu (FAQ, sản phẩm, documents) của tenant đã thay đổi
+
+        tenant=None: không xác định được tenant → invalidate toàn bộ cache
+        """
+        with self._lock:
+            if tenant is None:
+                self._global_version += 1
+                self._scopes.clear()
+                return
+            tenant = str(tenant)
+            self._tenant_versions[tenant] = self._tenant_versions.get(tenant, 0) + 1
+            for key in [key for key in self._scopes if key[0] == tenant]:
+                del self._scopes[key]
+
+    def lookup(self, tenant: str, personality: str, vector: Sequence[float]) -> Optional[Dict[str, Any]]:
+        """
+        Tìm câu trả lời đã cache cho câu hỏi tương tự
+
+        Returns:
+            {"response", "agent", "query", "score"} hoặc None
+        """
+        query_vector = self._normalize(vector)
+        if query_vector is None or self.threshold > 1:
+            return None
+
+        now = time.monotonic()
+        version = self.data_version(tenant)
+        with self._lock:
+            scope = self._scopes.get((tenant, personality))
+            if scope is None or scope.vectors is None:
+                return self._miss()
+
+            # Bỏ entries hết hạn / thuộc data version cũ
+            for index in range(len(scope.entries) - 1, -1, -1):
+                entry = scope.entries[index]
+                if entry["expires_at"] < now or entry["version"] != version:
+                    scope.remove(index)
+            if scope.vectors is None:
+                return self._miss()
+
+            scores = scope.vectors @ query_vector
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score < self.threshold:
+                return self._miss()
+
+            self._scopes.move_to_end((tenant, personality))
+            self.hits += 1
+            SEMANTIC_CACHE_REQUESTS.inc(result="hit")
+            entry = scope.entries[best]
+            return {
+                "response": entry["response"],
+                "agent": entry["agent"],
+                "query": entry["query"],
+                "score": score,
+            }
+
+    def _miss(self) -> None:
+        self.misses += 1
+        SEMANTIC_CACHE_REQUESTS.inc(result="miss")
+        return None
+
+    def store(
+        self,
+        tenant: str,
+        personality: str,
+        query: str,
+        vector: Sequence[float],
+        response: str,
+        agent: str,
+        version: Version
+    ) -> None:
+        """
+        Lưu câu trả lời
+
+        version: data_version(tenant) lấy TRƯỚC khi tính câu trả lời, nếu dữ liệu
+        đã thay đổi trong lúc tính thì câu trả lời không được cache
+        """
+        query_vector = self._normalize(vector)
+        if query_vector is None or self.max_entries_per_scope <= 0:
+            return
+
+        with self._lock:
+            if version != self.data_version(tenant):
+                return
+            key = (tenant, personality)
+            scope = self._scopes.get(key)
+            if scope is None:
+                scope = self._scopes[key] = _Scope()
+            self._scopes.move_to_end(key)
+
+            entry = {
+                "query": query,
+                "response": response,
+                "agent": agent,
+                "version": version,
+                "expires_at": time.monotonic() + self.ttl,
+            }
+            self.evictions += scope.add(entry, query_vector, self.max_entries_per_scope)
+            while len(self._scopes) > self.max_scopes:
+                _, evicted_scope = self._scopes.popitem(last=False)
+                self.evictions += len(evicted_scope.entries)
+
+    def flush(self, tenant: Optional[str] = None) -> int:
+        """Xóa cache của 1 tenant (hoặc toàn bộ), trả về số entries đã xóa"""
+        with self._lock:
+            keys = [key for key in self._scopes if tenant is None or key[0] == str(tenant)]
+            removed = sum(len(self._scopes[key].entries) for key in keys)
+            for key in keys:
+                del self._scopes[key]
+            return removed
+
+    def __len__(self) -> int:
+        return sum(len(scope.entries) for scope in self._scopes.values())
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "scopes": len(self._scopes),
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+semantic_cache = SemanticCache(
+    threshold=env.SEMANTIC_CACHE_THRESHOLD,
+    ttl=env.SEMANTIC_CACHE_TTL,
+    max_entries_per_scope=env.SEMANTIC_CACHE_MAX_ENTRIES,
+    max_scopes=env.SEMANTIC_CACHE_MAX_SCOPES,
+)
+
+register_collector(lambda: SEMANTIC_CACHE_ENTRIES.set(len(semantic_cache)))
+
+
+def bump_data_version(tenant: Optional[Any] = None) -> None:
+    """Shortcut cho services khi dữ liệu của tenant thay đổi"""
+    semantic_cache.bump_data_version(str(tenant) if tenant is not None else None)
@@ -27,5 +27,111 @@ class Env(BaseModel):
     OPENAI_API_KEY: str
     OPENAI_API_MODEL: str
     LEN_EMBEDDING: int
-    
+    # Embedding provider (embedding/providers.py): "openai" | "local"
+    EMBEDDING_PROVIDER: str = "openai"
+    EMBEDDING_LOCAL_MODEL: str = "AITeamVN/Vietnamese_Embedding_v2"
+    EMBEDDING_LOCAL_BACKEND: str = "torch"
+    EMBEDDING_LOCAL_MODEL_FILE: str = ""
+    EMBEDDING_LOCAL_BATCH_SIZE: int = 32
+    # Batch embeddings (embedding/generate_embeddings.py)
+    EMBEDDING_BATCH_SIZE: int = 256
+    EMBEDDING_BATCH_TOKENS: int = 100000
+    # Persistent embedding cache (embedding/embedding_cache.py)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200000
+    # OpenAI embeddings quota + retry (0 = không giới hạn)
+    OPENAI_EMBEDDING_RPM: int = 3000
+    OPENAI_EMBEDDING_TPM: int = 1000000
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_BACKOFF_BASE: float = 0.5
+    EMBEDDING_BACKOFF_MAX: float = 20.0
+    # Micro-batching cho query embeddings đồng thời (utils/micro_batcher.py)
+    EMBEDDING_MICROBATCH_ENABLED: bool = True
+    EMBEDDING_MICROBATCH_WAIT_MS: float = 5.0
+    EMBEDDING_MICROBATCH_MAX_SIZE: int = 64
+    # Qdrant client dùng chung (embedding/qdrant_connection.py)
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_API_KEY: str = ""
+    QDRANT_HTTPS: bool = False
+    QDRANT_TIMEOUT: int = 10
+    # Qdrant collections (embedding/qdrant_collections.py)
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100
+    QDRANT_SEARCH_EF: int = 128
+    QDRANT_QUANTIZATION: str = "scalar"
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True
+    QDRANT_RESCORE: bool = True
+    QDRANT_OVERSAMPLING: float = 2.0
+    QDRANT_VECTORS_ON_DISK: bool = False
+    QDRANT_RECONCILE_ON_STARTUP: bool = True
+
+    # Chat pipeline tuning
+    PIPELINE_SPECULATIVE_ROUTING: bool = True
+    PIPELINE_SINGLEFLIGHT: bool = True
+
+    # Admission control cho chat endpoints (utils/admission.py)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENCY: int = 64
+    ADMISSION_PER_TENANT_CONCURRENCY: int = 8
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_PER_TENANT_QUEUE: int = 32
+    ADMISSION_QUEUE_TIMEOUT: float = 10.0
+
+    # Deadline / stage budgets (giây), quá budget thì stage dùng fallback rẻ hơn
+    PIPELINE_DEADLINE_SECONDS: float = 30.0
+    PIPELINE_CACHE_BUDGET: float = 2.0
+    PIPELINE_FAQ_BUDGET: float = 3.0
+    PIPELINE_ROUTING_BUDGET: float = 6.0
+    PIPELINE_AGENT_BUDGET: float = 20.0
+    PIPELINE_PERSONALITY_BUDGET: float = 8.0
+
+    # Local intent router (agent/intent_router.py)
+    INTENT_ROUTER_ENABLED: bool = True
+    INTENT_ROUTER_MODEL_PATH: str = "data/intent_router.json"
+    INTENT_ROUTER_MIN_SCORE: float = 0.5
+    INTENT_ROUTER_MIN_MARGIN: float = 0.08
+    ROUTING_LOG_PATH: str = "logs/routing_decisions.jsonl"
+
+    # Routing decision cache (0 = disable)
+    ROUTING_CACHE_SIZE: int = 2048
+    ROUTING_CACHE_TTL: int = 3600
+
+    # Semantic answer cache per tenant + personality (embedding/semantic_cache.py)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL: int = 3600
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 256
+    SEMANTIC_CACHE_MAX_SCOPES: int = 1024
+
+    # Write-behind message persistence (services/message_writer.py)
+    MESSAGE_WRITER_ENABLED: bool = True
+    MESSAGE_WRITER_BATCH_SIZE: int = 100
+    MESSAGE_WRITER_FLUSH_INTERVAL: float = 0.05
+    MESSAGE_WRITER_MAX_QUEUE: int = 10000
+
+    # Rolling conversation summary (agent/compose_history.py)
+    CHAT_SUMMARY_ENABLED: bool = True
+    CHAT_SUMMARY_EVERY_N_TURNS: int = 4
+    CHAT_SUMMARY_MAX_FOLD: int = 40
+    CHAT_HISTORY_WINDOW: int = 6
+
+    # Prompt token budgets (utils/prompt_builder.py)
+    PROMPT_RAG_CONTEXT_TOKENS: int = 3000
+    PROMPT_HISTORY_TOKENS: int = 800
+    PROMPT_SUMMARY_TOKENS: int = 300
+    PROMPT_PRODUCTS_TOKENS: int = 600
+
+    # Per-user personality config cache (0 = disable)
+    PERSONALITY_CACHE_SIZE: int = 4096
+    PERSONALITY_CACHE_TTL: int = 600
+
+    # Personality mode: "inline" (style trong system message của agent) | "rewrite" (LLM rewrite lần 2)
+    PERSONALITY_MODE: str = "inline"
+
+    # Batch evaluation (agent/batch_eval.py)
+    BATCH_EVAL_CONCURRENCY: int = 4
+    BATCH_EVAL_MAX_CONCURRENCY: int = 32
+
 env = Env.model_validate(dict(os.environ))
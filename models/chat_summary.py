@@ -0,0 +1,38 @@
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy import TIMESTAMP, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID as pgUUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase
+from pydantic import BaseModel
+import uuid
+import sqlalchemy as sa
+from models.chat import Chat
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+# Rolling summary của 1 chat: các tin nhắn cũ (tới summarized_until) được gộp
+# dần vào summary, pipeline chỉ gửi summary + k tin nhắn gần nhất
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    chat_id: Mapped[uuid.UUID] = mapped_column(pgUUID(as_uuid=True), ForeignKey(Chat.id, ondelete="CASCADE"), primary_key=True, nullable=False)
+    summary: Mapped[str] = mapped_column(sa.Text, nullable=False)
+    key_points: Mapped[list] = mapped_column(JSONB, nullable=False, server_default=sa.text("'[]'::jsonb"))
+    summarized_until: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now(), nullable=False)
+
+
+class ChatSummaryModel(BaseModel):
+    chat_id: uuid.UUID
+    summary: str
+    key_points: List[str] = []
+    summarized_until: datetime
+    message_count: int = 0
+
+    class Config:
+        from_attributes = True
@@ -42,6 +42,12 @@ class MessageModel(BaseModel):
     class Config:
         from_attributes = True
 
+# Tin nhắn kèm id/created_at, dùng nội bộ để merge các tin nhắn đang chờ ghi (write-behind)
+class MessageRecordModel(MessageModel):
+    id: uuid.UUID
+    chat_id: uuid.UUID
+    created_at: datetime
+
 class MessageHistoryModel(BaseModel):
     role: str
     content: str
@@ -1,9 +1,11 @@
 """AI Personality Repository - Database CRUD operations"""
 
+import uuid
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from models.ai_personality import AIPersonalityTable, AIPersonalityModel
+from models.user import UserTable
 
 
 class AIPersonalityRepository:
@@ -28,6 +30,15 @@ class AIPersonalityRepository:
             select(AIPersonalityTable).where(AIPersonalityTable.name == name)
         ).scalars().first()
     
+    @staticmethod
+    def get_by_user_id(session: Session, user_id: uuid.UUID) -> Optional[AIPersonalityTable]:
+        """Get personality assigned to a user (1 query, join users)"""
+        return session.execute(
+            select(AIPersonalityTable)
+            .join(UserTable, UserTable.ai_personality_id == AIPersonalityTable.id)
+            .where(UserTable.id == user_id)
+        ).scalars().first()
+    
     @staticmethod
     def create(session: Session, name: str, description: str, company_name: str = "NAVITECH", agent_name: str = "trợ lý AI") -> AIPersonalityTable:
         """Create new personality"""
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.dialects.postgresql import insert
+from db import Session
+from models.chat_summary import ChatSummary, ChatSummaryModel
+
+
+class ChatSummaryRepository:
+    @staticmethod
+    def get(chat_id: uuid.UUID) -> Optional[ChatSummaryModel]:
+        with Session() as session:
+            summary = session.get(ChatSummary, chat_id)
+            return ChatSummaryModel.model_validate(summary) if summary else None
+
+    @staticmethod
+    def upsert(
+        chat_id: uuid.UUID,
+        summary: str,
+        key_points: List[str],
+        summarized_until: datetime,
+        message_count: int
+    ) -> None:
+        values = {
+            "chat_id": chat_id,
+            "summary": summary,
+            "key_points": key_points,
+            "summarized_until": summarized_until,
+            "message_count": message_count,
+        }
+        with Session() as session:
+            statement = insert(ChatSummary).values(**values)
+            statement = statement.on_conflict_do_update(
+                index_elements=[ChatSummary.chat_id],
+                set_={key: value for key, value in values.items() if key != "chat_id"}
+            )
+            session.execute(statement)
+            session.commit()
@@ -1,17 +1,33 @@
 import uuid
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert
 from db import Session
-from models.message import Message, CreateMessagePayload, UpdateMessagePayload, MessageModel, MessageHistoryModel
+from models.message import Message, CreateMessagePayload, UpdateMessagePayload, MessageModel, MessageHistoryModel, MessageRecordModel
 
 
 class MessageRepository:
     @staticmethod
-    def create(payload: CreateMessagePayload) -> MessageModel:
+    def create(payload: CreateMessagePayload, created_at: Optional[datetime] = None) -> MessageModel:
         with Session() as session:
             message = Message(**payload.model_dump())
+            if created_at is not None:
+                # Cùng nguồn timestamp (app-side UTC) với write-behind queue
+                message.created_at = message.updated_at = created_at
             session.add(message)
             session.commit()
             session.refresh(message)
             return MessageModel.model_validate(message)
+
+    @staticmethod
+    def create_many(rows: list[dict]) -> int:
+        """Multi-row insert trong 1 transaction (rows đã có sẵn id, created_at)"""
+        if not rows:
+            return 0
+        with Session() as session:
+            session.execute(insert(Message), rows)
+            session.commit()
+            return len(rows)
         
     @staticmethod
     def get_one(message_id: uuid.UUID) -> MessageModel:
@@ -58,5 +74,27 @@ class MessageRepository:
             )
             revert_rs = rs[::-1]
             return [MessageModel.model_validate(message) for message in revert_rs]
+
+    @staticmethod
+    def get_recent_records(chat_id: uuid.UUID, limit: int = 5) -> list[MessageRecordModel]:
+        with Session() as session:
+            rs = (
+                session.query(Message)
+                .filter(Message.chat_id == chat_id)
+                .order_by(Message.created_at.desc())
+                .limit(limit)
+                .all()
+            )
+            return [MessageRecordModel.model_validate(message) for message in rs[::-1]]
+
+    @staticmethod
+    def get_records_after(chat_id: uuid.UUID, after: Optional[datetime], limit: int = 50) -> list[MessageRecordModel]:
+        """Tin nhắn cũ nhất trước, tạo sau mốc after (None = từ đầu chat)"""
+        with Session() as session:
+            query = session.query(Message).filter(Message.chat_id == chat_id)
+            if after is not None:
+                query = query.filter(Message.created_at > after)
+            rs = query.order_by(Message.created_at.asc()).limit(limit).all()
+            return [MessageRecordModel.model_validate(message) for message in rs]
         
         
\ No newline at end of file
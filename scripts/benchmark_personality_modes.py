@@ -0,0 +1,123 @@
+"""
+Benchmark personality modes: inline vs rewrite
+
+So sánh latency và token usage giữa 2 cách áp dụng personality:
+- rewrite: agent trả lời → PersonalityAgent rewrite (2 lần gọi LLM)
+- inline: personality style chèn vào system message của agent (1 lần gọi LLM)
+
+Dùng đúng system message / prompt của MySelfAgent và PersonalityAgent,
+gọi OpenAI trực tiếp để đọc được token usage của từng lần gọi.
+
+Run:
+    source venv/bin/activate
+    python scripts/benchmark_personality_modes.py
+    python scripts/benchmark_personality_modes.py --personality vui_vẻ --repeat 5
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from agent.agent_pool import agent_pool
+from agent.myself import MySelfAgent
+from agent.personality_agent import PersonalityAgent
+from utils.llm_stream import get_async_openai_client
+from utils.metrics import percentile
+from env import env
+
+
+SAMPLE_QUERIES = [
+    "NAVITECH là công ty gì?",
+    "Bạn có thể giúp gì cho tôi?",
+    "Giờ làm việc của cửa hàng là khi nào?",
+    "Tôi muốn liên hệ với bộ phận chăm sóc khách hàng",
+    "Giới thiệu ngắn gọn về NAVITECH",
+]
+
+
+async def _chat(system_message: str, prompt: str) -> Dict[str, float]:
+    """1 lần gọi LLM, trả về latency + token usage"""
+    client = get_async_openai_client()
+    start = time.perf_counter()
+    completion = await client.chat.completions.create(
+        model=env.OPENAI_API_MODEL,
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+    )
+    usage = completion.usage
+    return {
+        "latency": time.perf_counter() - start,
+        "prompt_tokens": usage.prompt_tokens if usage else 0,
+        "completion_tokens": usage.completion_tokens if usage else 0,
+        "text": completion.choices[0].message.content or "",
+    }
+
+
+async def run_rewrite(query: str, personality: PersonalityAgent, personality_name: str) -> Dict[str, float]:
+    answer = await _chat(agent_pool.get(MySelfAgent)._get_system_message(), query)
+    rewrite = await _chat(
+        personality._get_system_message(personality_name),
+        personality._build_rewrite_prompt(answer["text"])
+    )
+    return {
+        "latency": answer["latency"] + rewrite["latency"],
+        "prompt_tokens": answer["prompt_tokens"] + rewrite["prompt_tokens"],
+        "completion_tokens": answer["completion_tokens"] + rewrite["completion_tokens"],
+    }
+
+
+async def run_inline(query: str, personality: PersonalityAgent, personality_name: str) -> Dict[str, float]:
+    style_instruction = personality.build_style_instruction(personality_name)
+    result = await _chat(agent_pool.get(MySelfAgent)._get_system_message(style_instruction), query)
+    result.pop("text")
+    return result
+
+
+def _report(mode: str, results: List[Dict[str, float]]):
+    latencies = [r["latency"] * 1000 for r in results]
+    prompt_tokens = [r["prompt_tokens"] for r in results]
+    completion_tokens = [r["completion_tokens"] for r in results]
+    print(f"\n📊 {mode.upper()} ({len(results)} runs)")
+    print(f"   Latency p50: {percentile(latencies, 50):.0f}ms | p95: {percentile(latencies, 95):.0f}ms | mean: {statistics.mean(latencies):.0f}ms")
+    print(f"   Prompt tokens/turn: {statistics.mean(prompt_tokens):.0f}")
+    print(f"   Completion tokens/turn: {statistics.mean(completion_tokens):.0f}")
+    print(f"   Total tokens/turn: {statistics.mean(prompt_tokens) + statistics.mean(completion_tokens):.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark personality inline vs rewrite mode")
+    parser.add_argument("--personality", default="vui_vẻ", choices=list(PersonalityAgent.PERSONALITY_PROMPTS))
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần chạy mỗi câu hỏi")
+    args = parser.parse_args()
+
+    personality = PersonalityAgent()
+    print(f"🚀 Benchmark personality modes")
+    print(f"   Model: {env.OPENAI_API_MODEL}")
+    print(f"   Personality: {args.personality}")
+    print(f"   Queries: {len(SAMPLE_QUERIES)} x {args.repeat}")
+
+    results = {"rewrite": [], "inline": []}
+    for _ in range(args.repeat):
+        for query in SAMPLE_QUERIES:
+            # Xen kẽ 2 mode để tránh bias do API latency thay đổi theo thời gian
+            results["rewrite"].append(await run_rewrite(query, personality, args.personality))
+            results["inline"].append(await run_inline(query, personality, args.personality))
+
+    for mode, mode_results in results.items():
+        _report(mode, mode_results)
+
+    rewrite_latency = statistics.mean(r["latency"] for r in results["rewrite"])
+    inline_latency = statistics.mean(r["latency"] for r in results["inline"])
+    print(f"\n✅ Inline mode: {(1 - inline_latency / rewrite_latency) * 100:.1f}% lower mean latency")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,16 @@
 """AI Personality Service - Business logic for personality management"""
 
-from typing import List, Optional
+import uuid
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
+from db import SessionLocal
+from env import env
 from models.ai_personality import AIPersonalityModel, AIPersonalityCreateModel, AIPersonalityUpdateModel
 from repositories.ai_personality import AIPersonalityRepository
+from utils.cache import TTLCache
+
+# user_id → resolved personality config ({} = user dùng default personality)
+personality_config_cache = TTLCache(maxsize=env.PERSONALITY_CACHE_SIZE, ttl=env.PERSONALITY_CACHE_TTL)
 
 
 class AIPersonalityService:
@@ -52,15 +59,48 @@ class AIPersonalityService:
         )
         if not personality:
             return None
+        # Nhiều user dùng chung personality → bỏ toàn bộ cache
+        AIPersonalityService.invalidate_user_personality()
         return AIPersonalityModel.model_validate(personality)
     
     @staticmethod
     def delete_personality(session: Session, personality_id: int) -> bool:
         """Delete personality"""
-        return AIPersonalityRepository.delete(session, personality_id)
+        deleted = AIPersonalityRepository.delete(session, personality_id)
+        if deleted:
+            AIPersonalityService.invalidate_user_personality()
+        return deleted
     
     @staticmethod
     def get_default_personality_id(session: Session) -> Optional[int]:
         """Get default personality ID (bình_thường)"""
         personality = AIPersonalityRepository.get_by_name(session, "bình_thường")
         return personality.id if personality else None
+    
+    @staticmethod
+    def get_user_personality_config(user_id: uuid.UUID) -> Optional[Dict[str, str]]:
+        """
+        Resolved personality config của user cho chat pipeline (cached theo TTL)
+        
+        Returns:
+            {"name", "company_name", "agent_name"} hoặc None nếu user dùng default
+        """
+        config = personality_config_cache.get(user_id)
+        if config is None:
+            with SessionLocal() as session:
+                personality = AIPersonalityRepository.get_by_user_id(session, user_id)
+                config = {
+                    "name": personality.name,
+                    "company_name": personality.company_name or "NAVITECH",
+                    "agent_name": personality.agent_name or "trợ lý AI",
+                } if personality else {}
+            personality_config_cache.set(user_id, config)
+        return dict(config) if config else None
+    
+    @staticmethod
+    def invalidate_user_personality(user_id: Optional[uuid.UUID] = None) -> None:
+        """Xóa cached personality config của 1 user (hoặc tất cả nếu user_id=None)"""
+        if user_id is None:
+            personality_config_cache.clear()
+        else:
+            personality_config_cache.pop(user_id)
@@ -0,0 +1,33 @@
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from models.chat_summary import ChatSummaryModel
+from models.message import MessageRecordModel
+from repositories.chat_summary import ChatSummaryRepository
+from repositories.message import MessageRepository
+
+
+class ChatSummaryService:
+    @staticmethod
+    def get_summary(chat_id: uuid.UUID) -> Optional[ChatSummaryModel]:
+        return ChatSummaryRepository.get(chat_id)
+
+    @staticmethod
+    def save_summary(
+        chat_id: uuid.UUID,
+        summary: str,
+        key_points: List[str],
+        summarized_until: datetime,
+        message_count: int
+    ) -> None:
+        ChatSummaryRepository.upsert(chat_id, summary, key_points, summarized_until, message_count)
+
+    @staticmethod
+    def get_unsummarized_messages(
+        chat_id: uuid.UUID,
+        summary: Optional[ChatSummaryModel],
+        limit: int = 50
+    ) -> List[MessageRecordModel]:
+        """Tin nhắn chưa được gộp vào summary (cũ nhất trước)"""
+        after = summary.summarized_until if summary else None
+        return MessageRepository.get_records_after(chat_id, after, limit)
@@ -7,6 +7,7 @@ import uuid
 from sqlalchemy.orm import Session
 from repositories.faq import FAQRepository
 from models.faq import FAQModel, FAQCreateModel, FAQUpdateModel, FAQTable
+from embedding.semantic_cache import bump_data_version
 
 
 class FAQService:
@@ -27,6 +28,7 @@ class FAQService:
             FAQModel instance
         """
         faq = self.repository.create(faq_data)
+        bump_data_version(faq.user_id)
         return FAQModel.model_validate(faq)
     
     def get_faq(self, faq_id: uuid.UUID) -> Optional[FAQModel]:
@@ -84,6 +86,7 @@ class FAQService:
         faq = self.repository.update(faq_id, faq_data)
         if not faq:
             return None
+        bump_data_version(faq.user_id)
         return FAQModel.model_validate(faq)
     
     def delete_faq(self, faq_id: uuid.UUID, soft: bool = True) -> bool:
@@ -99,9 +102,15 @@ class FAQService:
         """
         if soft:
             faq = self.repository.soft_delete(faq_id)
+            if faq is not None:
+                bump_data_version(faq.user_id)
             return faq is not None
         else:
-            return self.repository.delete(faq_id)
+            deleted = self.repository.delete(faq_id)
+            if deleted:
+                # Không còn FAQ để biết tenant → invalidate toàn bộ
+                bump_data_version()
+            return deleted
     
     def get_statistics(self, user_id: uuid.UUID) -> dict:
         """
@@ -138,6 +147,8 @@ class FAQService:
             faq = self.repository.create(faq_data)
             created_faqs.append(FAQModel.model_validate(faq))
         
+        for user_id in {faq.user_id for faq in created_faqs}:
+            bump_data_version(user_id)
         return created_faqs
     
     def activate_faq(self, faq_id: uuid.UUID) -> Optional[FAQModel]:
@@ -1,6 +1,21 @@
+import asyncio
 import uuid
+from datetime import datetime, timezone
+from env import env
 from models.message import CreateMessagePayload, UpdateMessagePayload, MessageModel, MessageHistoryModel
 from repositories.message import MessageRepository
+from services.message_writer import message_writer
+
+
+def _on_writer_loop() -> bool:
+    """Write-behind queue chỉ dùng được từ event loop đang chạy writer"""
+    if not (env.MESSAGE_WRITER_ENABLED and message_writer.running):
+        return False
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
 
 
 class MessageService:
@@ -8,6 +23,22 @@ class MessageService:
     def create_message(payload: CreateMessagePayload) -> MessageModel:
         return MessageRepository.create(payload)
 
+    @staticmethod
+    def enqueue_message(payload: CreateMessagePayload) -> MessageModel:
+        """
+        Ghi tin nhắn qua write-behind queue (không block event loop),
+        fallback ghi trực tiếp nếu writer chưa start hoặc queue đầy
+        """
+        if _on_writer_loop():
+            try:
+                record = message_writer.enqueue(payload)
+                return MessageModel(content=record.content, role=record.role)
+            except asyncio.QueueFull:
+                print(f"⚠️  Message write queue full, writing synchronously")
+        # created_at phía app như record trong queue → thứ tự history nhất quán
+        # khi merge tin nhắn pending với rows đã commit
+        return MessageRepository.create(payload, created_at=datetime.now(timezone.utc))
+
     @staticmethod
     def get_message(message_id: uuid.UUID) -> MessageModel:
         return MessageRepository.get_one(message_id)
@@ -22,4 +53,13 @@ class MessageService:
 
     @staticmethod
     def get_recent_messages(chat_id: uuid.UUID, limit: int = 20) -> list[MessageHistoryModel]:
-        return MessageRepository.get_recent_messages(chat_id, limit)
\ No newline at end of file
+        pending = message_writer.pending_messages(chat_id)
+        if not pending:
+            return MessageRepository.get_recent_messages(chat_id, limit)
+
+        # Merge tin nhắn đang chờ ghi; 1 batch có thể vừa commit nên dedup theo id
+        records = {record.id: record for record in MessageRepository.get_recent_records(chat_id, limit)}
+        for record in pending:
+            records.setdefault(record.id, record)
+        merged = sorted(records.values(), key=lambda record: record.created_at)[-limit:]
+        return [MessageModel(content=record.content, role=record.role) for record in merged]
@@ -0,0 +1,176 @@
+"""
+Message Writer - Write-behind persistence cho chat messages
+
+Pipeline không còn commit từng tin nhắn trong request handler:
+- enqueue(): gán id + created_at ngay lúc nhận, đưa vào asyncio queue và pending map
+- Background task gom tin nhắn thành batch, insert nhiều rows trong 1 transaction
+  (thread pool), flush khi đủ batch_size hoặc sau flush_interval giây
+- pending_messages(): các tin nhắn chưa commit, để history read của cùng chat vẫn thấy
+- stop(): drain toàn bộ queue khi shutdown
+
+Usage (app lifespan):
+    await message_writer.start()
+    ...
+    await message_writer.stop()
+"""
+
+import asyncio
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from env import env
+from models.message import CreateMessagePayload, MessageRecordModel
+from repositories.message import MessageRepository
+from utils.metrics import counter, gauge, histogram, register_collector
+
+WRITER_PENDING = gauge("message_writer_pending", "Messages enqueued but not yet committed")
+WRITER_WRITTEN = counter("message_writer_written_total", "Messages committed by the write-behind writer")
+WRITER_FAILED = counter("message_writer_failed_total", "Messages dropped after a failed insert")
+WRITER_BATCH_SIZE = histogram(
+    "message_writer_batch_size",
+    "Number of messages per insert transaction",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+WRITER_FLUSH_SECONDS = histogram("message_writer_flush_seconds", "Insert transaction latency in seconds")
+
+
+class MessageWriter:
+    """Async write-behind queue cho bảng messages"""
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.05, max_queue: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # chat_id → {message_id: record} cho đến khi batch chứa record được commit
+        self._pending: Dict[uuid.UUID, Dict[uuid.UUID, MessageRecordModel]] = defaultdict(dict)
+        self._pending_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="message-writer")
+        print(f"✅ MessageWriter started (batch_size={self.batch_size}, flush_interval={self.flush_interval}s)")
+
+    async def stop(self) -> None:
+        """Drain queue và dừng background task"""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        print(f"✅ MessageWriter drained and stopped")
+
+    def enqueue(self, payload: CreateMessagePayload) -> MessageRecordModel:
+        """
+        Đưa tin nhắn vào hàng đợi ghi (không block)
+
+        Raises:
+            asyncio.QueueFull: Khi queue đầy (caller nên ghi trực tiếp)
+        """
+        record = MessageRecordModel(
+            id=uuid.uuid4(),
+            chat_id=payload.chat_id,
+            role=payload.role,
+            content=payload.content,
+            created_at=datetime.now(timezone.utc),
+        )
+        self._queue.put_nowait(record)
+        with self._lock:
+            self._pending[record.chat_id][record.id] = record
+            self._pending_count += 1
+        return record
+
+    def pending_messages(self, chat_id: uuid.UUID) -> List[MessageRecordModel]:
+        """Tin nhắn của chat đã enqueue nhưng chưa commit"""
+        with self._lock:
+            pending = self._pending.get(chat_id)
+            return list(pending.values()) if pending else []
+
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[MessageRecordModel]) -> None:
+        rows = [
+            {
+                "id": record.id,
+                "chat_id": record.chat_id,
+                "role": record.role,
+                "content": record.content,
+                "created_at": record.created_at,
+                "updated_at": record.created_at,
+            }
+            for record in batch
+        ]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await asyncio.to_thread(MessageRepository.create_many, rows)
+            WRITER_WRITTEN.inc(len(rows))
+        except Exception as e:
+            # 1 row lỗi (vd: chat_id không tồn tại) làm hỏng cả batch → ghi lại từng row
+            print(f"⚠️  MessageWriter batch insert failed ({len(rows)} rows): {e}")
+            for row in rows:
+                try:
+                    await asyncio.to_thread(MessageRepository.create_many, [row])
+                    WRITER_WRITTEN.inc()
+                except Exception as row_error:
+                    WRITER_FAILED.inc()
+                    print(f"❌ MessageWriter dropped message {row['id']} (chat {row['chat_id']}): {row_error}")
+        finally:
+            WRITER_BATCH_SIZE.observe(len(rows))
+            WRITER_FLUSH_SECONDS.observe(loop.time() - start)
+            self._release(batch)
+
+    def _release(self, batch: List[MessageRecordModel]) -> None:
+        """Bỏ các record đã commit (hoặc đã drop) khỏi pending map"""
+        with self._lock:
+            for record in batch:
+                pending = self._pending.get(record.chat_id)
+                if pending and pending.pop(record.id, None) is not None:
+                    self._pending_count -= 1
+                    if not pending:
+                        del self._pending[record.chat_id]
+
+
+message_writer = MessageWriter(
+    batch_size=env.MESSAGE_WRITER_BATCH_SIZE,
+    flush_interval=env.MESSAGE_WRITER_FLUSH_INTERVAL,
+    max_queue=env.MESSAGE_WRITER_MAX_QUEUE,
+)
+
+register_collector(lambda: WRITER_PENDING.set(message_writer.pending_count()))
@@ -2,12 +2,15 @@ from typing import Optional
 import uuid
 from models.product import ProductCreate, ProductUpdatePayload, ProductModel
 from repositories.product import ProductRepository
+from embedding.semantic_cache import bump_data_version
 
 
 class ProductService:
     @staticmethod
     def create_product(payload: ProductCreate) -> ProductModel:
-        return ProductRepository.create(payload)
+        product = ProductRepository.create(payload)
+        bump_data_version(payload.user_id)
+        return product
 
     @staticmethod
     def get_product(product_id: uuid.UUID) -> Optional[ProductModel]:
@@ -15,11 +18,17 @@ class ProductService:
 
     @staticmethod
     def update_product(product_id: uuid.UUID, data: ProductUpdatePayload) -> Optional[ProductModel]:
-        return ProductRepository.update(product_id, data)
+        product = ProductRepository.update(product_id, data)
+        # ProductModel không có user_id → invalidate toàn bộ semantic cache
+        bump_data_version()
+        return product
 
     @staticmethod
     def delete_product(product_id: uuid.UUID) -> bool:
-        return ProductRepository.delete(product_id)
+        deleted = ProductRepository.delete(product_id)
+        if deleted:
+            bump_data_version()
+        return deleted
     @staticmethod
     def list_all_products() -> list[ProductModel]:
         return ProductRepository.list_all()
@@ -32,4 +41,6 @@ class ProductService:
     def add_file_to_products(
         file: bytes, user_id: uuid.UUID, website_name: str, file_name: str | None = None
     ) -> dict:
-        return ProductRepository.add_file_to_products(file, user_id, website_name, file_name)
\ No newline at end of file
+        result = ProductRepository.add_file_to_products(file, user_id, website_name, file_name)
+        bump_data_version(user_id)
+        return result
\ No newline at end of file
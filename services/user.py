@@ -16,11 +16,15 @@ class UserService():
     
     @staticmethod
     def update_user(id: uuid.UUID, data: UserCreateModel):
-        return UserRespository.update(id = id, data = data)
+        user = UserRespository.update(id = id, data = data)
+        AIPersonalityService.invalidate_user_personality(id)
+        return user
     
     @staticmethod
     def delete_user(payload: uuid.UUID):
-        return UserRespository.delete(payload)
+        user = UserRespository.delete(payload)
+        AIPersonalityService.invalidate_user_personality(payload)
+        return user
     
     @staticmethod
     def get_all_user():
@@ -45,6 +49,7 @@ class UserService():
         session.add(user)
         session.commit()
         session.refresh(user)
+        AIPersonalityService.invalidate_user_personality(user_id)
         
         return {
             "user_id": str(user_id),
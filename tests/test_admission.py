@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from utils.admission import AdmissionController, AdmissionRejected
+
+
+async def _settle():
+    # Cho các tasks acquire() chạy tới lúc đang chờ slot
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_admits_immediately_under_limits():
+    async def scenario():
+        admission = AdmissionController("test", max_concurrency=2, per_tenant_concurrency=2)
+        first = await admission.acquire("a")
+        second = await admission.acquire("b")
+        assert admission.stats()["active"] == 2
+        first.release()
+        first.release()  # idempotent
+        second.release()
+        assert admission.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_per_tenant_cap_queues_only_that_tenant():
+    async def scenario():
+        admission = AdmissionController("test", max_concurrency=4, per_tenant_concurrency=1)
+        a1 = await admission.acquire("a")
+        waiting = asyncio.create_task(admission.acquire("a"))
+        await _settle()
+        assert not waiting.done()
+
+        # Tenant khác vẫn được cấp slot ngay
+        b1 = await asyncio.wait_for(admission.acquire("b"), timeout=0.1)
+
+        a1.release()
+        a2 = await asyncio.wait_for(waiting, timeout=0.1)
+        for ticket in (a2, b1):
+            ticket.release()
+
+    asyncio.run(scenario())
+
+
+def test_slots_are_shared_round_robin_between_tenants():
+    async def scenario():
+        admission = AdmissionController("test", max_concurrency=1, per_tenant_concurrency=1)
+        first = await admission.acquire("a")
+        order = []
+
+        async def request(tenant, name):
+            ticket = await admission.acquire(tenant)
+            order.append(name)
+            await asyncio.sleep(0)
+            ticket.release()
+
+        tasks = [asyncio.create_task(request("a", "a2")), asyncio.create_task(request("a", "a3"))]
+        await _settle()
+        tasks.append(asyncio.create_task(request("b", "b1")))
+        await _settle()
+
+        first.release()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        # Tenant "b" đến sau nhưng không phải chờ hết hàng đợi của "a"
+        assert order == ["a2", "b1", "a3"]
+
+    asyncio.run(scenario())
+
+
+def test_rejects_with_retry_after_when_queue_full():
+    async def scenario():
+        admission = AdmissionController("test", max_concurrency=1, per_tenant_concurrency=1, max_queue=1)
+        ticket = await admission.acquire("a")
+        waiting = asyncio.create_task(admission.acquire("b"))
+        await _settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("c")
+        assert "queue full" in rejected.value.reason
+        assert isinstance(rejected.value.retry_after, int)
+        assert 1 <= rejected.value.retry_after <= 60
+        assert admission.stats()["rejected"] == 1
+
+        ticket.release()
+        (await waiting).release()
+
+    asyncio.run(scenario())
+
+
+def test_rejects_when_tenant_queue_full():
+    async def scenario():
+        admission = AdmissionController(
+            "test", max_concurrency=4, per_tenant_concurrency=1, per_tenant_queue=1
+        )
+        ticket = await admission.acquire("a")
+        waiting = asyncio.create_task(admission.acquire("a"))
+        await _settle()
+
+        with pytest.raises(AdmissionRejected, match="tenant a queue full"):
+            await admission.acquire("a")
+
+        ticket.release()
+        (await waiting).release()
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_rejects_and_leaves_queue():
+    async def scenario():
+        admission = AdmissionController("test", max_concurrency=1, queue_timeout=0.05)
+        ticket = await admission.acquire("a")
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("b")
+        assert rejected.value.retry_after >= 1
+        assert admission.stats()["queued"] == 0
+
+        ticket.release()
+        assert admission.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        admission = AdmissionController("test", max_concurrency=1)
+        ticket = await admission.acquire("a")
+        waiting = asyncio.create_task(admission.acquire("b"))
+        await _settle()
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert admission.stats()["queued"] == 0
+
+        ticket.release()
+        assert admission.stats()["active"] == 0
+        # Slot vẫn dùng được sau khi waiter bỏ đi
+        (await asyncio.wait_for(admission.acquire("c"), timeout=0.1)).release()
+
+    asyncio.run(scenario())
+
+
+def test_slot_context_manager_releases_on_error():
+    async def scenario():
+        admission = AdmissionController("test", max_concurrency=1)
+        with pytest.raises(RuntimeError):
+            async with admission.slot("a"):
+                raise RuntimeError("boom")
+        assert admission.stats()["active"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+import unicodedata
+
+from utils import cache
+from utils.cache import TTLCache, hash_text, normalize_query
+
+
+def test_get_set_and_stats():
+    ttl_cache = TTLCache(maxsize=4, ttl=60)
+    ttl_cache.set("a", 1)
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("missing", "default") == "default"
+    stats = ttl_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_entries_expire_after_ttl(clock):
+    clock.install(cache)
+    ttl_cache = TTLCache(maxsize=4, ttl=10)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2, ttl=100)
+    clock.advance(11)
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("b") == 2
+    assert len(ttl_cache) == 1
+
+
+def test_evicts_least_recently_used():
+    ttl_cache = TTLCache(maxsize=2, ttl=60)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")  # "b" giờ là LRU
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("c") == 3
+    assert ttl_cache.stats()["evictions"] == 1
+
+
+def test_overwrite_refreshes_position_and_ttl(clock):
+    clock.install(cache)
+    ttl_cache = TTLCache(maxsize=2, ttl=10)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    clock.advance(8)
+    ttl_cache.set("a", 10)
+    ttl_cache.set("c", 3)  # evict "b", không phải "a"
+    clock.advance(5)
+    assert ttl_cache.get("a") == 10
+    assert ttl_cache.get("b") is None
+
+
+def test_disabled_cache_stores_nothing():
+    ttl_cache = TTLCache(maxsize=0)
+    ttl_cache.set("a", 1)
+    assert ttl_cache.get("a") is None
+    assert len(ttl_cache) == 0
+
+
+def test_pop_and_clear():
+    ttl_cache = TTLCache()
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    assert ttl_cache.pop("a") == 1
+    assert ttl_cache.pop("a", "gone") == "gone"
+    ttl_cache.clear()
+    assert len(ttl_cache) == 0
+
+
+def test_normalize_query_collapses_variants():
+    assert normalize_query("  Chính sách   đổi trả? ") == "chính sách đổi trả"
+    assert normalize_query("CHÍNH SÁCH ĐỔI TRẢ!!") == "chính sách đổi trả"
+    # NFD (dấu tách rời) và NFC cho cùng key
+    assert normalize_query(unicodedata.normalize("NFD", "Đổi trả")) == normalize_query("Đổi trả")
+    assert normalize_query(None) == ""
+
+
+def test_hash_text_is_short_and_stable():
+    assert hash_text("history") == hash_text("history")
+    assert hash_text("history") != hash_text("other")
+    assert len(hash_text("history")) == 16
+    assert hash_text(None) == hash_text("")
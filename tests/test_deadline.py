@@ -0,0 +1,95 @@
+import asyncio
+import contextvars
+
+from utils.deadline import (
+    current_deadline,
+    mark_degraded,
+    record_partial,
+    start_deadline,
+    with_budget,
+)
+
+
+def _run(coro):
+    # Mỗi test chạy trong context riêng để deadline không rò sang test khác
+    return contextvars.copy_context().run(asyncio.run, coro)
+
+
+async def _slow(value, seconds=1.0):
+    await asyncio.sleep(seconds)
+    return value
+
+
+def test_returns_result_within_budget():
+    async def scenario():
+        deadline = start_deadline(5)
+        assert await with_budget(_slow("done", 0), "agent", 1) == "done"
+        assert deadline.degraded == []
+
+    _run(scenario())
+
+
+def test_returns_fallback_and_marks_stage_degraded():
+    async def scenario():
+        deadline = start_deadline(5)
+        fallback_calls = []
+
+        def fallback():
+            fallback_calls.append(True)
+            return "fallback"
+
+        assert await with_budget(_slow("late"), "agent", 0.01, fallback=fallback) == "fallback"
+        assert fallback_calls == [True]
+        assert deadline.degraded == ["agent"]
+
+    _run(scenario())
+
+
+def test_plain_value_fallback():
+    async def scenario():
+        start_deadline(5)
+        assert await with_budget(_slow("late"), "faq", 0.01, fallback=None) is None
+        assert await with_budget(_slow("late"), "faq", 0.01, fallback={"a": 1}) == {"a": 1}
+
+    _run(scenario())
+
+
+def test_remaining_deadline_caps_stage_budget():
+    async def scenario():
+        deadline = start_deadline(0.02)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # Budget của stage dài hơn thời gian còn lại của request
+        assert await with_budget(_slow("late"), "agent", 10, fallback="fallback") == "fallback"
+        assert loop.time() - start < 1
+        assert deadline.expired
+        assert deadline.timeout_for(10) == 0
+
+    _run(scenario())
+
+
+def test_without_deadline_uses_stage_budget():
+    async def scenario():
+        assert current_deadline() is None
+        assert await with_budget(_slow("late"), "agent", 0.01, fallback="fallback") == "fallback"
+        # Không có deadline → record_partial / mark_degraded là no-op
+        record_partial("products", [1])
+        mark_degraded("agent")
+
+    _run(scenario())
+
+
+def test_partials_and_degraded_visible_to_child_tasks():
+    async def scenario():
+        deadline = start_deadline(5)
+
+        async def stage():
+            record_partial("products", [{"title": "Laptop"}])
+            mark_degraded("personality_rewrite")
+
+        await asyncio.create_task(stage())
+        assert deadline.partial == {"products": [{"title": "Laptop"}]}
+        assert deadline.degraded == ["personality_rewrite"]
+        assert current_deadline() is deadline
+
+    _run(scenario())
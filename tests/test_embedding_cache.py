@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from embedding import embedding_cache as embedding_cache_module
+from embedding.embedding_cache import EmbeddingCache, cache_key, normalize_text
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=100)
+
+
+def test_roundtrip_keeps_input_order(cache):
+    cache.put_many("model", 2, ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert cache.get_many("model", 2, ["b", "missing", "a"]) == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_key_includes_model_and_dimensions(cache):
+    cache.put_many("model", 2, ["a"], [[1.0, 2.0]])
+    assert cache.get("other-model", 2, "a") is None
+    assert cache.get("model", 3, "a") is None
+
+
+def test_whitespace_and_unicode_normalized():
+    assert normalize_text("  Laptop \n  Dell ") == "Laptop Dell"
+    assert cache_key("m", 2, "Laptop  Dell") == cache_key("m", 2, " Laptop Dell")
+    # Giữ nguyên hoa / thường
+    assert cache_key("m", 2, "laptop") != cache_key("m", 2, "Laptop")
+
+
+def test_skips_none_and_wrong_dimensions(cache):
+    cache.put_many("model", 2, ["a", "b", "c"], [None, [1.0], [1.0, 2.0]])
+    assert cache.get_many("model", 2, ["a", "b", "c"]) == [None, None, [1.0, 2.0]]
+    assert cache.stats()["writes"] == 1
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    clock.install(embedding_cache_module)
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=3)
+    for text in ("a", "b", "c"):
+        cache.put_many("model", 1, [text], [[1.0]])
+        clock.advance(1)
+    cache.get("model", 1, "a")  # "b" giờ là entry lâu không dùng nhất
+    clock.advance(1)
+
+    cache.put_many("model", 1, ["d"], [[1.0]])
+    assert len(cache) <= 3
+    assert cache.get("model", 1, "b") is None
+    assert cache.get("model", 1, "a") == [1.0]
+    assert cache.get("model", 1, "d") == [1.0]
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingCache(path).put_many("model", 2, ["a"], [[0.5, 0.25]])
+    assert EmbeddingCache(path).get("model", 2, "a") == [0.5, 0.25]
+
+
+def test_disabled_cache_is_a_no_op(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), enabled=False)
+    cache.put_many("model", 1, ["a"], [[1.0]])
+    assert cache.get("model", 1, "a") is None
+    assert not (tmp_path / "embeddings.sqlite3").exists()
+
+
+def test_async_helpers_run_off_the_event_loop(cache, monkeypatch):
+    calls = []
+    real_to_thread = asyncio.to_thread
+
+    async def recording_to_thread(fn, *args):
+        calls.append(fn.__name__)
+        return await real_to_thread(fn, *args)
+
+    monkeypatch.setattr(embedding_cache_module.asyncio, "to_thread", recording_to_thread)
+
+    async def scenario():
+        await cache.aput_many("model", 2, ["a"], [[1.0, 2.0]])
+        assert await cache.aget_many("model", 2, ["a", "b"]) == [[1.0, 2.0], None]
+        assert await cache.aget("model", 2, "a") == [1.0, 2.0]
+
+    asyncio.run(scenario())
+    assert calls == ["put_many", "get_many", "get_many"]
+
+
+def test_clear(cache):
+    cache.put_many("model", 1, ["a", "b"], [[1.0], [2.0]])
+    assert cache.clear() == 2
+    assert cache.get("model", 1, "a") is None
@@ -0,0 +1,74 @@
+from utils.metrics import Counter, Gauge, Histogram, counter, percentile, render_prometheus
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_latency_seconds", "Latency", ("stage",), buckets=(0.5, 0.1, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.7, 5.0):
+        histogram.observe(value, stage="faq")
+
+    assert histogram.render() == [
+        "# HELP test_latency_seconds Latency",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{stage="faq",le="0.1"} 2.0',
+        'test_latency_seconds_bucket{stage="faq",le="0.5"} 3.0',
+        'test_latency_seconds_bucket{stage="faq",le="1.0"} 4.0',
+        'test_latency_seconds_bucket{stage="faq",le="+Inf"} 5.0',
+        'test_latency_seconds_sum{stage="faq"} 6.15',
+        'test_latency_seconds_count{stage="faq"} 5.0',
+    ]
+
+
+def test_histogram_value_on_bound_counts_in_that_bucket():
+    histogram = Histogram("test_bound", "Bound", buckets=(1, 2))
+    histogram.observe(1)
+    histogram.observe(2)
+
+    lines = histogram.render()
+    assert 'test_bound_bucket{le="1.0"} 1.0' in lines
+    assert 'test_bound_bucket{le="2.0"} 2.0' in lines
+    assert 'test_bound_bucket{le="+Inf"} 2.0' in lines
+
+
+def test_histogram_keeps_label_sets_separate():
+    histogram = Histogram("test_labels", "Labels", ("stage",), buckets=(1.0,))
+    histogram.observe(0.5, stage="faq")
+    histogram.observe(2.0, stage="agent")
+
+    lines = histogram.render()
+    assert 'test_labels_bucket{stage="faq",le="1.0"} 1.0' in lines
+    assert 'test_labels_bucket{stage="agent",le="1.0"} 0.0' in lines
+    assert 'test_labels_count{stage="agent"} 1.0' in lines
+
+
+def test_histogram_without_observations_renders_header_only():
+    histogram = Histogram("test_empty", "Empty")
+    assert histogram.render() == ["# HELP test_empty Empty", "# TYPE test_empty histogram"]
+
+
+def test_counter_and_gauge_escape_label_values():
+    metric = Counter("test_requests_total", "Requests", ("query",))
+    metric.inc(query='say "hi"\n')
+    metric.inc(2, query='say "hi"\n')
+    assert metric.render()[-1] == 'test_requests_total{query="say \\"hi\\"\\n"} 3.0'
+
+    gauge = Gauge("test_inflight", "In-flight")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    assert gauge.render()[-1] == "test_inflight 1.0"
+
+
+def test_registered_metrics_are_shared_and_rendered():
+    first = counter("test_registry_total", "Registry")
+    assert counter("test_registry_total", "Registry") is first
+    first.inc()
+    assert "test_registry_total 1.0" in render_prometheus().splitlines()
+
+
+def test_percentile_nearest_rank():
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 95) == 5.0
+    assert percentile(values, 100) == 5.0
+    assert percentile([], 95) == 0.0
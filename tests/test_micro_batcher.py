@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from utils.micro_batcher import MicroBatcher
+
+
+class RecordingHandler:
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        if self.fail_on is not None and self.fail_on in items:
+            raise RuntimeError(f"bad item {self.fail_on}")
+        return [item.upper() for item in items]
+
+
+def test_flushes_after_wait_window():
+    async def scenario():
+        handler = RecordingHandler()
+        batcher = MicroBatcher("test", handler, max_batch_size=10, max_wait=0.01)
+        results = await asyncio.gather(*(batcher.submit(item) for item in ("a", "b", "c")))
+        assert results == ["A", "B", "C"]
+        assert handler.batches == [["a", "b", "c"]]
+        assert batcher.stats()["batches"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_flushes_immediately_when_batch_full():
+    async def scenario():
+        handler = RecordingHandler()
+        # Cửa sổ dài: chỉ max_batch_size mới làm batch được gửi kịp timeout
+        batcher = MicroBatcher("test", handler, max_batch_size=2, max_wait=10)
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit("a"), batcher.submit("b")), timeout=1
+        )
+        assert results == ["A", "B"]
+        assert handler.batches == [["a", "b"]]
+
+    asyncio.run(scenario())
+
+
+def test_duplicate_items_are_sent_once():
+    async def scenario():
+        handler = RecordingHandler()
+        batcher = MicroBatcher("test", handler, max_batch_size=10, max_wait=0.01)
+        results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), batcher.submit("a"))
+        assert results == ["A", "B", "A"]
+        assert handler.batches == [["a", "b"]]
+
+    asyncio.run(scenario())
+
+
+def test_handler_error_reaches_every_caller_in_batch_only():
+    async def scenario():
+        handler = RecordingHandler(fail_on="bad")
+        batcher = MicroBatcher("test", handler, max_batch_size=10, max_wait=0.01)
+        results = await asyncio.gather(
+            batcher.submit("bad"), batcher.submit("ok"), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        # Batch sau không bị ảnh hưởng
+        assert await batcher.submit("ok") == "OK"
+
+    asyncio.run(scenario())
+
+
+def test_result_count_mismatch_is_an_error():
+    async def scenario():
+        async def handler(items):
+            return items[:-1]
+
+        batcher = MicroBatcher("test", handler, max_batch_size=10, max_wait=0.01)
+        with pytest.raises(RuntimeError, match="returned 1 results for 2 items"):
+            await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_affect_others():
+    async def scenario():
+        handler = RecordingHandler()
+        batcher = MicroBatcher("test", handler, max_batch_size=10, max_wait=0.02)
+        cancelled = asyncio.create_task(batcher.submit("a"))
+        kept = asyncio.create_task(batcher.submit("b"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        assert await kept == "B"
+        assert cancelled.cancelled()
+
+    asyncio.run(scenario())
+
+
+def test_max_concurrency_limits_handler_calls():
+    async def scenario():
+        running = 0
+        peak = 0
+
+        async def handler(items):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return items
+
+        batcher = MicroBatcher("test", handler, max_batch_size=1, max_wait=0, max_concurrency=1)
+        assert await asyncio.gather(*(batcher.submit(i) for i in range(4))) == [0, 1, 2, 3]
+        assert peak == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,65 @@
+import asyncio
+import contextvars
+
+import pytest
+
+pytest.importorskip("autogen")
+pytest.importorskip("fastapi")
+
+from agent import chat_pipeline
+from agent.personality_agent import PersonalityAgent
+from utils.deadline import start_deadline
+
+
+def _run(coro):
+    # Mỗi test chạy trong context riêng để deadline không rò sang test khác
+    return contextvars.copy_context().run(asyncio.run, coro)
+
+
+class _FailingRewriter:
+    async def a_generate_reply(self, messages):
+        raise RuntimeError("LLM unavailable")
+
+
+class _Rewriter:
+    async def a_generate_reply(self, messages):
+        return {"content": "styled"}
+
+
+@pytest.fixture
+def personality(monkeypatch):
+    agent = PersonalityAgent()
+    monkeypatch.setattr(agent, "_create_personality_agent", lambda name: _Rewriter())
+    return agent
+
+
+def test_rewrite_failure_marks_degraded(personality, monkeypatch):
+    monkeypatch.setattr(personality, "_create_personality_agent", lambda name: _FailingRewriter())
+
+    async def scenario():
+        deadline = start_deadline(5)
+        text = await chat_pipeline._apply_personality(personality, "hài_hước", "original")
+        assert text == "original"
+        assert deadline.degraded == ["personality_rewrite"]
+
+    _run(scenario())
+
+
+def test_successful_rewrite_not_degraded(personality):
+    async def scenario():
+        deadline = start_deadline(5)
+        text = await chat_pipeline._apply_personality(personality, "hài_hước", "original")
+        assert text == "styled"
+        assert deadline.degraded == []
+
+    _run(scenario())
+
+
+def test_default_personality_not_degraded(personality):
+    async def scenario():
+        deadline = start_deadline(5)
+        text = await chat_pipeline._apply_personality(personality, "bình_thường", "original")
+        assert text == "original"
+        assert deadline.degraded == []
+
+    _run(scenario())
@@ -0,0 +1,104 @@
+import pytest
+
+from utils import prompt_builder
+from utils.prompt_builder import (
+    CHARS_PER_TOKEN,
+    TRUNCATION_MARK,
+    PromptBuilder,
+    count_tokens,
+    fit_items,
+    truncate_to_tokens,
+)
+
+
+@pytest.fixture(autouse=True)
+def char_estimate(monkeypatch):
+    # Ước lượng theo ký tự (không phụ thuộc tiktoken) để số tokens cố định
+    monkeypatch.setattr(prompt_builder, "_get_encoding", lambda: None)
+
+
+def _text(tokens: int, char: str = "a") -> str:
+    return char * (tokens * CHARS_PER_TOKEN)
+
+
+def test_count_tokens_estimate():
+    assert count_tokens("") == 0
+    assert count_tokens("abcd") == 2
+    assert count_tokens(_text(10)) == 10
+
+
+def test_truncate_to_tokens():
+    text = _text(100)
+    truncated = truncate_to_tokens(text, 10)
+    assert truncated.endswith(TRUNCATION_MARK)
+    assert count_tokens(truncated) <= 10
+    assert truncate_to_tokens("short", 10) == "short"
+    assert truncate_to_tokens(text, 0) == ""
+
+
+def test_fit_items_keeps_highest_values_in_original_order():
+    items = [_text(10, "a"), _text(10, "b"), _text(10, "c")]
+    kept, dropped, truncated = fit_items(items, budget=22, values=[1, 3, 2])
+    assert [index for index, _ in kept] == [1, 2]
+    assert (dropped, truncated) == (1, 0)
+
+
+def test_fit_items_prefers_earlier_items_by_default():
+    items = [_text(10, "a"), _text(10, "b")]
+    kept, dropped, _ = fit_items(items, budget=11)
+    assert [index for index, _ in kept] == [0]
+    assert dropped == 1
+
+
+def test_fit_items_truncates_last_item_when_room_left():
+    items = [_text(10), _text(100, "b")]
+    kept, dropped, truncated = fit_items(items, budget=60)
+    assert [index for index, _ in kept] == [0, 1]
+    assert kept[1][1].endswith(TRUNCATION_MARK)
+    assert (dropped, truncated) == (0, 1)
+
+
+def test_fit_items_drops_when_truncation_too_small():
+    items = [_text(10), _text(100, "b")]
+    kept, dropped, truncated = fit_items(items, budget=20)
+    assert [index for index, _ in kept] == [0]
+    assert (dropped, truncated) == (1, 0)
+
+
+def test_builder_fills_high_priority_sections_first():
+    builder = PromptBuilder("test", max_tokens=100)
+    builder.section("history", [_text(80, "h")], budget=100, priority=1, header="History:")
+    builder.section("summary", [_text(30, "s")], budget=100, priority=2, header="Summary:")
+    prompt = builder.build()
+
+    # Thứ tự trong prompt theo thứ tự thêm section, không theo priority
+    assert prompt.index("History:") < prompt.index("Summary:")
+    assert builder.usage["summary"]["dropped"] == builder.usage["summary"]["truncated"] == 0
+    # History nhận phần budget còn lại sau summary nên bị cắt
+    assert builder.usage["history"]["truncated"] == 1
+    assert builder.total_tokens <= 100
+
+
+def test_builder_drops_section_without_enough_room():
+    builder = PromptBuilder("test", max_tokens=50)
+    builder.section("history", [_text(40, "h")], budget=100, priority=1, header="History:")
+    builder.section("summary", [_text(30, "s")], budget=100, priority=2, header="Summary:")
+    prompt = builder.build()
+
+    assert "History:" not in prompt
+    assert builder.usage["history"]["dropped"] == 1
+
+
+def test_builder_omits_empty_sections_and_headers():
+    builder = PromptBuilder("test")
+    builder.section("empty", [], budget=100, header="Empty:")
+    builder.section("context", ["abc"], budget=100, header="Context:")
+    assert builder.build() == "Context:\nabc"
+
+
+def test_builder_respects_section_budget():
+    builder = PromptBuilder("test")
+    builder.section("context", [_text(10, "a"), _text(10, "b"), _text(10, "c")], budget=25)
+    builder.build()
+    assert builder.usage["context"]["tokens"] <= 25
+    assert builder.usage["context"]["dropped"] == 1
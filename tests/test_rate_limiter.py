@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from utils import rate_limiter
+from utils.rate_limiter import RateLimiter, TokenBucket, backoff_delay
+
+
+def test_bucket_allows_burst_up_to_capacity(clock):
+    clock.install(rate_limiter)
+    bucket = TokenBucket(capacity=10, rate=1)
+    assert bucket.reserve(10) == 0
+    # Hết tokens: phải chờ đúng phần thiếu / rate
+    assert bucket.reserve(2) == pytest.approx(2.0)
+
+
+def test_bucket_refills_over_time(clock):
+    clock.install(rate_limiter)
+    bucket = TokenBucket(capacity=10, rate=2)
+    bucket.reserve(10)
+    clock.advance(2.5)  # +5 tokens
+    assert bucket.reserve(5) == 0
+    assert bucket.reserve(1) == pytest.approx(0.5)
+
+
+def test_bucket_refill_is_capped_at_capacity(clock):
+    clock.install(rate_limiter)
+    bucket = TokenBucket(capacity=10, rate=1)
+    clock.advance(1000)
+    assert bucket.reserve(10) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_oversized_request_is_clamped_to_capacity(clock):
+    clock.install(rate_limiter)
+    bucket = TokenBucket(capacity=10, rate=1)
+    # 1 request lớn hơn capacity không bị chặn vĩnh viễn
+    assert bucket.reserve(50) == 0
+
+
+def test_unlimited_bucket_never_waits():
+    for bucket in (TokenBucket(0, 0), TokenBucket(10, 0)):
+        assert bucket.unlimited
+        assert bucket.reserve(1_000_000) == 0
+
+
+def test_drain_pauses_refill(clock):
+    clock.install(rate_limiter)
+    bucket = TokenBucket(capacity=10, rate=1)
+    bucket.drain(3)
+    assert bucket.reserve(1) == pytest.approx(4.0)
+    clock.advance(4)
+    assert bucket.reserve(0) == 0
+
+
+def test_limiter_waits_for_slowest_quota(clock):
+    clock.install(rate_limiter)
+    limiter = RateLimiter("test", rpm=60, tpm=600)  # 1 request/s, 10 tokens/s
+    limiter.acquire_sync(tokens=600)
+    start = clock.now
+    limiter.acquire_sync(tokens=20)
+    # Token bucket thiếu 20 tokens = 2s, lâu hơn request bucket (1s)
+    assert clock.now - start == pytest.approx(2.0)
+
+
+def test_pause_delays_every_caller(clock, monkeypatch):
+    clock.install(rate_limiter)
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter("test", rpm=600, tpm=0)
+    limiter.pause(5)
+    asyncio.run(limiter.acquire())
+    assert slept and slept[0] >= 5
+    assert limiter.stats()["pauses"] == 1
+
+
+def test_backoff_delay_bounds():
+    for attempt in range(8):
+        delay = backoff_delay(attempt, base=0.5, maximum=4)
+        assert 0 <= delay <= min(4, 0.5 * 2 ** attempt)
@@ -0,0 +1,28 @@
+import asyncio
+import contextvars
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+
+from embedding import search
+from utils.deadline import start_deadline
+
+
+def _run(coro):
+    # Mỗi test chạy trong context riêng để deadline không rò sang test khác
+    return contextvars.copy_context().run(asyncio.run, coro)
+
+
+def test_faq_search_error_marks_degraded(monkeypatch):
+    async def failing_embed(query):
+        raise ConnectionError("embedding service down")
+
+    monkeypatch.setattr(search, "embed_query", failing_embed)
+
+    async def scenario():
+        deadline = start_deadline(5)
+        assert await search.afaq_semantic_search("giờ làm việc?", "user-1") == []
+        assert deadline.degraded == ["faq_search"]
+
+    _run(scenario())
@@ -0,0 +1,105 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from embedding import semantic_cache as semantic_cache_module
+from embedding.semantic_cache import SemanticCache
+
+LAPTOP = [1.0, 0.0, 0.0, 0.0]
+LAPTOP_PARAPHRASE = [0.99, 0.05, 0.0, 0.0]
+POLICY = [0.0, 1.0, 0.0, 0.0]
+
+
+def _store(cache, tenant="t1", personality="", vector=LAPTOP, response="Laptop Dell", version=None):
+    if version is None:
+        version = cache.data_version(tenant)
+    cache.store(tenant, personality, "laptop dell", vector, response, "ProductAgent", version)
+
+
+def test_hit_for_similar_question():
+    cache = SemanticCache(threshold=0.95)
+    _store(cache)
+    hit = cache.lookup("t1", "", LAPTOP_PARAPHRASE)
+    assert hit["response"] == "Laptop Dell"
+    assert hit["agent"] == "ProductAgent"
+    assert hit["score"] >= 0.95
+    assert cache.lookup("t1", "", POLICY) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_scoped_by_tenant_and_personality():
+    cache = SemanticCache(threshold=0.95)
+    _store(cache, tenant="t1", personality="friendly")
+    assert cache.lookup("t2", "friendly", LAPTOP) is None
+    assert cache.lookup("t1", "formal", LAPTOP) is None
+    assert cache.lookup("t1", "friendly", LAPTOP) is not None
+
+
+def test_tenant_version_bump_invalidates_only_that_tenant():
+    cache = SemanticCache(threshold=0.95)
+    _store(cache, tenant="t1")
+    _store(cache, tenant="t2")
+    cache.bump_data_version("t1")
+    assert cache.lookup("t1", "", LAPTOP) is None
+    assert cache.lookup("t2", "", LAPTOP) is not None
+
+
+def test_global_bump_invalidates_everything():
+    cache = SemanticCache(threshold=0.95)
+    _store(cache, tenant="t1")
+    cache.bump_data_version()
+    assert cache.lookup("t1", "", LAPTOP) is None
+    assert len(cache) == 0
+
+
+def test_answer_computed_before_bump_is_not_stored():
+    cache = SemanticCache(threshold=0.95)
+    version = cache.data_version("t1")
+    # Dữ liệu thay đổi trong lúc đang tính câu trả lời
+    cache.bump_data_version("t1")
+    _store(cache, version=version)
+    assert len(cache) == 0
+    assert cache.lookup("t1", "", LAPTOP) is None
+
+
+def test_entries_expire_after_ttl(clock):
+    clock.install(semantic_cache_module)
+    cache = SemanticCache(threshold=0.95, ttl=10)
+    _store(cache)
+    clock.advance(11)
+    assert cache.lookup("t1", "", LAPTOP) is None
+    assert len(cache) == 0
+
+
+def test_scope_keeps_newest_entries():
+    cache = SemanticCache(threshold=0.95, max_entries_per_scope=1)
+    _store(cache, vector=LAPTOP, response="laptop")
+    _store(cache, vector=POLICY, response="policy")
+    assert cache.lookup("t1", "", LAPTOP) is None
+    assert cache.lookup("t1", "", POLICY)["response"] == "policy"
+    assert cache.evictions == 1
+
+
+def test_least_recently_used_scope_is_evicted():
+    cache = SemanticCache(threshold=0.95, max_scopes=2)
+    _store(cache, tenant="t1")
+    _store(cache, tenant="t2")
+    cache.lookup("t1", "", LAPTOP)  # "t2" giờ là LRU
+    _store(cache, tenant="t3")
+    assert cache.lookup("t2", "", LAPTOP) is None
+    assert cache.lookup("t1", "", LAPTOP) is not None
+
+
+def test_zero_vector_is_never_cached():
+    cache = SemanticCache(threshold=0.95)
+    _store(cache, vector=[0.0, 0.0, 0.0, 0.0])
+    assert len(cache) == 0
+    assert cache.lookup("t1", "", [0.0, 0.0, 0.0, 0.0]) is None
+
+
+def test_flush_by_tenant():
+    cache = SemanticCache(threshold=0.95)
+    _store(cache, tenant="t1")
+    _store(cache, tenant="t2")
+    assert cache.flush("t1") == 1
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+import uuid
+
+import pytest
+
+from utils.tracing import STAGE_SECONDS, span, set_trace_attribute, start_trace
+
+
+def _run(fn, *args):
+    # Mỗi test chạy trong context riêng để trace không rò sang test khác
+    return contextvars.copy_context().run(fn, *args)
+
+
+def _label_lines(stage):
+    return [line for line in STAGE_SECONDS.render() if f'stage="{stage}"' in line]
+
+
+def test_spans_after_agent_attribute_are_labelled():
+    def scenario():
+        trace = start_trace()
+        with span("tracing_before_route"):
+            pass
+        set_trace_attribute("agent", "ProductAgent")
+        with span("tracing_after_route"):
+            pass
+        trace.finish()
+        return trace
+
+    trace = _run(scenario)
+    assert trace.attributes["agent"] == "ProductAgent"
+    assert 'agent=""' in _label_lines("tracing_before_route")[0]
+    assert all('agent="ProductAgent"' in line for line in _label_lines("tracing_after_route"))
+
+
+def test_explicit_agent_overrides_trace_attribute():
+    def scenario():
+        start_trace(agent="FAQ")
+        with span("tracing_explicit", agent="MySelf"):
+            pass
+
+    _run(scenario)
+    assert all('agent="MySelf"' in line for line in _label_lines("tracing_explicit"))
+
+
+def test_set_trace_attribute_without_trace_is_noop():
+    _run(set_trace_attribute, "agent", "MySelf")
+
+
+def test_pipeline_labels_post_routing_stages_with_agent(monkeypatch):
+    pytest.importorskip("autogen")
+    pytest.importorskip("fastapi")
+    from agent import chat_pipeline
+    from agent.personality_agent import PersonalityAgent
+
+    class _Rewriter:
+        async def a_generate_reply(self, messages):
+            return {"content": "styled"}
+
+    async def no_faq(query, user_id):
+        return None
+
+    async def route(query, history_context, routing_task=None):
+        return {"agent": "DocumentRetrievalAgent", "query": query}
+
+    async def run_agent(agent_name, agent_query, chat_id, user_id, history, style_instruction):
+        return {"response": "answer", "styled": False}
+
+    personality = PersonalityAgent()
+    monkeypatch.setattr(personality, "_create_personality_agent", lambda name: _Rewriter())
+    monkeypatch.setattr(chat_pipeline.env, "PIPELINE_SPECULATIVE_ROUTING", False)
+    monkeypatch.setattr(chat_pipeline, "_check_faq", no_faq)
+    monkeypatch.setattr(chat_pipeline, "_await_route", route)
+    monkeypatch.setattr(chat_pipeline, "_run_agent", run_agent)
+
+    async def scenario():
+        start_trace()
+        return await chat_pipeline._answer_query(
+            "tài liệu bảo hành", uuid.uuid4(), uuid.uuid4(), [], "", personality, "hài_hước"
+        )
+
+    answer = _run(asyncio.run, scenario())
+    assert answer["response"] == "styled"
+    lines = _label_lines("personality_rewrite")
+    assert any('agent="DocumentRetrievalAgent"' in line for line in lines)
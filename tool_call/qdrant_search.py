@@ -1,15 +1,13 @@
-from env import env
-from qdrant_client import QdrantClient
 from embedding.generate_embeddings import query_embedding, generate_embedding
+from embedding.qdrant_connection import get_qdrant
 from models.product import Product, ProductModel, ProductCreate
 
-qdrant = QdrantClient(f"http://{env.QDRANT_HOST}:{env.QDRANT_PORT}")
 class QSearch:
     @staticmethod
     def search( payload, collection_name = "product_name_embeddings", limit=5):
         # Tìm kiếm ANN trong collection
         query_Vector = query_embedding(payload)  
-        search_result = qdrant.query_points(
+        search_result = get_qdrant().query_points(
             collection_name=collection_name,
             query= query_Vector,
             using="default",
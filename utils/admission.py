@@ -0,0 +1,231 @@
+"""
+Admission Control - Giới hạn concurrency toàn cục + theo tenant cho chat endpoints
+
+- Global cap: tối đa max_concurrency requests chạy pipeline cùng lúc
+- Per-tenant cap: 1 tenant (user_id) không chiếm quá per_tenant_concurrency slots
+- Fair queuing: requests chờ được xếp hàng FIFO theo tenant, slot trống được
+  chia round-robin giữa các tenant đang chờ → tenant gửi nhiều request không
+  làm các tenant khác phải chờ sau toàn bộ hàng đợi của nó
+- Fast reject: hàng đợi (toàn cục hoặc của tenant) đầy, hoặc chờ quá
+  queue_timeout → AdmissionRejected kèm retry_after (giây) để trả 429
+
+Usage:
+    async with admission.slot(str(user_id)):
+        ...
+
+    ticket = await admission.acquire(tenant)   # giữ slot qua StreamingResponse
+    ...
+    ticket.release()
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+
+from utils.metrics import counter, gauge, histogram
+
+ADMISSION_REQUESTS = counter(
+    "admission_requests_total",
+    "Admission decisions (admitted, queued, rejected, timeout)",
+    ("name", "result"),
+)
+ADMISSION_INFLIGHT = gauge("admission_inflight", "Requests holding an admission slot", ("name",))
+ADMISSION_QUEUE_DEPTH = gauge("admission_queue_depth", "Requests waiting for an admission slot", ("name",))
+ADMISSION_QUEUED_TENANTS = gauge("admission_queued_tenants", "Tenants with requests waiting for a slot", ("name",))
+ADMISSION_WAIT = histogram(
+    "admission_wait_seconds",
+    "Time spent waiting for an admission slot",
+    ("name",),
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class AdmissionRejected(Exception):
+    """Request bị từ chối (hàng đợi đầy / chờ quá lâu)"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Slot đã được cấp, release() idempotent"""
+
+    def __init__(self, controller: "AdmissionController", tenant: str):
+        self._controller = controller
+        self.tenant = tenant
+        self.admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self.tenant, time.monotonic() - self.admitted_at)
+
+
+class AdmissionController:
+    """Global + per-tenant concurrency limits với fair queuing"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 64,
+        per_tenant_concurrency: int = 8,
+        max_queue: int = 256,
+        per_tenant_queue: int = 32,
+        queue_timeout: float = 10.0
+    ):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_tenant_concurrency = max(1, per_tenant_concurrency)
+        self.max_queue = max_queue
+        self.per_tenant_queue = per_tenant_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._active_by_tenant: Dict[str, int] = {}
+        # tenant → FIFO futures; thứ tự của OrderedDict là vòng round-robin
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        # EWMA thời gian giữ slot, dùng để ước lượng Retry-After
+        self._avg_service = 1.0
+        self.rejected = 0
+
+    def _can_run(self, tenant: str) -> bool:
+        return (
+            self._active < self.max_concurrency
+            and self._active_by_tenant.get(tenant, 0) < self.per_tenant_concurrency
+        )
+
+    def _grant(self, tenant: str) -> None:
+        self._active += 1
+        self._active_by_tenant[tenant] = self._active_by_tenant.get(tenant, 0) + 1
+
+    def _retry_after(self) -> int:
+        estimate = self._avg_service * (self._queued + 1) / self.max_concurrency
+        return int(min(60, max(1, math.ceil(estimate))))
+
+    def _reject(self, reason: str, result: str = "rejected") -> AdmissionRejected:
+        self.rejected += 1
+        ADMISSION_REQUESTS.inc(name=self.name, result=result)
+        print(f"🚦 Admission '{self.name}' {result}: {reason}")
+        return AdmissionRejected(reason, self._retry_after())
+
+    def _update_gauges(self) -> None:
+        ADMISSION_INFLIGHT.set(self._active, name=self.name)
+        ADMISSION_QUEUE_DEPTH.set(self._queued, name=self.name)
+        ADMISSION_QUEUED_TENANTS.set(len(self._waiting), name=self.name)
+
+    async def acquire(self, tenant: str) -> AdmissionTicket:
+        """
+        Chờ slot cho tenant
+
+        Raises:
+            AdmissionRejected: hàng đợi đầy hoặc chờ quá queue_timeout
+        """
+        tenant = str(tenant)
+        if tenant not in self._waiting and self._can_run(tenant):
+            self._grant(tenant)
+            ADMISSION_REQUESTS.inc(name=self.name, result="admitted")
+            ADMISSION_WAIT.observe(0.0, name=self.name)
+            self._update_gauges()
+            return AdmissionTicket(self, tenant)
+
+        queue = self._waiting.get(tenant)
+        if self._queued >= self.max_queue:
+            raise self._reject(f"queue full ({self._queued} waiting)")
+        if queue is not None and len(queue) >= self.per_tenant_queue:
+            raise self._reject(f"tenant {tenant} queue full ({len(queue)} waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._waiting[tenant] = deque()
+        queue.append(future)
+        self._queued += 1
+        ADMISSION_REQUESTS.inc(name=self.name, result="queued")
+        self._update_gauges()
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(tenant, future)
+            raise self._reject(f"waited {self.queue_timeout:.1f}s for a slot", result="timeout")
+        except asyncio.CancelledError:
+            # Client ngắt kết nối khi đang chờ (hoặc ngay sau khi được cấp slot)
+            self._abandon(tenant, future)
+            raise
+        ADMISSION_WAIT.observe(time.monotonic() - start, name=self.name)
+        return AdmissionTicket(self, tenant)
+
+    def _abandon(self, tenant: str, future: asyncio.Future) -> None:
+        if future.done() and not future.cancelled():
+            # Slot đã được cấp nhưng caller bỏ đi → trả lại
+            self._release(tenant, 0.0, observe=False)
+            return
+        future.cancel()
+        queue = self._waiting.get(tenant)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self._queued -= 1
+            if not queue:
+                del self._waiting[tenant]
+        self._update_gauges()
+
+    def _release(self, tenant: str, held_seconds: float, observe: bool = True) -> None:
+        self._active -= 1
+        remaining = self._active_by_tenant.get(tenant, 1) - 1
+        if remaining > 0:
+            self._active_by_tenant[tenant] = remaining
+        else:
+            self._active_by_tenant.pop(tenant, None)
+        if observe:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * held_seconds
+        self._dispatch()
+        self._update_gauges()
+
+    def _dispatch(self) -> None:
+        """Chia slot trống round-robin cho các tenant đang chờ (bỏ qua tenant đã hết quota)"""
+        while self._active < self.max_concurrency and self._waiting:
+            tenant = next((t for t in self._waiting if self._can_run(t)), None)
+            if tenant is None:
+                return
+            queue = self._waiting[tenant]
+            future = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._waiting.move_to_end(tenant)
+            else:
+                del self._waiting[tenant]
+            if future.done():
+                continue
+            self._grant(tenant)
+            ADMISSION_REQUESTS.inc(name=self.name, result="admitted")
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, tenant: str) -> AsyncIterator[AdmissionTicket]:
+        ticket = await self.acquire(tenant)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "active": self._active,
+            "queued": self._queued,
+            "queued_tenants": len(self._waiting),
+            "active_tenants": len(self._active_by_tenant),
+            "max_concurrency": self.max_concurrency,
+            "per_tenant_concurrency": self.per_tenant_concurrency,
+            "max_queue": self.max_queue,
+            "per_tenant_queue": self.per_tenant_queue,
+            "rejected": self.rejected,
+            "avg_service_seconds": round(self._avg_service, 3),
+        }
@@ -0,0 +1,101 @@
+"""
+In-process cache utilities
+
+- TTLCache: LRU cache có giới hạn kích thước + TTL, thread-safe, có hit/miss counters
+- normalize_query / hash_text: chuẩn hóa câu hỏi để làm cache key
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+def normalize_query(text: str) -> str:
+    """
+    Chuẩn hóa câu hỏi để các biến thể giống nhau dùng chung cache key
+
+    "  Chính sách   đổi trả? " → "chính sách đổi trả"
+    """
+    text = unicodedata.normalize("NFC", text or "").lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("?!.。… ").strip()
+
+
+def hash_text(text: str) -> str:
+    """Hash ngắn (sha1) cho các đoạn text dài như history window"""
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+class TTLCache:
+    """
+    LRU cache với TTL cho từng entry
+
+    - Bounded: vượt quá maxsize thì evict entry ít dùng nhất
+    - TTL: entry quá hạn bị coi là miss và bị xóa
+    - maxsize <= 0: cache bị disable (mọi get đều miss)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (ttl if ttl is not None else self.ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+            return default if item is _MISSING else item[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters cho monitoring"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,103 @@
+"""
+Deadline - Per-request deadline + stage budgets cho chat pipeline
+
+- start_deadline(): tạo deadline cho request, lưu trong contextvar nên mọi stage
+  (kể cả asyncio tasks con như speculative routing) đều thấy
+- with_budget(): chạy 1 stage với timeout = min(budget của stage, thời gian còn lại),
+  quá hạn thì trả về fallback rẻ hơn thay vì giữ request
+- record_partial(): stage ghi lại kết quả trung gian (vd: danh sách sản phẩm đã tìm
+  được trước lần gọi LLM cuối) để fallback dùng lại
+
+Usage:
+    deadline = start_deadline(env.PIPELINE_DEADLINE_SECONDS)
+    faq = await with_budget(search_faq(...), "faq", env.PIPELINE_FAQ_BUDGET, fallback=None)
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+
+from utils.metrics import counter
+
+T = TypeVar("T")
+
+STAGE_DEGRADED = counter(
+    "chat_pipeline_degraded_total",
+    "Pipeline stages that exceeded their budget and used a fallback",
+    ("stage",),
+)
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("pipeline_deadline", default=None)
+
+
+class Deadline:
+    """Deadline tuyệt đối của 1 request"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.partial: Dict[str, Any] = {}
+        self.degraded: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout_for(self, budget: float) -> float:
+        """Timeout thực tế của 1 stage: không vượt quá budget và thời gian còn lại"""
+        return min(budget, self.remaining())
+
+
+def start_deadline(seconds: float) -> Deadline:
+    """Tạo deadline mới và gắn vào context hiện tại"""
+    deadline = Deadline(seconds)
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def mark_degraded(stage: str) -> None:
+    """Đánh dấu stage đã dùng fallback (câu trả lời của request không được cache)"""
+    STAGE_DEGRADED.inc(stage=stage)
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.degraded.append(stage)
+
+
+def record_partial(key: str, value: Any) -> None:
+    """Ghi kết quả trung gian của stage hiện tại (no-op nếu không có deadline)"""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.partial[key] = value
+
+
+async def with_budget(
+    awaitable: Awaitable[T],
+    stage: str,
+    budget: float,
+    fallback: Union[T, Callable[[], T]] = None
+) -> T:
+    """
+    Chạy 1 stage trong budget, quá hạn thì cancel và trả về fallback
+
+    Args:
+        awaitable: Coroutine / task của stage
+        stage: Tên stage (metrics, logs)
+        budget: Budget tối đa của stage (giây)
+        fallback: Giá trị (hoặc callable) trả về khi hết thời gian
+    """
+    deadline = _current_deadline.get()
+    timeout = deadline.timeout_for(budget) if deadline is not None else budget
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"⏰ Stage '{stage}' exceeded budget ({timeout:.1f}s), using fallback")
+        mark_degraded(stage)
+        return fallback() if callable(fallback) else fallback
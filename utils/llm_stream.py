@@ -0,0 +1,54 @@
+"""
+LLM Streaming - Stream token từ OpenAI Chat Completions
+
+autogen ConversableAgent chỉ trả về câu trả lời hoàn chỉnh, nên các endpoint
+streaming (SSE) gọi trực tiếp AsyncOpenAI với stream=True, dùng cùng
+system message / prompt với agent tương ứng.
+"""
+
+from typing import AsyncIterator, Optional
+from openai import AsyncOpenAI
+from env import env
+
+_async_client: Optional[AsyncOpenAI] = None
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Get singleton AsyncOpenAI client (dùng chung connection pool)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(api_key=env.OPENAI_API_KEY)
+    return _async_client
+
+
+async def stream_chat_completion(
+    system_message: str,
+    prompt: str,
+    model: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Stream câu trả lời của LLM theo từng token
+
+    Args:
+        system_message: System prompt của agent
+        prompt: Nội dung user message
+        model: Model override (default: env.OPENAI_API_MODEL)
+
+    Yields:
+        Từng đoạn text (delta) theo thứ tự LLM sinh ra
+    """
+    client = get_async_openai_client()
+    stream = await client.chat.completions.create(
+        model=model or env.OPENAI_API_MODEL,
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ],
+        stream=True
+    )
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
@@ -0,0 +1,142 @@
+"""
+Micro Batcher - Gom các request đồng thời thành 1 batch call
+
+- Request đầu tiên mở cửa sổ max_wait; batch được gửi khi hết cửa sổ hoặc đủ
+  max_batch_size items (cái nào tới trước)
+- Items trùng nhau trong cùng batch chỉ gửi 1 lần, mọi caller nhận cùng kết quả
+- handler nhận list items, trả list kết quả cùng thứ tự; handler lỗi thì mọi
+  caller trong batch nhận exception đó
+- Caller bị cancel (vd hết deadline) không ảnh hưởng các caller khác
+
+Usage:
+    batcher = MicroBatcher("embeddings", provider.aembed_batch, max_batch_size=64, max_wait=0.005)
+    vector = await batcher.submit(text)
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from utils.metrics import counter, histogram
+
+MICRO_BATCH_SIZE = histogram(
+    "micro_batch_size",
+    "Items per dispatched micro-batch",
+    ("name",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+MICRO_BATCH_WAIT = histogram(
+    "micro_batch_wait_seconds",
+    "Time an item waited in the micro-batch window before dispatch",
+    ("name",),
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1),
+)
+MICRO_BATCH_ITEMS = counter(
+    "micro_batch_items_total",
+    "Items submitted to micro-batchers (deduplicated = shared a call with an identical item)",
+    ("name", "result"),
+)
+
+Handler = Callable[[List[Any]], Awaitable[Sequence[Any]]]
+
+
+class MicroBatcher:
+    """Async micro-batching cho các call có batch API (embeddings, ...)"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Handler,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        max_concurrency: Optional[int] = None
+    ):
+        self.name = name
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.max_concurrency = max_concurrency
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[Hashable, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        # State gắn với event loop hiện tại (CLI / tests có thể chạy nhiều loops)
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+            self._tasks = set()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+
+    async def submit(self, item: Hashable) -> Any:
+        loop = asyncio.get_running_loop()
+        self._bind(loop)
+        future = loop.create_future()
+        self._pending.append((item, future, time.monotonic()))
+        self.items += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = self._loop.create_task(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Hashable, asyncio.Future, float]]) -> None:
+        now = time.monotonic()
+        waiters: Dict[Hashable, List[asyncio.Future]] = {}
+        for item, future, submitted_at in batch:
+            MICRO_BATCH_WAIT.observe(now - submitted_at, name=self.name)
+            waiters.setdefault(item, []).append(future)
+        items = list(waiters.keys())
+        self.batches += 1
+        MICRO_BATCH_SIZE.observe(len(items), name=self.name)
+        MICRO_BATCH_ITEMS.inc(len(items), name=self.name, result="dispatched")
+        if len(batch) > len(items):
+            MICRO_BATCH_ITEMS.inc(len(batch) - len(items), name=self.name, result="deduplicated")
+
+        try:
+            if self._semaphore is not None:
+                async with self._semaphore:
+                    results = await self.handler(items)
+            else:
+                results = await self.handler(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name} handler returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for item, result in zip(items, results):
+            for future in waiters[item]:
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_items_per_batch": self.items / self.batches if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
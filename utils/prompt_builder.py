@@ -0,0 +1,200 @@
+"""
+Prompt Builder - Ghép prompt theo token budget cho từng section
+
+- count_tokens(): đếm token bằng tokenizer local (tiktoken nếu có cài, fallback
+  ước lượng theo số ký tự - tiếng Việt có dấu tốn token hơn tiếng Anh nên ước
+  lượng thiên về dư)
+- fit_items(): chọn các items có giá trị cao nhất vừa budget, item cuối cùng bị
+  cắt bớt nếu còn đủ chỗ, phần còn lại bị bỏ; giữ nguyên thứ tự ban đầu
+- PromptBuilder: nhiều sections (history, RAG context, products, ...) với budget
+  riêng; section priority cao được lấp đầy trước khi tổng budget bị hết
+
+Usage:
+    builder = PromptBuilder("routing", max_tokens=1200)
+    builder.section("summary", [summary_text], budget=300, priority=2)
+    builder.section("history", lines, budget=800, priority=1, values=range(len(lines)))
+    prompt = builder.build()
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from env import env
+from utils.metrics import counter, histogram
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+PROMPT_SECTION_TOKENS = histogram(
+    "prompt_section_tokens",
+    "Tokens per prompt section after budgeting",
+    ("prompt", "section"),
+    buckets=(32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+PROMPT_ITEMS_DROPPED = counter(
+    "prompt_items_dropped_total",
+    "Prompt items dropped or truncated to fit the section token budget",
+    ("prompt", "section", "action"),
+)
+
+# Ước lượng khi không có tiktoken: ~3 ký tự / token (tiếng Việt có dấu)
+CHARS_PER_TOKEN = 3
+TRUNCATION_MARK = "…"
+# Item bị cắt còn ít hơn chừng này token thì bỏ hẳn
+MIN_TRUNCATED_TOKENS = 32
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.encoding_for_model(env.OPENAI_API_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cắt text còn tối đa max_tokens (kể cả dấu …)"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:max_tokens - 1]).rstrip() + TRUNCATION_MARK
+    return text[:(max_tokens - 1) * CHARS_PER_TOKEN].rstrip() + TRUNCATION_MARK
+
+
+def fit_items(
+    items: Sequence[str],
+    budget: int,
+    values: Optional[Sequence[float]] = None,
+    separator_tokens: int = 1
+) -> Tuple[List[Tuple[int, str]], int, int]:
+    """
+    Chọn items theo giá trị giảm dần cho tới khi hết budget
+
+    Args:
+        items: Các đoạn text (thứ tự xuất hiện trong prompt)
+        budget: Token budget của cả nhóm
+        values: Giá trị của từng item (cao = giữ trước), mặc định item đứng trước giá trị cao hơn
+        separator_tokens: Token cho phần nối giữa các items
+
+    Returns:
+        (kept, dropped, truncated) - kept là [(index, text)] theo thứ tự ban đầu
+    """
+    if values is None:
+        values = [-index for index in range(len(items))]
+    order = sorted(range(len(items)), key=lambda index: values[index], reverse=True)
+
+    kept: List[Tuple[int, str]] = []
+    remaining = budget
+    dropped = truncated = 0
+    for index in order:
+        text = items[index]
+        if not text:
+            continue
+        cost = count_tokens(text) + separator_tokens
+        if cost <= remaining:
+            kept.append((index, text))
+            remaining -= cost
+        elif remaining - separator_tokens >= MIN_TRUNCATED_TOKENS:
+            kept.append((index, truncate_to_tokens(text, remaining - separator_tokens)))
+            remaining = 0
+            truncated += 1
+        else:
+            dropped += 1
+    kept.sort(key=lambda item: item[0])
+    return kept, dropped, truncated
+
+
+def record_usage(prompt: str, section: str, tokens: int, dropped: int = 0, truncated: int = 0) -> None:
+    PROMPT_SECTION_TOKENS.observe(tokens, prompt=prompt, section=section)
+    if dropped:
+        PROMPT_ITEMS_DROPPED.inc(dropped, prompt=prompt, section=section, action="dropped")
+    if truncated:
+        PROMPT_ITEMS_DROPPED.inc(truncated, prompt=prompt, section=section, action="truncated")
+
+
+class PromptBuilder:
+    """Ghép nhiều sections vào 1 prompt, mỗi section trong budget riêng và tổng budget"""
+
+    def __init__(self, name: str, max_tokens: Optional[int] = None):
+        self.name = name
+        self.max_tokens = max_tokens
+        self._sections: List[Dict[str, Any]] = []
+        self.usage: Dict[str, Dict[str, int]] = {}
+
+    def section(
+        self,
+        name: str,
+        items: Sequence[str],
+        budget: int,
+        priority: int = 0,
+        values: Optional[Sequence[float]] = None,
+        header: str = "",
+        separator: str = "\n"
+    ) -> "PromptBuilder":
+        """
+        Thêm section (thứ tự thêm vào = thứ tự trong prompt)
+
+        Args:
+            items: Nội dung của section, chia thành các đơn vị có thể bỏ / cắt
+            budget: Token budget tối đa của section
+            priority: Section priority cao được lấp đầy trước
+            values: Giá trị từng item (xem fit_items)
+            header: Dòng tiêu đề, chỉ xuất hiện khi section còn nội dung
+        """
+        self._sections.append({
+            "name": name,
+            "items": list(items),
+            "budget": budget,
+            "priority": priority,
+            "values": list(values) if values is not None else None,
+            "header": header,
+            "separator": separator,
+        })
+        return self
+
+    def build(self) -> str:
+        remaining = self.max_tokens
+        rendered: Dict[str, str] = {}
+        for section in sorted(self._sections, key=lambda s: s["priority"], reverse=True):
+            header_tokens = count_tokens(section["header"]) + 1 if section["header"] else 0
+            budget = section["budget"] if remaining is None else min(section["budget"], remaining)
+            kept, dropped, truncated = fit_items(
+                section["items"],
+                budget - header_tokens,
+                section["values"],
+                separator_tokens=count_tokens(section["separator"]) or 1
+            )
+            text = section["separator"].join(item for _, item in kept)
+            if text and section["header"]:
+                text = f"{section['header']}\n{text}"
+            tokens = count_tokens(text)
+            if remaining is not None:
+                remaining -= tokens
+            rendered[section["name"]] = text
+            self.usage[section["name"]] = {"tokens": tokens, "dropped": dropped, "truncated": truncated}
+            record_usage(self.name, section["name"], tokens, dropped, truncated)
+
+        return "\n\n".join(rendered[s["name"]] for s in self._sections if rendered[s["name"]])
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(usage["tokens"] for usage in self.usage.values())
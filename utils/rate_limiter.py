@@ -0,0 +1,120 @@
+"""
+Rate Limiter - Token bucket theo quota requests / tokens mỗi phút của provider
+
+- TokenBucket: bucket thread-safe kiểu reservation (caller trừ trước, ngủ đúng
+  khoảng thời gian còn thiếu), dùng được cả từ event loop (acquire) lẫn thread
+  thường / crawler scripts (acquire_sync)
+- RateLimiter: RPM + TPM (vd quota OpenAI), pause() khi provider trả 429 để mọi
+  caller cùng lùi lại thay vì tiếp tục bắn requests
+- backoff_delay(): exponential backoff với full jitter
+
+Usage:
+    limiter = RateLimiter("openai_embeddings", rpm=3000, tpm=1_000_000)
+    await limiter.acquire(tokens=1200)
+    limiter.acquire_sync(tokens=1200)
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict
+
+from utils.metrics import counter, histogram
+
+RATE_LIMIT_WAIT = histogram(
+    "rate_limiter_wait_seconds",
+    "Time spent waiting for rate limiter capacity",
+    ("name",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+RATE_LIMIT_PAUSES = counter(
+    "rate_limiter_pauses_total",
+    "Provider rate-limit responses that paused all callers",
+    ("name",),
+)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, maximum: float = 20.0) -> float:
+    """Full jitter: random trong [0, min(maximum, base * 2^attempt)]"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    capacity tokens, nạp lại đều theo rate tokens / giây
+
+    capacity <= 0: không giới hạn
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0 or self.rate <= 0
+
+    def reserve(self, amount: float) -> float:
+        """Trừ amount tokens (có thể âm), trả về số giây cần chờ"""
+        if self.unlimited:
+            return 0.0
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def drain(self, seconds: float) -> None:
+        """Không cấp thêm tokens trong seconds giây tới"""
+        if self.unlimited:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self._updated = now
+
+
+class RateLimiter:
+    """Giới hạn requests / phút và tokens / phút"""
+
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0):
+        self.name = name
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+        self.pauses = 0
+
+    def _reserve(self, tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    async def acquire(self, tokens: int = 0) -> None:
+        wait = self._reserve(tokens)
+        RATE_LIMIT_WAIT.observe(wait, name=self.name)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens: int = 0) -> None:
+        wait = self._reserve(tokens)
+        RATE_LIMIT_WAIT.observe(wait, name=self.name)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Provider báo rate limit (429) → tạm dừng mọi caller trong seconds giây"""
+        self.pauses += 1
+        RATE_LIMIT_PAUSES.inc(name=self.name)
+        self.requests.drain(seconds)
+        self.tokens.drain(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "pauses": self.pauses,
+        }
@@ -0,0 +1,69 @@
+"""
+Single-flight - Gộp các request giống nhau đang chạy đồng thời
+
+Request đầu tiên với 1 key (leader) chạy computation trong 1 asyncio task riêng,
+các request cùng key đến trong lúc task chưa xong (followers) chỉ await kết quả
+của task đó thay vì chạy lại toàn bộ embedding / Qdrant / SQL / LLM calls.
+
+- Task chạy độc lập với leader: leader bị cancel (client ngắt kết nối) thì
+  followers vẫn nhận được kết quả
+- Exception được trả về cho tất cả requests đang chờ
+- Key bị xóa ngay khi task xong → không cache kết quả sau khi hoàn thành
+
+Usage:
+    flight = SingleFlight("chat_answer")
+    result, shared = await flight.do(key, lambda: compute(...))
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from utils.metrics import counter, gauge
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = counter(
+    "singleflight_calls_total",
+    "Single-flight calls by role (leader runs the computation, shared awaits it)",
+    ("name", "role"),
+)
+SINGLEFLIGHT_INFLIGHT = gauge("singleflight_inflight", "In-flight single-flight computations", ("name",))
+
+
+class SingleFlight:
+    """Coalesce concurrent calls có cùng key thành 1 computation"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Chạy fn() nếu chưa có computation nào cho key, ngược lại chờ computation đang chạy
+
+        Returns:
+            (result, shared) - shared=True nếu kết quả lấy từ computation của request khác
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            SINGLEFLIGHT_INFLIGHT.set(len(self._inflight), name=self.name)
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        SINGLEFLIGHT_CALLS.inc(name=self.name, role="shared" if shared else "leader")
+        # shield: 1 caller bị cancel không cancel computation của các caller khác
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        SINGLEFLIGHT_INFLIGHT.set(len(self._inflight), name=self.name)
+        # Tránh warning "exception was never retrieved" khi mọi caller đã bị cancel
+        if not task.cancelled():
+            task.exception()
+
+    def inflight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,140 @@
+"""
+Tracing - Span-based timing cho từng stage của chat pipeline
+
+- PipelineTrace: 1 trace / request, chứa danh sách spans (stage, duration, attributes)
+- span(): context manager đo thời gian 1 stage, dùng được ở bất kỳ đâu trong request
+  (trace hiện tại được lưu trong contextvar, kể cả trong asyncio tasks con)
+- Mọi span đều được aggregate vào histogram chat_pipeline_stage_seconds{stage, agent}
+
+Usage:
+    trace = start_trace(tenant=str(user_id))
+    with span("faq"):
+        ...
+    set_trace_attribute("agent", "ProductAgent")  # ngay khi routing xong
+    response.headers["Server-Timing"] = trace.server_timing_header()
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import histogram
+
+STAGE_SECONDS = histogram(
+    "chat_pipeline_stage_seconds",
+    "Latency of each chat pipeline stage in seconds",
+    ("stage", "agent"),
+)
+
+_current_trace: ContextVar[Optional["PipelineTrace"]] = ContextVar("pipeline_trace", default=None)
+
+
+class PipelineTrace:
+    """Trace của 1 request qua chat pipeline"""
+
+    def __init__(self, name: str = "chat_pipeline", **attributes):
+        self.name = name
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.spans: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._end: Optional[float] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record(self, stage: str, duration: float, **attributes) -> None:
+        """Ghi lại 1 span đã đo xong và observe histogram"""
+        self.spans.append({
+            "stage": stage,
+            "ms": round(duration * 1000, 2),
+            **attributes,
+        })
+        agent = attributes.get("agent", self.attributes.get("agent", ""))
+        STAGE_SECONDS.observe(duration, stage=stage, agent=agent)
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.record(stage, time.perf_counter() - start, **attributes)
+
+    def finish(self) -> None:
+        """Kết thúc trace, observe tổng thời gian request (stage="total")"""
+        if self._end is not None:
+            return
+        self._end = time.perf_counter()
+        self.record("total", self._end - self._start)
+
+    @property
+    def total_ms(self) -> float:
+        end = self._end if self._end is not None else time.perf_counter()
+        return round((end - self._start) * 1000, 2)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "total_ms": self.total_ms,
+            "attributes": self.attributes,
+            "stages": [s for s in self.spans if s["stage"] != "total"],
+        }
+
+    def server_timing_header(self) -> str:
+        """
+        Format theo chuẩn Server-Timing header:
+            faq;dur=120.5, routing;dur=830.1, ..., total;dur=2140.0
+        """
+        parts = [
+            f"{s['stage']};dur={s['ms']}"
+            for s in self.spans if s["stage"] != "total"
+        ]
+        parts.append(f"total;dur={self.total_ms}")
+        return ", ".join(parts)
+
+    def log(self) -> None:
+        stages = ", ".join(f"{s['stage']}={s['ms']}ms" for s in self.spans if s["stage"] != "total")
+        print(f"⏱️  {self.name} [{self.attributes}] total={self.total_ms}ms | {stages}")
+
+
+def start_trace(name: str = "chat_pipeline", **attributes) -> PipelineTrace:
+    """Tạo trace mới và gắn vào context hiện tại"""
+    trace = PipelineTrace(name, **attributes)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[PipelineTrace]:
+    return _current_trace.get()
+
+
+def set_trace_attribute(key: str, value: Any) -> None:
+    """
+    Gắn attribute vào trace hiện tại (no-op nếu không có trace)
+
+    Set "agent" ngay khi routing xong để các span sau đó (agent, personality_rewrite,
+    ...) được label đúng agent trong chat_pipeline_stage_seconds
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.set_attribute(key, value)
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Đo thời gian 1 stage trong trace hiện tại
+    (nếu không có trace thì chỉ observe histogram)
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        with trace.span(stage, **attributes) as span_attributes:
+            yield span_attributes
+        return
+
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, agent=attributes.get("agent", ""))